@@ -25,9 +25,14 @@ Inherits from Image Class with DTM particularities.
 
 # Standard imports
 import logging
+import os
+import re
+from collections import OrderedDict
 
 # Third party imports
 import numpy as np
+import rasterio
+from affine import Affine
 from rasterio.fill import fillnodata
 
 # Shareloc imports
@@ -79,14 +84,7 @@ class DTMImage(Image):
 
         self.stats = {}
         if read_data:
-            if self.mask is not None:
-                valid_data = self.data[self.mask[:, :] == 255]
-            else:
-                valid_data = self.data
-            self.stats["min"] = valid_data.min()
-            self.stats["max"] = valid_data.max()
-            self.stats["mean"] = valid_data.mean()
-            self.stats["median"] = np.median(valid_data)
+            self.stats = compute_stats(self.data, self.mask)
         if fill_nodata is not None:
             self.fill_nodata(strategy=fill_nodata, fill_value=fill_value)
 
@@ -105,19 +103,438 @@ class DTMImage(Image):
         :type fill_value  : float
         """
         if self.mask is not None:
-            if strategy in self.stats:
-                self.data[self.mask[:, :] == 0] = self.stats[strategy]
-            elif strategy == "rio_fillnodata":
-                self.data = fillnodata(self.data, self.mask[:, :], max_search_distance, smoothing_iterations)
-                if np.sum(self.data[self.mask[:, :] == 0] == self.nodata) != 0:
-                    if fill_value is None:
-                        fill_value = self.stats["min"]
-                    # pylint: disable=logging-too-many-args
-                    logging.warning("not all nodata have been filled, fill with %d", fill_value)
-                    self.data[self.data[:, :] == self.nodata] = fill_value
-            elif strategy == "constant":
-                self.data[self.mask[:, :] == 0] = fill_value
-            else:
-                logging.warning("fill nodata strategy not available")
+            self.data = fill_nodata_array(
+                self.data,
+                self.mask,
+                self.nodata,
+                self.stats,
+                strategy,
+                max_search_distance,
+                smoothing_iterations,
+                fill_value,
+            )
         else:
             logging.debug("no nodata mask has been defined")
+
+
+# pylint: disable=too-many-instance-attributes
+class TiledDTMImage(DTMImage):
+    """
+    class Tiled DTM Image to handle DTM image data by tiles.
+    Data is not read at construction, tiles are read on demand and kept in a bounded LRU cache
+    (least recently used tiles are released first).
+    Inherits from DTMImage Class
+    """
+
+    def __init__(
+        self,
+        image_path,
+        datum=None,
+        roi=None,
+        roi_is_in_physical_space=False,
+        fill_nodata="rio_fillnodata",
+        fill_value=None,
+        tile_size=1024,
+        cache_size=16,
+    ):
+        """
+        constructor
+        :param image_path : image path
+        :type image_path  : string
+        :param datum  :  datum "geoid" or "ellipsoid", if None datum is set to "geoid"
+        :type datum  : str
+        :param roi  : region of interest [row_min,col_min,row_max,col_max] or [xmin,y_min,x_max,y_max] if
+             roi_is_in_physical_space activated
+        :type roi  : list
+        :param roi_is_in_physical_space  : roi value in physical space
+        :type roi_is_in_physical_space  : bool
+        :param fill_nodata  fill_nodata strategy in None/'constant'/'min'/'median'/'max'/'mean'/'rio_fillnodata'/
+            statistics are computed on each tile
+        :type fill_nodata  : str
+        :param fill_value  fill value for constant strategy. fill value is used for 'roi_fillnodata' residuals nodata,
+        if None 'min' is used
+        :type fill_value  : float
+        :param tile_size  : tile size (rows and columns), or tile (rows, columns)
+        :type tile_size  : int or Tuple(int, int)
+        :param cache_size  : maximum number of tiles kept in memory
+        :type cache_size  : int
+        """
+        super().__init__(
+            image_path,
+            read_data=False,
+            datum=datum,
+            roi=roi,
+            roi_is_in_physical_space=roi_is_in_physical_space,
+            fill_nodata=None,
+        )
+        self.fill_nodata_strategy = fill_nodata
+        self.fill_value = fill_value
+        self.tile_size = tile_size
+        (self.tile_rows, self.tile_cols) = tile_size if isinstance(tile_size, tuple) else (tile_size, tile_size)
+        self.cache_size = cache_size
+        self.tiles = OrderedDict()
+        # altitude correction applied to each decoded tile (geoid height for instance),
+        # function of (row_off, col_off, nb_rows, nb_cols) which returns the altitude offsets grid of the block
+        self.correction = None
+        # roi offset in dataset
+        self.row_offset = 0
+        self.col_offset = 0
+        if image_path is not None:
+            col_off, row_off = ~self.dataset.transform * (self.transform[2], self.transform[5])
+            self.row_offset = int(round(row_off))
+            self.col_offset = int(round(col_off))
+
+    def read_block(self, row_off, col_off, nb_rows, nb_cols):
+        """
+        read raw data block
+
+        :param row_off: first row of the block
+        :type row_off: int
+        :param col_off: first column of the block
+        :type col_off: int
+        :param nb_rows: number of rows
+        :type nb_rows: int
+        :param nb_cols: number of columns
+        :type nb_cols: int
+        :return: block data and mask (None if no nodata is defined)
+        :rtype: Tuple(2D np.array, 2D np.array or None)
+        """
+        window = rasterio.windows.Window(col_off + self.col_offset, row_off + self.row_offset, nb_cols, nb_rows)
+        data = self.dataset.read(1, window=window)
+        mask = None
+        if self.nodata is not None:
+            mask = self.dataset.read_masks(1, window=window)
+        return data, mask
+
+    def read_tile(self, tile_row, tile_col):
+        """
+        read tile, fill its nodata, convert it to float64 and apply altitude correction.
+        Tile is kept in LRU cache.
+
+        :param tile_row: tile row index
+        :type tile_row: int
+        :param tile_col: tile column index
+        :type tile_col: int
+        :return: tile data
+        :rtype: 2D np.array dtype np.float64
+        """
+        key = (tile_row, tile_col)
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        row_off = tile_row * self.tile_rows
+        col_off = tile_col * self.tile_cols
+        nb_rows = min(self.tile_rows, self.nb_rows - row_off)
+        nb_cols = min(self.tile_cols, self.nb_columns - col_off)
+        data, mask = self.read_block(row_off, col_off, nb_rows, nb_cols)
+        if self.fill_nodata_strategy is not None and mask is not None:
+            data = fill_nodata_array(
+                data,
+                mask,
+                self.nodata,
+                compute_stats(data, mask),
+                self.fill_nodata_strategy,
+                fill_value=self.fill_value,
+            )
+        tile = data.astype(np.float64)
+        if self.correction is not None:
+            tile += self.correction(row_off, col_off, nb_rows, nb_cols)
+
+        self.tiles[key] = tile
+        if len(self.tiles) > self.cache_size:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def read_window(self, row_off, col_off, nb_rows, nb_cols):
+        """
+        read data window from tiles
+
+        :param row_off: first row of the window
+        :type row_off: int
+        :param col_off: first column of the window
+        :type col_off: int
+        :param nb_rows: number of rows
+        :type nb_rows: int
+        :param nb_cols: number of columns
+        :type nb_cols: int
+        :return: window data
+        :rtype: 2D np.array dtype np.float64
+        """
+        window = np.zeros((nb_rows, nb_cols))
+        for tile_row in range(row_off // self.tile_rows, (row_off + nb_rows - 1) // self.tile_rows + 1):
+            for tile_col in range(col_off // self.tile_cols, (col_off + nb_cols - 1) // self.tile_cols + 1):
+                tile = self.read_tile(tile_row, tile_col)
+                tile_row_off = tile_row * self.tile_rows
+                tile_col_off = tile_col * self.tile_cols
+                first_row = max(row_off, tile_row_off)
+                last_row = min(row_off + nb_rows, tile_row_off + tile.shape[0])
+                first_col = max(col_off, tile_col_off)
+                last_col = min(col_off + nb_cols, tile_col_off + tile.shape[1])
+                window[first_row - row_off : last_row - row_off, first_col - col_off : last_col - col_off] = tile[
+                    first_row - tile_row_off : last_row - tile_row_off,
+                    first_col - tile_col_off : last_col - tile_col_off,
+                ]
+        return window
+
+    def read_overview(self, overview_size=1024):
+        """
+        read the DTM on a decimated grid of at most overview_size x overview_size nodes (nearest neighbour,
+        dataset overviews are used if available) without reading the tiles.
+        Nodata nodes are set to numpy.nan if a fill_nodata strategy is set, altitude correction is not applied.
+
+        :param overview_size: maximum number of overview rows and columns
+        :type overview_size: int
+        :return: overview data, overview nodes rows and columns in DTM
+        :rtype: Tuple(2D np.array dtype np.float64, 1D np.array, 1D np.array)
+        """
+        (rows, cols) = self.overview_nodes(overview_size)
+        window = rasterio.windows.Window(self.col_offset, self.row_offset, self.nb_columns, self.nb_rows)
+        data = self.dataset.read(1, window=window, out_shape=(rows.size, cols.size)).astype(np.float64)
+        if self.fill_nodata_strategy is not None and self.nodata is not None:
+            mask = self.dataset.read_masks(1, window=window, out_shape=(rows.size, cols.size))
+            data[mask == 0] = np.nan
+        return data, rows, cols
+
+    def overview_nodes(self, overview_size=1024):
+        """
+        DTM nodes of the overview of at most overview_size x overview_size nodes (see read_overview)
+
+        :param overview_size: maximum number of overview rows and columns
+        :type overview_size: int
+        :return: overview nodes rows and columns in DTM
+        :rtype: Tuple(1D np.array, 1D np.array)
+        """
+        step = max(int(np.ceil(self.nb_rows / overview_size)), int(np.ceil(self.nb_columns / overview_size)), 1)
+        nb_rows = int(np.ceil(self.nb_rows / step))
+        nb_cols = int(np.ceil(self.nb_columns / step))
+        # nearest neighbour decimation takes the node under each overview node center
+        rows = np.floor((np.arange(nb_rows) + 0.5) * self.nb_rows / nb_rows).astype(np.int64)
+        cols = np.floor((np.arange(nb_cols) + 0.5) * self.nb_columns / nb_cols).astype(np.int64)
+        return rows, cols
+
+    def statistics(self):
+        """
+        raw altitude bounds from dataset statistics metadata (STATISTICS_MINIMUM and STATISTICS_MAXIMUM, computed
+        on the whole dataset by gdalinfo -stats for instance), data is not read.
+
+        :return: min and max raw altitudes of valid data, None if the dataset has no statistics
+        :rtype: Tuple(float, float) or None
+        """
+        tags = self.dataset.tags(1)
+        if "STATISTICS_MINIMUM" not in tags or "STATISTICS_MAXIMUM" not in tags:
+            return None
+        return float(tags["STATISTICS_MINIMUM"]), float(tags["STATISTICS_MAXIMUM"])
+
+
+class DTMMosaic(TiledDTMImage):
+    """
+    class DTM Mosaic to handle a directory of 1 degree geographic DTM tiles (SRTM, COP-DEM) as a single DTM.
+    Tiles are indexed by their footprint, parsed from their filename (N44E005.hgt,
+    Copernicus_DSM_COG_10_N44_00_E005_00_DEM.tif, ...), and are opened on demand.
+    Tiles must share the same shape and resolution (rows and columns resolutions may differ, COP-DEM above 50
+    degrees of latitude for instance). Missing tiles (sea) are filled with fill_value (0 if None).
+    Tiles data are not scanned (no overview nor statistics): DTMIntersection requires alt_bounds for a mosaic.
+    Inherits from TiledDTMImage Class, the mosaic is tiled along DTM tiles.
+    """
+
+    tile_name_pattern = re.compile(r"([NS])(\d{2})(?:_\d{2})?_?([EW])(\d{3})")
+    tile_extensions = (".hgt", ".tif", ".tiff")
+
+    def __init__(self, tiles_directory, datum=None, fill_nodata="rio_fillnodata", fill_value=None, cache_size=16):
+        """
+        constructor
+        :param tiles_directory : DTM tiles directory
+        :type tiles_directory  : string
+        :param datum  :  datum "geoid" or "ellipsoid", if None datum is set to "geoid"
+        :type datum  : str
+        :param fill_nodata  fill_nodata strategy in None/'constant'/'min'/'median'/'max'/'mean'/'rio_fillnodata'/
+            statistics are computed on each tile
+        :type fill_nodata  : str
+        :param fill_value  fill value for constant strategy. fill value is used for 'roi_fillnodata' residuals nodata
+            and missing tiles, if None 'min' is used (0 for missing tiles)
+        :type fill_value  : float
+        :param cache_size  : maximum number of tiles kept in memory
+        :type cache_size  : int
+        """
+        self.tiles_directory = tiles_directory
+        # tile files indexed by (latitude, longitude) of their south west corner
+        self.tile_files = {}
+        for filename in sorted(os.listdir(tiles_directory)):
+            match = self.tile_name_pattern.search(filename)
+            if match is not None and os.path.splitext(filename)[1].lower() in self.tile_extensions:
+                lat = int(match.group(2)) * (1 if match.group(1) == "N" else -1)
+                lon = int(match.group(4)) * (1 if match.group(3) == "E" else -1)
+                self.tile_files[(lat, lon)] = os.path.join(tiles_directory, filename)
+        if not self.tile_files:
+            raise ValueError(f"no DTM tile found in {tiles_directory}")
+
+        # mosaic geometry is defined by one tile
+        ((ref_lat, ref_lon), ref_file) = next(iter(self.tile_files.items()))
+        with rasterio.open(ref_file) as ref_dataset:
+            ref_transform = ref_dataset.transform
+            ref_shape = ref_dataset.shape
+            epsg = ref_dataset.crs.to_epsg() if ref_dataset.crs is not None else None
+            nodata = ref_dataset.nodata
+        # pixels by degree along latitude and longitude, tiles overlap (SRTM tiles share their border pixels)
+        self.rows_per_degree = int(round(1.0 / abs(ref_transform[4])))
+        self.cols_per_degree = int(round(1.0 / ref_transform[0]))
+        self.tile_overlap_rows = ref_shape[0] - self.rows_per_degree
+        self.tile_overlap_cols = ref_shape[1] - self.cols_per_degree
+        self.tile_file_shape = ref_shape
+        for ((lat, lon), tile_file) in self.tile_files.items():
+            with rasterio.open(tile_file) as dataset:
+                # tile transform is the reference one shifted by the tiles footprints offset
+                expected_transform = Affine.translation(lon - ref_lon, lat - ref_lat) * ref_transform
+                if dataset.shape != ref_shape or not dataset.transform.almost_equals(
+                    expected_transform, precision=1e-3 * min(ref_transform[0], abs(ref_transform[4]))
+                ):
+                    raise ValueError(f"DTM tile {tile_file} shape or transform differs from {ref_file} ones")
+
+        super().__init__(
+            None,
+            datum=datum,
+            fill_nodata=fill_nodata,
+            fill_value=fill_value,
+            tile_size=(self.rows_per_degree, self.cols_per_degree),
+            cache_size=cache_size,
+        )
+        lats = [lat for (lat, __) in self.tile_files]
+        lons = [lon for (__, lon) in self.tile_files]
+        self.lat_max = max(lats) + 1
+        self.lon_min = min(lons)
+        self.nb_tiles_lat = self.lat_max - min(lats)
+        self.nb_tiles_lon = max(lons) + 1 - self.lon_min
+
+        self.transform = Affine(
+            ref_transform[0],
+            ref_transform[1],
+            ref_transform[2] - ref_lon + self.lon_min,
+            ref_transform[3],
+            ref_transform[4],
+            ref_transform[5] - ref_lat - 1 + self.lat_max,
+        )
+        self.nb_rows = self.nb_tiles_lat * self.rows_per_degree + self.tile_overlap_rows
+        self.nb_columns = self.nb_tiles_lon * self.cols_per_degree + self.tile_overlap_cols
+        self.origin_row = self.transform[5]
+        self.origin_col = self.transform[2]
+        self.pixel_size_row = self.transform[4]
+        self.pixel_size_col = self.transform[0]
+        self.epsg = epsg
+        self.nodata = nodata
+        self.dataset = None
+        self.mask = None
+        self.data = None
+
+    def read_block(self, row_off, col_off, nb_rows, nb_cols):
+        """
+        read raw data block from the DTM tile containing it
+
+        :param row_off: first row of the block
+        :type row_off: int
+        :param col_off: first column of the block
+        :type col_off: int
+        :param nb_rows: number of rows
+        :type nb_rows: int
+        :param nb_cols: number of columns
+        :type nb_cols: int
+        :return: block data and mask (None if no nodata is defined)
+        :rtype: Tuple(2D np.array, 2D np.array or None)
+        """
+        # last mosaic rows/cols are the overlap of the last tiles
+        tile_index_lat = min(row_off // self.rows_per_degree, self.nb_tiles_lat - 1)
+        tile_index_lon = min(col_off // self.cols_per_degree, self.nb_tiles_lon - 1)
+        tile_key = (self.lat_max - 1 - tile_index_lat, self.lon_min + tile_index_lon)
+        if tile_key not in self.tile_files:
+            # pylint: disable=logging-too-many-args
+            logging.debug("missing DTM tile %s", tile_key)
+            fill_value = 0.0 if self.fill_value is None else self.fill_value
+            return np.full((nb_rows, nb_cols), fill_value), None
+
+        window = rasterio.windows.Window(
+            col_off - tile_index_lon * self.cols_per_degree,
+            row_off - tile_index_lat * self.rows_per_degree,
+            nb_cols,
+            nb_rows,
+        )
+        with rasterio.open(self.tile_files[tile_key]) as dataset:
+            data = dataset.read(1, window=window)
+            mask = None
+            if dataset.nodata is not None:
+                mask = dataset.read_masks(1, window=window)
+        return data, mask
+
+
+def compute_stats(data, mask):
+    """
+    compute DTM statistics on valid data
+
+    :param data: DTM data
+    :type data: 2D np.array
+    :param mask: nodata mask (0 for nodata, 255 for valid data), None if no nodata is defined
+    :type mask: 2D np.array or None
+    :return: statistics "min", "max", "mean" and "median"
+    :rtype: dict
+    """
+    if mask is not None:
+        valid_data = data[mask[:, :] == 255]
+    else:
+        valid_data = data
+    stats = {}
+    if valid_data.size > 0:
+        stats["min"] = valid_data.min()
+        stats["max"] = valid_data.max()
+        stats["mean"] = valid_data.mean()
+        stats["median"] = np.median(valid_data)
+    return stats
+
+
+# pylint: disable=too-many-arguments
+def fill_nodata_array(
+    data,
+    mask,
+    nodata,
+    stats,
+    strategy="rio_fillnodata",
+    max_search_distance=100.0,
+    smoothing_iterations=0,
+    fill_value=0.0,
+):
+    """
+    fill nodata in DTM data
+
+    :param data: DTM data
+    :type data: 2D np.array
+    :param mask: nodata mask (0 for nodata, 255 for valid data)
+    :type mask: 2D np.array
+    :param nodata: nodata value
+    :type nodata: float
+    :param stats: DTM statistics (see compute_stats)
+    :type stats: dict
+    :param strategy: fill strategy ('constant'/'min'/'median'/'max'/'mean'/'rio_fillnodata'/)
+    :type strategy: str
+    :param max_search_distance: fill max_search_distance
+    :type max_search_distance: float
+    :param smoothing_iterations: smoothing_iterations
+    :type smoothing_iterations: int
+    :param fill_value  fill value for constant strategy. fill value is used for 'roi_fillnodata' residuals nodata,
+    if None 'min' is used
+    :type fill_value  : float
+    :return: filled data
+    :rtype: 2D np.array
+    """
+    if strategy in stats:
+        data[mask[:, :] == 0] = stats[strategy]
+    elif strategy == "rio_fillnodata":
+        data = fillnodata(data, mask[:, :], max_search_distance, smoothing_iterations)
+        if np.sum(data[mask[:, :] == 0] == nodata) != 0:
+            if fill_value is None:
+                fill_value = stats.get("min", 0.0)
+            # pylint: disable=logging-too-many-args
+            logging.warning("not all nodata have been filled, fill with %d", fill_value)
+            data[data[:, :] == nodata] = fill_value
+    elif strategy == "constant":
+        data[mask[:, :] == 0] = fill_value
+    else:
+        logging.warning("fill nodata strategy not available")
+    return data
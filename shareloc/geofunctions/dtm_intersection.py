@@ -21,20 +21,43 @@
 """
 This module contains the DTMIntersection class to handle DTM intersection.
 """
+# pylint: disable=too-many-lines
 
 # Standard imports
 import logging
+import os
+from functools import lru_cache
 
 # Third party imports
 import numpy as np
+from numba import config, njit, prange
 from scipy import interpolate
 
 # Shareloc imports
-from shareloc.dtm_image import DTMImage
+from shareloc.dtm_image import DTMImage, DTMMosaic, TiledDTMImage
 from shareloc.image import Image
 from shareloc.math_utils import interpol_bilin
 from shareloc.proj_utils import coordinates_conversion
 
+# Set numba type of threading layer before parallel target compilation
+config.THREADING_LAYER = "omp"
+
+
+@lru_cache(maxsize=None)
+def load_geoid(geoid_filename):
+    """
+    load geoid grid. Geoid is read once by process and kept in memory for next calls.
+
+    :param geoid_filename: geoid_filename
+    :type geoid_filename: str
+    :return geoid image, data converted to float64
+    :rtype shareloc.image.Image
+    """
+    logging.debug("load geoid %s", geoid_filename)
+    geoid_image = Image(geoid_filename, read_data=True)
+    geoid_image.data = np.ascontiguousarray(geoid_image.data, dtype=np.float64)
+    return geoid_image
+
 
 def interpolate_geoid_height(geoid_filename, positions, interpolation_method="linear"):
     """
@@ -45,18 +68,14 @@ def interpolate_geoid_height(geoid_filename, positions, interpolation_method="li
     :type geoid_filename: str
     :param positions: geodetic coordinates
     :type positions: 2D numpy array : (number of points, [long coord, lat coord])
-    :parama interpolation_method default is 'linear' (interpn interpolation method)
+    :parama interpolation_method default is 'linear' (compiled bilinear interpolation),
+        otherwise interpn interpolation method
     :type str
     :return geoid height
     :rtype 1 numpy array (nuber of points)
     """
 
-    geoid_image = Image(geoid_filename, read_data=True)
-
-    # Prepare grid for interpolation
-    row_indexes = np.arange(0, geoid_image.nb_rows, 1)
-    col_indexes = np.arange(0, geoid_image.nb_columns, 1)
-    points = (row_indexes, col_indexes)
+    geoid_image = load_geoid(geoid_filename)
 
     # add modulo lon/lat
     min_lon = geoid_image.origin_col
@@ -66,7 +85,92 @@ def interpolate_geoid_height(geoid_filename, positions, interpolation_method="li
     if np.any(np.abs(positions[:, 1]) > 90.0):
         raise RuntimeError("Geoid cannot handle latitudes greater than 90 deg.")
     indexes_geoid = geoid_image.transform_physical_point_to_index(positions[:, 1], positions[:, 0])
-    return interpolate.interpn(points, geoid_image.data[:, :], indexes_geoid, method=interpolation_method)
+
+    if interpolation_method != "linear":
+        # Prepare grid for interpolation
+        row_indexes = np.arange(0, geoid_image.nb_rows, 1)
+        col_indexes = np.arange(0, geoid_image.nb_columns, 1)
+        points = (row_indexes, col_indexes)
+        return interpolate.interpn(points, geoid_image.data[:, :], indexes_geoid, method=interpolation_method)
+
+    # same bounds checking as interpn
+    for dim, (index, nb_index) in enumerate(zip(indexes_geoid, geoid_image.data.shape)):
+        if np.any((index < 0) | (index > nb_index - 1)):
+            raise ValueError(f"One of the requested xi is out of bounds in dimension {dim}")
+    return interpolate_bilinear_numba(
+        geoid_image.data,
+        np.ascontiguousarray(indexes_geoid[0], dtype=np.float64),
+        np.ascontiguousarray(indexes_geoid[1], dtype=np.float64),
+    )
+
+
+@njit("f8[:](f8[:, :], f8[:], f8[:])", parallel=True, cache=True)
+def interpolate_bilinear_numba(data, pos_row, pos_col):
+    """
+    bilinear interpolation of a regular grid on multiple positions, positions have to be inside the grid.
+    numpy.nan is returned for not finite positions.
+
+    :param data: grid values
+    :type data: 2D np.array dtype np.float64
+    :param pos_row: row positions
+    :type pos_row: 1D np.array dtype np.float64
+    :param pos_col: col positions
+    :type pos_col: 1D np.array dtype np.float64
+    :return: interpolated values
+    :rtype: 1D np.array dtype np.float64
+    """
+    (nb_rows, nb_cols) = data.shape
+    values = np.empty(pos_row.shape[0])
+    # pylint: disable=not-an-iterable
+    for i in prange(pos_row.shape[0]):
+        if not (np.isfinite(pos_row[i]) and np.isfinite(pos_col[i])):
+            values[i] = np.nan
+            continue
+        row_0 = min(int(np.floor(pos_row[i])), nb_rows - 2)
+        col_0 = min(int(np.floor(pos_col[i])), nb_cols - 2)
+        row_shift = pos_row[i] - row_0
+        col_shift = pos_col[i] - col_0
+        values[i] = (
+            (1 - row_shift) * (1 - col_shift) * data[row_0, col_0]
+            + (1 - row_shift) * col_shift * data[row_0, col_0 + 1]
+            + row_shift * (1 - col_shift) * data[row_0 + 1, col_0]
+            + row_shift * col_shift * data[row_0 + 1, col_0 + 1]
+        )
+    return values
+
+
+@njit("f8[:, :](f8[:, :], i8, i8, i8)", parallel=True, cache=True)
+def upsample_bilinear_numba(sub_grid, step, nb_rows, nb_cols):
+    """
+    bilinear upsampling of a sub-grid, sub-grid node [i, j] is the node [i * step, j * step] of the upsampled grid.
+
+    :param sub_grid: sub-grid values
+    :type sub_grid: 2D np.array dtype np.float64
+    :param step: sub-grid step
+    :type step: int
+    :param nb_rows: number of rows of the upsampled grid
+    :type nb_rows: int
+    :param nb_cols: number of columns of the upsampled grid
+    :type nb_cols: int
+    :return: upsampled grid
+    :rtype: 2D np.array (nb_rows, nb_cols) dtype np.float64
+    """
+    (nb_rows_sub, nb_cols_sub) = sub_grid.shape
+    grid = np.empty((nb_rows, nb_cols))
+    # pylint: disable=not-an-iterable
+    for row in prange(nb_rows):
+        row_0 = min(row // step, nb_rows_sub - 2)
+        row_shift = row / step - row_0
+        for col in range(nb_cols):
+            col_0 = min(col // step, nb_cols_sub - 2)
+            col_shift = col / step - col_0
+            grid[row, col] = (
+                (1 - row_shift) * (1 - col_shift) * sub_grid[row_0, col_0]
+                + (1 - row_shift) * col_shift * sub_grid[row_0, col_0 + 1]
+                + row_shift * (1 - col_shift) * sub_grid[row_0 + 1, col_0]
+                + row_shift * col_shift * sub_grid[row_0 + 1, col_0 + 1]
+            )
+    return grid
 
 
 class DTMIntersection:
@@ -78,6 +182,8 @@ class DTMIntersection:
 
     # gitlab issue #56
     # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-branches
     def __init__(
         self,
         dtm_filename,
@@ -86,10 +192,15 @@ class DTMIntersection:
         roi_is_in_physical_space=True,
         fill_nodata=None,
         fill_value=0.0,
+        tile_size=None,
+        cache_size=16,
+        alt_bounds=None,
+        geoid_subsampling=1,
     ):
         """
         Constructor
-        :param dtm_filename: dtm filename
+        :param dtm_filename: dtm filename, or directory of 1 degree DTM tiles (SRTM, COP-DEM) which are
+            handled as a mosaic in tiled mode (see shareloc.dtm_image.DTMMosaic)
         :type dtm_filename: string
         :param geoid_filename: geoid filename, if None datum is ellispoid
         :type geoid_filename: string
@@ -103,8 +214,24 @@ class DTMIntersection:
         :param fill_value  fill value for constant strategy. fill value is used for 'roi_fillnodata' residuals nodata,
         if None 'min' is used
         :type fill_value  : float
+        :param tile_size  : if not None, the DTM is read by tiles of tile_size x tile_size on demand (tiled mode),
+            only the window covering the lines of sight to intersect is loaded. Lines of sight are intersected by
+            groups whose window is bounded by the tiles cache size.
+        :type tile_size  : int
+        :param cache_size  : maximum number of tiles kept in memory in tiled mode
+        :type cache_size  : int
+        :param alt_bounds  : [alt_min, alt_max] DTM altitude bounds (w.r.t ellipsoid) in tiled mode,
+            if None they are computed without reading the tiles (see overview_min_max). Bounds must be given for
+            a tiles directory
+        :type alt_bounds  : list
+        :param geoid_subsampling  : geoid height is computed every geoid_subsampling DTM nodes
+            then bilinearly upsampled to all DTM nodes (1: geoid height is computed on each node)
+        :type geoid_subsampling  : int
         """
         self.dtm_file = dtm_filename
+        self.geoid_filename = geoid_filename
+        self.geoid_subsampling = geoid_subsampling
+        self.tiled = tile_size is not None or os.path.isdir(dtm_filename)
         self.alt_data = None
         self.alt_min = None
         self.alt_max = None
@@ -118,43 +245,73 @@ class DTMIntersection:
         self.plane_coef_d = None
         self.alt_min_cell = None
         self.alt_max_cell = None
+        self.alt_min_pyramid = None
+        self.alt_max_pyramid = None
+        self.pyramid_offsets = None
+        self.pyramid_shapes = None
+        # loaded DTM window [row_offset, col_offset, nb_rows, nb_cols] and its cube
+        self.window = None
+        self.window_plane_coef_d = None
         self.tol_z = 0.0001
 
         # lecture mnt
         datum = "ellipsoid"
         if geoid_filename is not None:
             datum = "geoid"
-        self.dtm_image = DTMImage(
-            self.dtm_file,
-            read_data=True,
-            roi=roi,
-            roi_is_in_physical_space=roi_is_in_physical_space,
-            datum=datum,
-            fill_nodata=fill_nodata,
-            fill_value=fill_value,
-        )
+        if os.path.isdir(self.dtm_file):
+            if roi is not None:
+                logging.warning("roi is not available for DTM tiles directory")
+            if alt_bounds is None:
+                # tiles are opened on demand, their altitudes can not be scanned at construction
+                raise ValueError(f"alt_bounds must be given for DTM tiles directory {self.dtm_file}")
+            self.dtm_image = DTMMosaic(
+                self.dtm_file, datum=datum, fill_nodata=fill_nodata, fill_value=fill_value, cache_size=cache_size
+            )
+        elif self.tiled:
+            self.dtm_image = TiledDTMImage(
+                self.dtm_file,
+                roi=roi,
+                roi_is_in_physical_space=roi_is_in_physical_space,
+                datum=datum,
+                fill_nodata=fill_nodata,
+                fill_value=fill_value,
+                tile_size=tile_size,
+                cache_size=cache_size,
+            )
+        else:
+            self.dtm_image = DTMImage(
+                self.dtm_file,
+                read_data=True,
+                roi=roi,
+                roi_is_in_physical_space=roi_is_in_physical_space,
+                datum=datum,
+                fill_nodata=fill_nodata,
+                fill_value=fill_value,
+            )
+            self.alt_data = self.dtm_image.data[:, :].astype("float64")
         self.epsg = self.dtm_image.epsg
-        self.alt_data = self.dtm_image.data[:, :].astype("float64")
         if self.dtm_image.datum == "geoid":
             logging.debug("remove geoid height")
             if geoid_filename is not None:
-                self.grid_row, self.grid_col = np.mgrid[
-                    0 : self.dtm_image.nb_rows : 1, 0 : self.dtm_image.nb_columns : 1
-                ]
-                lat, lon = self.dtm_image.transform_index_to_physical_point(self.grid_row, self.grid_col)
-                positions = np.vstack([lon.flatten(), lat.flatten()]).transpose()
-                if self.epsg != 4326:
-                    positions = coordinates_conversion(positions, self.epsg, 4326)
-                geoid_height = interpolate_geoid_height(geoid_filename, positions)
-                self.alt_data += geoid_height.reshape(lon.shape)
+                if self.tiled:
+                    # geoid height is added to each tile when it is read
+                    self.dtm_image.correction = self.geoid_height_on_grid
+                else:
+                    self.alt_data += self.geoid_height_on_grid(0, 0, self.dtm_image.nb_rows, self.dtm_image.nb_columns)
             else:
                 logging.warning("dtm datum is geoid but no geoid file is given")
         else:
             logging.info("no geoid file is given dtm is assumed to be w.r.t ellipsoid")
 
-        self.init_min_max()
-        self.alt_max = self.alt_data.max()
-        self.alt_min = self.alt_data.min()
+        if self.tiled:
+            if alt_bounds is None:
+                alt_bounds = self.overview_min_max()
+            (self.alt_min, self.alt_max) = alt_bounds
+        else:
+            self.init_min_max()
+            self.init_min_max_pyramid()
+            self.alt_max = self.alt_data.max()
+            self.alt_min = self.alt_data.min()
 
         self.plane_coef_a = np.array([1.0, 1.0, 0.0, 0.0, 0.0, 0.0])
         self.plane_coef_b = np.array([0.0, 0.0, 1.0, 1.0, 0.0, 0.0])
@@ -163,6 +320,10 @@ class DTMIntersection:
             [0.0, self.dtm_image.nb_rows - 1.0, 0.0, self.dtm_image.nb_columns - 1.0, self.alt_min, self.alt_max]
         )
 
+        if not self.tiled:
+            self.window = [0, 0, self.dtm_image.nb_rows, self.dtm_image.nb_columns]
+            self.window_plane_coef_d = self.plane_coef_d
+
         self.plans = np.array(
             [
                 [1.0, 0.0, 0.0, 0.0],
@@ -174,6 +335,213 @@ class DTMIntersection:
             ]
         )
 
+    def geoid_height(self, grid_row, grid_col):
+        """
+        geoid height at DTM index positions
+
+        :param grid_row: row index positions
+        :type grid_row: np.array
+        :param grid_col: col index positions
+        :type grid_col: np.array
+        :return geoid height above ellipsoid
+        :rtype np.array (same shape as grid_row)
+        """
+        lat, lon = self.dtm_image.transform_index_to_physical_point(grid_row, grid_col)
+        positions = np.vstack([lon.flatten(), lat.flatten()]).transpose()
+        if self.epsg != 4326:
+            positions = coordinates_conversion(positions, self.epsg, 4326)
+        geoid_height = interpolate_geoid_height(self.geoid_filename, positions)
+        return geoid_height.reshape(lon.shape)
+
+    def geoid_height_on_grid(self, row_off, col_off, nb_rows, nb_cols):
+        """
+        geoid height on a block of DTM nodes.
+        if geoid_subsampling is greater than 1, geoid height is computed on a sub-grid covering the block
+        then bilinearly upsampled.
+
+        :param row_off: first row of the block
+        :type row_off: int
+        :param col_off: first column of the block
+        :type col_off: int
+        :param nb_rows: number of rows
+        :type nb_rows: int
+        :param nb_cols: number of columns
+        :type nb_cols: int
+        :return geoid height above ellipsoid
+        :rtype np.array (nb_rows, nb_cols)
+        """
+        step = self.geoid_subsampling
+        if step <= 1:
+            grid_row, grid_col = np.mgrid[row_off : row_off + nb_rows, col_off : col_off + nb_cols]
+            return self.geoid_height(grid_row, grid_col)
+
+        # sub-grid covers the block, with at least 2 nodes in each direction
+        nb_rows_sub = max(int(np.ceil((nb_rows - 1) / step)), 1) + 1
+        nb_cols_sub = max(int(np.ceil((nb_cols - 1) / step)), 1) + 1
+        grid_row, grid_col = np.mgrid[0:nb_rows_sub, 0:nb_cols_sub]
+        geoid_sub = self.geoid_height(row_off + step * grid_row, col_off + step * grid_col)
+        return upsample_bilinear_numba(geoid_sub, step, nb_rows, nb_cols)
+
+    def overview_min_max(self, overview_size=1024):
+        """
+        In tiled mode, DTM altitude bounds without reading the tiles.
+        If the DTM is not larger than overview_size x overview_size nodes, it is read at once and bounds are exact.
+        Otherwise bounds are conservative: raw altitudes bounds are taken from dataset statistics
+        (see TiledDTMImage.statistics) and geoid height bounds from the geoid grid (see geoid_height_bounds).
+        A decimated overview can miss DTM extrema: if the dataset has no statistics, alt_bounds must be given.
+
+        :param overview_size: maximum number of rows and columns of a DTM read at once
+        :type overview_size: int
+        :return min and max altitudes
+        :rtype Tuple(float, float)
+        """
+        if self.dtm_image.nb_rows <= overview_size and self.dtm_image.nb_columns <= overview_size:
+            (overview, rows, cols) = self.dtm_image.read_overview(overview_size)
+            if self.dtm_image.fill_nodata_strategy == "constant":
+                overview[np.isnan(overview)] = self.dtm_image.fill_value
+            if self.dtm_image.correction is not None:
+                (grid_row, grid_col) = np.meshgrid(rows, cols, indexing="ij")
+                overview += self.geoid_height(grid_row, grid_col)
+            # other nodata filling strategies give altitudes within valid ones
+            return np.nanmin(overview), np.nanmax(overview)
+
+        statistics = self.dtm_image.statistics()
+        if statistics is None:
+            raise ValueError(
+                f"DTM {self.dtm_file} is larger than {overview_size}x{overview_size} nodes and has no statistics:"
+                " alt_bounds must be given"
+            )
+        bounds = list(statistics)
+        # nodata values are kept or filled with fill_value
+        if self.dtm_image.fill_nodata_strategy is None and self.dtm_image.nodata is not None:
+            bounds.append(self.dtm_image.nodata)
+        elif self.dtm_image.fill_nodata_strategy in ("constant", "rio_fillnodata"):
+            if self.dtm_image.fill_value is not None:
+                bounds.append(self.dtm_image.fill_value)
+        (alt_min, alt_max) = (min(bounds), max(bounds))
+        if self.dtm_image.correction is not None:
+            (geoid_min, geoid_max) = self.geoid_height_bounds(*self.dtm_image.overview_nodes(overview_size))
+            (alt_min, alt_max) = (alt_min + geoid_min, alt_max + geoid_max)
+        return alt_min, alt_max
+
+    def geoid_height_bounds(self, rows, cols):
+        """
+        conservative geoid height bounds on DTM nodes: bounds of the geoid grid nodes enclosing the given DTM nodes,
+        with one geoid cell margin to cover DTM nodes in between (nodes must be closer than a geoid cell).
+        Bilinearly interpolated geoid heights are bounded by the enclosing geoid grid nodes.
+
+        :param rows: DTM nodes rows
+        :type rows: 1D np.array
+        :param cols: DTM nodes columns
+        :type cols: 1D np.array
+        :return geoid height min and max
+        :rtype Tuple(float, float)
+        """
+        (grid_row, grid_col) = np.meshgrid(rows, cols, indexing="ij")
+        lat, lon = self.dtm_image.transform_index_to_physical_point(grid_row, grid_col)
+        positions = np.vstack([lon.flatten(), lat.flatten()]).transpose()
+        if self.epsg != 4326:
+            positions = coordinates_conversion(positions, self.epsg, 4326)
+        geoid_image = load_geoid(self.geoid_filename)
+        # same longitude modulo as interpolate_geoid_height
+        min_lon = geoid_image.origin_col
+        max_lon = min_lon + geoid_image.nb_columns * geoid_image.pixel_size_col
+        positions[:, 0] += (positions[:, 0] + min_lon < 0) * 360.0
+        positions[:, 0] -= (positions[:, 0] - max_lon > 0) * 360.0
+        (geoid_rows, geoid_cols) = geoid_image.transform_physical_point_to_index(positions[:, 1], positions[:, 0])
+        row_min = max(int(np.floor(np.min(geoid_rows))) - 1, 0)
+        row_max = min(int(np.ceil(np.max(geoid_rows))) + 1, geoid_image.nb_rows - 1)
+        col_min = max(int(np.floor(np.min(geoid_cols))) - 1, 0)
+        col_max = min(int(np.ceil(np.max(geoid_cols))) + 1, geoid_image.nb_columns - 1)
+        geoid_window = geoid_image.data[row_min : row_max + 1, col_min : col_max + 1]
+        return geoid_window.min(), geoid_window.max()
+
+    def split_los(self, los_index):
+        """
+        In tiled mode, split lines of sight into groups whose DTM window is bounded by the tiles cache
+        (cache_size x tile rows x tile columns nodes), by recursive bisection along the largest window dimension.
+        A single line of sight is never split.
+
+        :param los_index: lines of sight in index coordinates
+        :type los_index: numpy.array (number of los, number of altitudes, 3)
+        :return lines of sight of each group
+        :rtype list of slice or 1D np.array
+        """
+        if not self.tiled:
+            return [slice(None)]
+        max_cells = self.dtm_image.cache_size * self.dtm_image.tile_rows * self.dtm_image.tile_cols
+        # lines of sight extents, nan positions are ignored
+        extents = np.stack(
+            [
+                np.fmin.reduce(los_index[..., 0], axis=1),
+                np.fmin.reduce(los_index[..., 1], axis=1),
+                np.fmax.reduce(los_index[..., 0], axis=1),
+                np.fmax.reduce(los_index[..., 1], axis=1),
+            ],
+            axis=1,
+        )
+        extents[~np.all(np.isfinite(extents), axis=1)] = np.nan
+
+        groups = []
+        stack = [np.arange(los_index.shape[0])]
+        while stack:
+            group = stack.pop()
+            (row_min, col_min) = np.fmin.reduce(extents[group, :2], axis=0)
+            (row_max, col_max) = np.fmax.reduce(extents[group, 2:], axis=0)
+            # prepare_window margins, a group without valid positions (nan extent) is not split
+            if group.size == 1 or not (row_max - row_min + 4) * (col_max - col_min + 4) > max_cells:
+                groups.append(group)
+                continue
+            axis = 0 if row_max - row_min >= col_max - col_min else 1
+            order = np.argsort(extents[group, axis] + extents[group, axis + 2], kind="stable")
+            stack.append(group[order[group.size // 2 :]])
+            stack.append(group[order[: group.size // 2]])
+        if len(groups) == 1:
+            return [slice(None)]
+        return groups
+
+    def prepare_window(self, los_index):
+        """
+        In tiled mode, load the DTM window covering the lines of sight (if not already loaded)
+        and initialize its min/max cells, min/max pyramid and cube.
+        Window is loaded from DTM tiles cache.
+
+        :param los_index: lines of sight in index coordinates
+        :type los_index: numpy.array (..., 3)
+        :return window offset to subtract to index coordinates
+        :rtype numpy.array (1x3)
+        """
+        if not self.tiled:
+            return np.zeros(3)
+        los_extent = np.array([np.nanmin(los_index[..., 0]), np.nanmin(los_index[..., 1])])
+        los_extent = np.append(los_extent, [np.nanmax(los_index[..., 0]), np.nanmax(los_index[..., 1])])
+        if not np.all(np.isfinite(los_extent)):
+            los_extent = np.zeros(4)
+        # one cell margin, window has at least 2x2 cells
+        row_min = int(np.clip(np.floor(los_extent[0]) - 1, 0, self.dtm_image.nb_rows - 2))
+        col_min = int(np.clip(np.floor(los_extent[1]) - 1, 0, self.dtm_image.nb_columns - 2))
+        row_max = int(np.clip(np.ceil(los_extent[2]) + 2, row_min + 2, self.dtm_image.nb_rows))
+        col_max = int(np.clip(np.ceil(los_extent[3]) + 2, col_min + 2, self.dtm_image.nb_columns))
+
+        if (
+            self.window is None
+            or row_min < self.window[0]
+            or col_min < self.window[1]
+            or row_max > self.window[0] + self.window[2]
+            or col_max > self.window[1] + self.window[3]
+        ):
+            # pylint: disable=logging-too-many-args
+            logging.debug("load DTM window %d %d %d %d", row_min, col_min, row_max, col_max)
+            self.window = [row_min, col_min, row_max - row_min, col_max - col_min]
+            self.alt_data = self.dtm_image.read_window(*self.window)
+            self.init_min_max()
+            self.init_min_max_pyramid()
+            # window cube is bounded by the altitudes lines of sight are built from
+            self.window_plane_coef_d = np.array(
+                [0.0, self.window[2] - 1.0, 0.0, self.window[3] - 1.0, self.alt_min, self.alt_max]
+            )
+        return np.array([self.window[0], self.window[1], 0.0])
+
     def eq_plan(self, i, position):
         """
         return evaluation of equation on a plane on DTM cube
@@ -215,8 +583,9 @@ class DTMIntersection:
         :rtype array (nx2 or nx3)
         """
         vect_dtms = vect_ters.copy()
-        for i, vect_ter in enumerate(vect_ters):
-            vect_dtms[i, :] = self.ter_to_index(vect_ter)
+        (vect_dtms[:, 0], vect_dtms[:, 1]) = self.dtm_image.transform_physical_point_to_index(
+            vect_ters[:, 1], vect_ters[:, 0]
+        )
         return vect_dtms
 
     def index_to_ter(self, vect_dtm):
@@ -232,6 +601,21 @@ class DTMIntersection:
         (vect_ter[1], vect_ter[0]) = self.dtm_image.transform_index_to_physical_point(vect_dtm[0], vect_dtm[1])
         return vect_ter
 
+    def indexs_to_ters(self, vect_dtms):
+        """
+        index to terrain conversion
+
+        :param vect_dtms: index coordinates (col,row)
+        :type vect_dtms: array (nx2 or nx3) if dimension is 3 , last coordinates is unchanged (alt)
+        :return terrain coordinates (lon,lat)
+        :rtype array (nx2 or nx3)
+        """
+        vect_ters = vect_dtms.copy()
+        (vect_ters[:, 1], vect_ters[:, 0]) = self.dtm_image.transform_index_to_physical_point(
+            vect_dtms[:, 0], vect_dtms[:, 1]
+        )
+        return vect_ters
+
     def get_alt_offset(self, epsg):
         """
         returns min/amx altitude offset between dtm coordinates system and another one
@@ -266,6 +650,12 @@ class DTMIntersection:
         :return interpolated altitude
         :rtype float
         """
+        if self.tiled:
+            # read the cell used for interpolation
+            row_0 = int(np.clip(np.floor(pos_row), 0, self.dtm_image.nb_rows - 2))
+            col_0 = int(np.clip(np.floor(pos_col), 0, self.dtm_image.nb_columns - 2))
+            cell_data = self.dtm_image.read_window(row_0, col_0, 2, 2)
+            return interpol_bilin([cell_data[np.newaxis, :, :]], 2, 2, pos_row - row_0, pos_col - col_0)[0][0]
         alt = interpol_bilin(
             [self.alt_data[np.newaxis, :, :]], self.dtm_image.nb_rows, self.dtm_image.nb_columns, pos_row, pos_col
         )[0][0]
@@ -275,65 +665,71 @@ class DTMIntersection:
         """
         initialize min/max at each dtm cell
         """
-        column_nb_minus = self.dtm_image.nb_columns - 1
-        row_nb_minus = self.dtm_image.nb_rows - 1
-
-        self.alt_max_cell = np.zeros((row_nb_minus, column_nb_minus))
-        self.alt_min_cell = np.zeros((row_nb_minus, column_nb_minus))
-
         # Computation of the min and max altitudes of the DTM
-        n_min = 32000
-        n_max = -32000
-
-        for i in range(row_nb_minus):
-            k = 0
-            for j in range(column_nb_minus):
-                k += 1
-                d_alt_min = n_min
-                d_alt_max = n_max
-
-                d_z1 = self.alt_data[i, j]
-                if d_z1 < d_alt_min:
-                    d_alt_min = d_z1
-                if d_z1 > d_alt_max:
-                    d_alt_max = d_z1
-
-                d_z2 = self.alt_data[i, j + 1]
-                if d_z2 < d_alt_min:
-                    d_alt_min = d_z2
-                if d_z2 > d_alt_max:
-                    d_alt_max = d_z2
-
-                d_z3 = self.alt_data[i + 1, j]
-                if d_z3 < d_alt_min:
-                    d_alt_min = d_z3
-                if d_z3 > d_alt_max:
-                    d_alt_max = d_z3
-
-                d_z4 = self.alt_data[i + 1, j + 1]
-                if d_z4 < d_alt_min:
-                    d_alt_min = d_z4
-                if d_z4 > d_alt_max:
-                    d_alt_max = d_z4
-
-                # GDN Correction BUG Intersector
-                # It is important not to take the mathematical rounding for several reasons:
-                # 1. the subsequent algorithm does not always resist well when the mesh is flat,
-                #    it is therefore not recommended to output i_altmin = i_altmax
-                #    unless this is really the case in real values
-                # 2. the consecutive meshes must not be initialized in the same way by rounding
-                #   because if the min altitude of one corresponds to
-                # the max altitude of the other they must be distinguished
-                #     by a ceil and a floor so that the cubes overlap slightly in altitude
-                #    and not strictly contiguous
-                i_altmin = np.floor(d_alt_min)
-                i_altmax = np.ceil(d_alt_max)
-                self.alt_min_cell[i, j] = i_altmin
-                self.alt_max_cell[i, j] = i_altmax
+        # bounds are kept from the former cell by cell computation, nan values are ignored
+        n_min = 32000.0
+        n_max = -32000.0
+
+        cell_corners = (
+            self.alt_data[:-1, :-1],
+            self.alt_data[:-1, 1:],
+            self.alt_data[1:, :-1],
+            self.alt_data[1:, 1:],
+        )
+        d_alt_min = np.full(cell_corners[0].shape, n_min)
+        d_alt_max = np.full(cell_corners[0].shape, n_max)
+        for d_z in cell_corners:
+            np.fmin(d_alt_min, d_z, out=d_alt_min)
+            np.fmax(d_alt_max, d_z, out=d_alt_max)
+
+        # GDN Correction BUG Intersector
+        # It is important not to take the mathematical rounding for several reasons:
+        # 1. the subsequent algorithm does not always resist well when the mesh is flat,
+        #    it is therefore not recommended to output i_altmin = i_altmax
+        #    unless this is really the case in real values
+        # 2. the consecutive meshes must not be initialized in the same way by rounding
+        #   because if the min altitude of one corresponds to
+        # the max altitude of the other they must be distinguished
+        #     by a ceil and a floor so that the cubes overlap slightly in altitude
+        #    and not strictly contiguous
+        self.alt_min_cell = np.floor(d_alt_min)
+        self.alt_max_cell = np.ceil(d_alt_max)
+
+    def init_min_max_pyramid(self):
+        """
+        initialize the min/max pyramid of the dtm cells
 
-    # gitlab issue #56
-    # pylint: disable=too-many-branches
-    def intersect_dtm_cube(self, los):  # noqa: C901
+        level 0 is alt_min_cell/alt_max_cell, each cell of level k+1 gathers 2x2 cells of level k until a single
+        cell covers the whole dtm. It is used to skip blocks of cells above which the line of sight goes.
+        levels are flattened in alt_min_pyramid/alt_max_pyramid, level k begins at pyramid_offsets[k]
+        and has pyramid_shapes[k] shape.
+        """
+        level_min = self.alt_min_cell
+        level_max = self.alt_max_cell
+        levels_min = [level_min.ravel()]
+        levels_max = [level_max.ravel()]
+        shapes = [level_max.shape]
+        while level_max.shape[0] > 1 or level_max.shape[1] > 1:
+            (nb_rows, nb_cols) = level_max.shape
+            (nb_rows_up, nb_cols_up) = ((nb_rows + 1) // 2, (nb_cols + 1) // 2)
+            # odd sizes: last block row/col is padded with neutral values
+            padded_min = np.full((2 * nb_rows_up, 2 * nb_cols_up), np.inf)
+            padded_max = np.full((2 * nb_rows_up, 2 * nb_cols_up), -np.inf)
+            padded_min[:nb_rows, :nb_cols] = level_min
+            padded_max[:nb_rows, :nb_cols] = level_max
+            level_min = padded_min.reshape((nb_rows_up, 2, nb_cols_up, 2)).min(axis=(1, 3))
+            level_max = padded_max.reshape((nb_rows_up, 2, nb_cols_up, 2)).max(axis=(1, 3))
+            levels_min.append(level_min.ravel())
+            levels_max.append(level_max.ravel())
+            shapes.append(level_max.shape)
+
+        self.alt_min_pyramid = np.concatenate(levels_min)
+        self.alt_max_pyramid = np.concatenate(levels_max)
+        self.pyramid_shapes = np.array(shapes, dtype=np.int64)
+        self.pyramid_offsets = np.zeros(len(shapes), dtype=np.int64)
+        self.pyramid_offsets[1:] = np.cumsum(self.pyramid_shapes[:-1, 0] * self.pyramid_shapes[:-1, 1])
+
+    def intersect_dtm_cube(self, los):
         """
         DTM cube intersection
 
@@ -343,611 +739,988 @@ class DTMIntersection:
           (True,an intersection has been found ?, (lon,lat) of dtm position, altitude)
         :rtype tuple (bool, bool, numpy.array, float)
         """
-        # los: (n,3):
-        point_b = None
-        h_intersect = None
-        (coord_col_i, coord_row_i, coord_alt_i, alti_layer_i) = ([], [], [], [])
-        nbalt = los.shape[0]
         los_index = self.ters_to_indexs(los)
+        window_offset = self.prepare_window(los_index)
+        (b_trouve, point_dtm, h_intersect) = intersect_dtm_cube_numba(
+            los_index - window_offset,
+            self.plane_coef_a,
+            self.plane_coef_b,
+            self.plane_coef_c,
+            self.window_plane_coef_d,
+        )
+        if not b_trouve:
+            return True, b_trouve, None, None
+        # point_b is the terrain point (lon,lat)
+        point_b = self.index_to_ter(point_dtm + window_offset)
+        return True, b_trouve, point_b, h_intersect
+
+    def intersection(self, los, point_b, h_intersect):
+        """
+        DTM intersection
+
+        :param los :  line of sight
+        :type los : numpy.array
+        :param point_b :  position of intersection in DTM cube
+        :type point_b : numpy.array
+        :param h_intersect :  altitude in DTM cube
+        :type h_intersect : float
+        :return intersection information (True,an intersection has been found ?, position of intersection)
+        :rtype tuple (bool, bool, numpy.array)
+        """
+        los_index = self.ters_to_indexs(los)
+        point_b_dtm = self.ter_to_index(np.asarray(point_b, dtype=np.float64))
+        window_offset = self.prepare_window(los_index)
+        (b_trouve, point_r, __) = intersection_numba(
+            los_index - window_offset,
+            point_b_dtm - window_offset,
+            h_intersect,
+            self.alt_data,
+            self.alt_min_cell,
+            self.alt_max_cell,
+            self.alt_max_pyramid,
+            self.pyramid_offsets,
+            self.pyramid_shapes,
+            self.tol_z,
+        )
+        if b_trouve:
+            point_r = self.index_to_ter(point_r + window_offset)
+        return True, b_trouve, point_r
+
+    def intersection_n_los(self, los):
+        """
+        DTM intersection of several lines of sight at once
+
+        cube intersection and DTM intersection are computed by a compiled kernel in parallel on each line of sight,
+        lines of sight without intersection are set to numpy.nan
+
+        :param los :  lines of sight, each one sampled on the same number of altitudes (in decreasing order)
+        :type los : numpy.array of shape (number of los, number of altitudes, 3)
+        :return ground positions (lon,lat,h) in dtm coordinates system
+        :rtype numpy.ndarray 2D dimension with (N,3) shape, where N is number of lines of sight
+        """
+        (nb_los, nb_alt, __) = los.shape
+        los_index = self.ters_to_indexs(los.reshape((nb_los * nb_alt, 3))).reshape((nb_los, nb_alt, 3))
+        points_dtm = np.empty((nb_los, 3))
+        # in tiled mode, lines of sight are intersected by groups so that the loaded window stays bounded
+        for group in self.split_los(los_index):
+            window_offset = self.prepare_window(los_index[group])
+            points_dtm[group] = (
+                intersection_n_los_numba(
+                    los_index[group] - window_offset,
+                    self.plane_coef_a,
+                    self.plane_coef_b,
+                    self.plane_coef_c,
+                    self.window_plane_coef_d,
+                    self.alt_data,
+                    self.alt_min_cell,
+                    self.alt_max_cell,
+                    self.alt_max_pyramid,
+                    self.pyramid_offsets,
+                    self.pyramid_shapes,
+                    self.tol_z,
+                )
+                + window_offset
+            )
+        return self.indexs_to_ters(points_dtm)
+
+
+@njit("f8(f8[:, :], f8, f8)", cache=True)
+def interpolate_numba(alt_data, pos_row, pos_col):
+    """
+    bilinear interpolation of the DTM, same as shareloc.math_utils.interpol_bilin on a single layer
+    if interpolation is done outside DTM the penultimate index is used (or first if position is negative).
+
+    :param alt_data: DTM altitudes
+    :type alt_data: 2D np.array dtype np.float64
+    :param pos_row: cell position row
+    :type pos_row: float 64
+    :param pos_col: cell position col
+    :type pos_col: float 64
+    :return: interpolated altitude
+    :rtype: float 64
+    """
+    (nb_rows, nb_cols) = alt_data.shape
+    if pos_row < 0:
+        lower_shift_row = 0
+    elif pos_row >= nb_rows - 1:
+        lower_shift_row = nb_rows - 2
+    else:
+        lower_shift_row = int(np.floor(pos_row))
+    upper_shift_row = lower_shift_row + 1
+
+    if pos_col < 0:
+        lower_shift_col = 0
+    elif pos_col >= nb_cols - 1:
+        lower_shift_col = nb_cols - 2
+    else:
+        lower_shift_col = int(np.floor(pos_col))
+    upper_shift_col = lower_shift_col + 1
+
+    col_shift = pos_col - lower_shift_col
+    row_shift = pos_row - lower_shift_row
+    return (
+        (1 - col_shift) * (1 - row_shift) * alt_data[lower_shift_row, lower_shift_col]
+        + col_shift * (1 - row_shift) * alt_data[lower_shift_row, upper_shift_col]
+        + (1 - col_shift) * row_shift * alt_data[upper_shift_row, lower_shift_col]
+        + col_shift * row_shift * alt_data[upper_shift_row, upper_shift_col]
+    )
+
+
+# gitlab issue #56
+# pylint: disable=too-many-branches
+@njit(
+    "Tuple((b1, f8[:], f8))(f8[:, :], f8[:], f8[:], f8[:], f8[:])",
+    cache=True,
+)
+def intersect_dtm_cube_numba(los_index, plane_coef_a, plane_coef_b, plane_coef_c, plane_coef_d):  # noqa: C901
+    """
+    DTM cube intersection of one line of sight, in DTM index coordinates
+
+    :param los_index: line of sight in index coordinates (row, col, alt)
+    :type los_index: 2D np.array (number of altitudes, 3) dtype np.float64
+    :param plane_coef_a: first coefficient of the 6 DTM cube planes equations
+    :type plane_coef_a: 1D np.array dtype np.float64
+    :param plane_coef_b: second coefficient of the 6 DTM cube planes equations
+    :type plane_coef_b: 1D np.array dtype np.float64
+    :param plane_coef_c: third coefficient of the 6 DTM cube planes equations
+    :type plane_coef_c: 1D np.array dtype np.float64
+    :param plane_coef_d: constant of the 6 DTM cube planes equations
+    :type plane_coef_d: 1D np.array dtype np.float64
+    :return: (an intersection has been found ?, first intersection with the cube in index coordinates,
+        h interpolation index along the line of sight (not integer))
+    :rtype: Tuple(bool, 1D np.array, float 64)
+    """
+    coord_col_i = np.zeros(6)
+    coord_row_i = np.zeros(6)
+    coord_alt_i = np.zeros(6)
+    alti_layer_i = np.zeros(6)
+    nbalt = los_index.shape[0]
+    # -----------------------------------------------------------------------
+    # Number of valid intersections found
+    nbi = 0
+    # -----------------------------------------------------------------------
+    # We loop on the 6 planes of the DTM cube
+    for plane_index in range(6):
+        # -----------------------------------------------------------------------
+        # Init the vertex of the geometric line of sight
+        los_hat = los_index[0, :]
         # -----------------------------------------------------------------------
-        # Number of valid intersections found
-        nbi = 0
+        # Init position parallel to the plane
+        los_hat_onplane = (
+            plane_coef_a[plane_index] * los_hat[0]
+            + plane_coef_b[plane_index] * los_hat[1]
+            + plane_coef_c[plane_index] * los_hat[2]
+            - plane_coef_d[plane_index]
+        )
         # -----------------------------------------------------------------------
-        # We loop on the 6 planes of the DTM cube
-        for plane_index in range(6):
+        # Loop on line of sight segments
+        # and control if we cross or not the current face plane_index of DTM cube
+        for alti_layer in range(nbalt):
+            # -----------------------------------------------------------------------
+            # Transfer point B into point A
+            los_a = los_hat_onplane
+            s_a = los_hat
             # -----------------------------------------------------------------------
-            # Init the vertex of the geometric line of sight
-            los_hat = los_index[0, :]
+            # Reinit point B
+            los_hat = los_index[alti_layer, :]  # we iterate on different los points
             # -----------------------------------------------------------------------
             # Init position parallel to the plane
-            # print self.plans[plane_index,:-1]
-            # los_hat_onplane = (self.plans[plane_index,:-1]*los_hat).sum() - self.d[plane_index]
-            # print los_hat_onplane
-            los_hat_onplane = self.eq_plan(plane_index, los_hat)
+            los_hat_onplane = (
+                plane_coef_a[plane_index] * los_hat[0]
+                + plane_coef_b[plane_index] * los_hat[1]
+                + plane_coef_c[plane_index] * los_hat[2]
+                - plane_coef_d[plane_index]
+            )
             # -----------------------------------------------------------------------
-            # Loop on line of sight segments
-            # and control if we cross or not the current face plane_index of DTM cube
-            for alti_layer in range(nbalt):
-                # -----------------------------------------------------------------------
-                # Transfer point B into point A
-                los_a = los_hat_onplane
-                s_a = los_hat.copy()
+            # Intersection test: los_a and los_hat_onplane with opposite sign
+            if los_a * los_hat_onplane <= 0:
+                # if los_a and los_hat_onplane are null there are too many solutions (A and B on the same plane),
+                # A is kept
                 # -----------------------------------------------------------------------
-                # Reinit point B
-                los_hat = los_index[alti_layer, :]  # we iterate on different los points
-                # print los_hat
+                if los_a == 0:
+                    # A is solution (it is on the same plane)
+                    coord_col_i[nbi] = s_a[0]
+                    coord_row_i[nbi] = s_a[1]
+                    coord_alt_i[nbi] = s_a[2]
+                    alti_layer_i[nbi] = alti_layer - 1
                 # -----------------------------------------------------------------------
-                # Init position parallel to the plane
-                los_hat_onplane = self.eq_plan(plane_index, los_hat)
-                # print 'posAposB',los_a,los_hat_onplane
+                elif los_hat_onplane == 0:
+                    # B is solution (it is on the same plane)
+                    coord_col_i[nbi] = los_hat[0]
+                    coord_row_i[nbi] = los_hat[1]
+                    coord_alt_i[nbi] = los_hat[2]
+                    alti_layer_i[nbi] = alti_layer
                 # -----------------------------------------------------------------------
-                # Intersection test: los_a and los_hat_onplane with opposite sign
-                if los_a * los_hat_onplane <= 0:
-                    if not los_a and not los_hat_onplane:
-                        # Too many solutions !! (A and B on the same plane) # How to deal with it ?
-                        logging.warning("too many solutions in DTM intersection")
+                else:
                     # -----------------------------------------------------------------------
-                    if not los_a:
-                        # A is solution (it is on the same plane)
-                        coord_col_i.append(s_a[0])
-                        coord_row_i.append(s_a[1])
-                        coord_alt_i.append(s_a[2])
-                        alti_layer_i.append(alti_layer - 1)
+                    # A and B are on either side of the plane
+                    # Intersection interpolation coefficients between A and B
+                    interp_coef_a = los_hat_onplane / (los_hat_onplane - los_a)
+                    interp_coef_b = -los_a / (los_hat_onplane - los_a)
+                    # Assignment or interpolation
+                    # NB : to avoid test problems
+                    #      <BeOnCube> (see further)
+                    # . coordinate <u> (line)
                     # -----------------------------------------------------------------------
-                    elif not los_hat_onplane:
-                        # B is solution (it is on the same plane)
-                        coord_col_i.append(los_hat[0])
-                        coord_row_i.append(los_hat[1])
-                        coord_alt_i.append(los_hat[2])
-                        alti_layer_i.append(alti_layer)
+                    if plane_index < 2:
+                        coord_col_i[nbi] = plane_coef_d[plane_index]
                     # -----------------------------------------------------------------------
                     else:
-                        # -----------------------------------------------------------------------
-                        # A and B are on either side of the plane
-                        # Intersection interpolation coefficients between A and B
-                        interp_coef_a = los_hat_onplane / (los_hat_onplane - los_a)
-                        interp_coef_b = -los_a / (los_hat_onplane - los_a)
-                        # Assignment or interpolation
-                        # NB : to avoid test problems
-                        #      <BeOnCube> (see further)
-                        # . coordinate <u> (line)
-                        # -----------------------------------------------------------------------
-                        if plane_index < 2:
-                            coord_col_i.append(self.plane_coef_d[plane_index])
-                        # -----------------------------------------------------------------------
-                        else:
-                            coord_col_i.append(interp_coef_a * s_a[0] + interp_coef_b * los_hat[0])
-                        # -----------------------------------------------------------------------
-                        # . coordinate <v> (column)
-                        if 1 < plane_index < 4:
-                            coord_row_i.append(self.plane_coef_d[plane_index])
-                        else:
-                            coord_row_i.append(interp_coef_a * s_a[1] + interp_coef_b * los_hat[1])
-                        # -----------------------------------------------------------------------
-                        # . coordinate <z> (altitude)
-                        if plane_index > 3:
-                            coord_alt_i.append(self.plane_coef_d[plane_index])
-                        # -----------------------------------------------------------------------
-                        else:
-                            coord_alt_i.append(interp_coef_a * s_a[2] + interp_coef_b * los_hat[2])
-                        # . coordinate <h> (line of sight  x-axis)
-                        alti_layer_i.append(alti_layer - interp_coef_a)  # index non entier de l'intersection
+                        coord_col_i[nbi] = interp_coef_a * s_a[0] + interp_coef_b * los_hat[0]
                     # -----------------------------------------------------------------------
-                    # Incrementing the number of intersections found
-                    nbi += 1
+                    # . coordinate <v> (column)
+                    if 1 < plane_index < 4:
+                        coord_row_i[nbi] = plane_coef_d[plane_index]
+                    else:
+                        coord_row_i[nbi] = interp_coef_a * s_a[1] + interp_coef_b * los_hat[1]
                     # -----------------------------------------------------------------------
-                    # Switch to the next face of the cube
-                    break
-
-        # -----------------------------------------------------------------------
-        # Sorting points along line of sight (there are at least two)
-        # Arrange them in ascending and descending order.
-        for alti_layer in range(nbi):
+                    # . coordinate <z> (altitude)
+                    if plane_index > 3:
+                        coord_alt_i[nbi] = plane_coef_d[plane_index]
+                    # -----------------------------------------------------------------------
+                    else:
+                        coord_alt_i[nbi] = interp_coef_a * s_a[2] + interp_coef_b * los_hat[2]
+                    # . coordinate <h> (line of sight  x-axis)
+                    alti_layer_i[nbi] = alti_layer - interp_coef_a  # non integer index of the intersection
+                # -----------------------------------------------------------------------
+                # Incrementing the number of intersections found
+                nbi += 1
+                # -----------------------------------------------------------------------
+                # Switch to the next face of the cube
+                break
+
+    # -----------------------------------------------------------------------
+    # Sorting points along line of sight (there are at least two)
+    # Arrange them in ascending and descending order.
+    for alti_layer in range(nbi):
+        for next_alti_layer in range(alti_layer + 1, nbi):
+            if alti_layer_i[next_alti_layer] < alti_layer_i[alti_layer]:
+                dtmp = coord_col_i[alti_layer]
+                coord_col_i[alti_layer] = coord_col_i[next_alti_layer]
+                coord_col_i[next_alti_layer] = dtmp
+                dtmp = coord_row_i[alti_layer]
+                coord_row_i[alti_layer] = coord_row_i[next_alti_layer]
+                coord_row_i[next_alti_layer] = dtmp
+                dtmp = coord_alt_i[alti_layer]
+                coord_alt_i[alti_layer] = coord_alt_i[next_alti_layer]
+                coord_alt_i[next_alti_layer] = dtmp
+                dtmp = alti_layer_i[alti_layer]
+                alti_layer_i[alti_layer] = alti_layer_i[next_alti_layer]
+                alti_layer_i[next_alti_layer] = dtmp
+
+    # -----------------------------------------------------------------------
+    # Filtering points not located on the cube
+    alti_layer = 0
+    while alti_layer < nbi:
+        # test inside the cube
+        test_on_cube = (
+            (coord_col_i[alti_layer] >= plane_coef_d[0])
+            and (coord_col_i[alti_layer] <= plane_coef_d[1])
+            and (coord_row_i[alti_layer] >= plane_coef_d[2])
+            and (coord_row_i[alti_layer] <= plane_coef_d[3])
+            and (coord_alt_i[alti_layer] >= plane_coef_d[4])
+            and (coord_alt_i[alti_layer] <= plane_coef_d[5])
+        )
+        if not test_on_cube:
+            # We translate all the following points (we overwrite this invalid point)
             for next_alti_layer in range(alti_layer + 1, nbi):
-                if alti_layer_i[next_alti_layer] < alti_layer_i[alti_layer]:
-                    dtmp = coord_col_i[alti_layer]
-                    coord_col_i[alti_layer] = coord_col_i[next_alti_layer]
-                    coord_col_i[next_alti_layer] = dtmp
-                    dtmp = coord_row_i[alti_layer]
-                    coord_row_i[alti_layer] = coord_row_i[next_alti_layer]
-                    coord_row_i[next_alti_layer] = dtmp
-                    dtmp = coord_alt_i[alti_layer]
-                    coord_alt_i[alti_layer] = coord_alt_i[next_alti_layer]
-                    coord_alt_i[next_alti_layer] = dtmp
-                    dtmp = alti_layer_i[alti_layer]
-                    alti_layer_i[alti_layer] = alti_layer_i[next_alti_layer]
-                    alti_layer_i[next_alti_layer] = dtmp
+                coord_col_i[next_alti_layer - 1] = coord_col_i[next_alti_layer]
+                coord_row_i[next_alti_layer - 1] = coord_row_i[next_alti_layer]
+                coord_alt_i[next_alti_layer - 1] = coord_alt_i[next_alti_layer]
+                alti_layer_i[next_alti_layer - 1] = alti_layer_i[next_alti_layer]
+            nbi -= 1
+        else:
+            alti_layer += 1
+
+    point_dtm = np.zeros(3)
+    # -----------------------------------------------------------------------
+    # No solution if 0 or 1 single point is found (we have tangent to the cube)
+    if nbi < 2:
+        return False, point_dtm, np.nan
+    # -----------------------------------------------------------------------
+    # There are only 2 points left so we cross the cube
+    # LAIG-FA-MAJA-2168-CNES: no more filtering on identical points. There may be a number of points > 2
+    # point_dtm is the first intersection with the cube (line, column)
+    point_dtm[0] = coord_col_i[0]
+    point_dtm[1] = coord_row_i[0]
+    point_dtm[2] = coord_alt_i[0]
+    # h_intersect is the h interpolation index (not integer)
+    return True, point_dtm, alti_layer_i[0]
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+@njit(
+    "Tuple((b1, f8, i8, i8))(f8[:], f8[:], f8, f8, f8, i8, i8, i8, i8, f8[:], i8[:], i8[:, :])",
+    cache=True,
+)
+def skip_empty_blocks(
+    p_2,
+    los_dtm,
+    col_0,
+    row_0,
+    z_0,
+    col_c,
+    row_c,
+    n_row,
+    n_col,
+    alt_max_pyramid,
+    pyramid_offsets,
+    pyramid_shapes,
+):
+    """
+    Find the biggest block of the DTM max altitudes pyramid containing the current cell which is entirely
+    under the line of sight segment, and move to its exit point.
+    The line of sight goes above every cell of such a block, so they can not be intersected.
+
+    :param p_2: entry point in the current cell (index coordinates), updated to the block exit point
+    :type p_2: 1D np.array dtype np.float64
+    :param los_dtm: current line of sight segment
+    :type los_dtm: 1D np.array dtype np.float64
+    :param col_0: first index of the segment origin
+    :type col_0: float 64
+    :param row_0: second index of the segment origin
+    :type row_0: float 64
+    :param z_0: altitude of the segment origin
+    :type z_0: float 64
+    :param col_c: first index of current cell
+    :type col_c: int
+    :param row_c: second index of current cell
+    :type row_c: int
+    :param n_row: DTM first dimension size
+    :type n_row: int
+    :param n_col: DTM second dimension size
+    :type n_col: int
+    :param alt_max_pyramid: flattened levels of DTM cells max altitudes pyramid
+    :type alt_max_pyramid: 1D np.array dtype np.float64
+    :param pyramid_offsets: first index of each pyramid level in alt_max_pyramid
+    :type pyramid_offsets: 1D np.array dtype np.int64
+    :param pyramid_shapes: shape of each pyramid level
+    :type pyramid_shapes: 2D np.array (number of levels, 2) dtype np.int64
+    :return: (a block has been skipped ?, line of sight x-axis of the exit point, first index of the next cell,
+        second index of the next cell)
+    :rtype: Tuple(bool, float 64, int, int)
+    """
+    best_level = 0
+    (a_exit, a_col, a_row) = (0.0, 0.0, 0.0)
+    (col_min, col_max, row_min, row_max) = (0, 0, 0, 0)
+    # level 0 (single cell) is handled by the cell by cell search
+    for level in range(1, pyramid_offsets.shape[0]):
+        block_size = 1 << level
+        block_col = col_c >> level
+        block_row = row_c >> level
+        block_max = alt_max_pyramid[pyramid_offsets[level] + block_col * pyramid_shapes[level, 1] + block_row]
+        if p_2[2] <= block_max:
+            break
+
+        # block exit along each axis
+        level_col_min = block_col * block_size
+        level_col_max = min(level_col_min + block_size, n_row - 1)
+        level_row_min = block_row * block_size
+        level_row_max = min(level_row_min + block_size, n_col - 1)
+        level_a_col = np.inf
+        if los_dtm[0] > 0:
+            level_a_col = (level_col_max - col_0) / los_dtm[0]
+        elif los_dtm[0] < 0:
+            level_a_col = (level_col_min - col_0) / los_dtm[0]
+        level_a_row = np.inf
+        if los_dtm[1] > 0:
+            level_a_row = (level_row_max - row_0) / los_dtm[1]
+        elif los_dtm[1] < 0:
+            level_a_row = (level_row_min - row_0) / los_dtm[1]
+        level_a_exit = min(level_a_col, level_a_row)
+
+        # the block exit has to be on the current segment and above the block
+        if level_a_exit >= 1.0 or z_0 + level_a_exit * los_dtm[2] <= block_max:
+            break
+
+        best_level = level
+        (a_exit, a_col, a_row) = (level_a_exit, level_a_col, level_a_row)
+        (col_min, col_max, row_min, row_max) = (level_col_min, level_col_max, level_row_min, level_row_max)
+
+    if best_level == 0:
+        return False, 0.0, col_c, row_c
+
+    p_2[0] = col_0 + a_exit * los_dtm[0]
+    p_2[1] = row_0 + a_exit * los_dtm[1]
+    p_2[2] = z_0 + a_exit * los_dtm[2]
+    if a_col <= a_row:
+        if los_dtm[0] > 0:
+            p_2[0] = col_max
+            col_c = col_max
+        else:
+            p_2[0] = col_min
+            col_c = col_min - 1
+    else:
+        col_c = int(np.floor(p_2[0]))
+        if (p_2[0] == col_c) and (los_dtm[0] < 0):
+            col_c -= 1
+    if a_row <= a_col:
+        if los_dtm[1] > 0:
+            p_2[1] = row_max
+            row_c = row_max
+        else:
+            p_2[1] = row_min
+            row_c = row_min - 1
+    else:
+        row_c = int(np.floor(p_2[1]))
+        if (p_2[1] == row_c) and (los_dtm[1] < 0):
+            row_c -= 1
+    return True, a_exit, col_c, row_c
+
+
+# gitlab issue #56
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-nested-blocks
+# pylint: disable=too-many-statements
+# pylint: disable=too-many-arguments
+@njit(
+    "Tuple((b1, f8[:], i8))(f8[:, :], f8[:], f8, f8[:, :], f8[:, :], f8[:, :], f8[:], i8[:], i8[:, :], f8)",
+    cache=True,
+)
+def intersection_numba(  # noqa: C901
+    los_index,
+    point_b_dtm,
+    h_intersect,
+    alt_data,
+    alt_min_cell,
+    alt_max_cell,
+    alt_max_pyramid,
+    pyramid_offsets,
+    pyramid_shapes,
+    tol_z,
+):
+    """
+    DTM intersection of one line of sight, in DTM index coordinates
+
+    :param los_index: line of sight in index coordinates (row, col, alt)
+    :type los_index: 2D np.array (number of altitudes, 3) dtype np.float64
+    :param point_b_dtm: position of intersection in DTM cube in index coordinates
+    :type point_b_dtm: 1D np.array dtype np.float64
+    :param h_intersect: h interpolation index of point_b_dtm along the line of sight
+    :type h_intersect: float 64
+    :param alt_data: DTM altitudes
+    :type alt_data: 2D np.array dtype np.float64
+    :param alt_min_cell: min altitude of each DTM cell
+    :type alt_min_cell: 2D np.array dtype np.float64
+    :param alt_max_cell: max altitude of each DTM cell
+    :type alt_max_cell: 2D np.array dtype np.float64
+    :param alt_max_pyramid: flattened levels of DTM cells max altitudes pyramid
+    :type alt_max_pyramid: 1D np.array dtype np.float64
+    :param pyramid_offsets: first index of each pyramid level in alt_max_pyramid
+    :type pyramid_offsets: 1D np.array dtype np.int64
+    :param pyramid_shapes: shape of each pyramid level
+    :type pyramid_shapes: 2D np.array (number of levels, 2) dtype np.int64
+    :param tol_z: altitude tolerance of the intersection
+    :type tol_z: float 64
+    :return: (an intersection has been found ?, position of intersection in index coordinates,
+        number of DTM cells searched for the intersection)
+    :rtype: Tuple(bool, 1D np.array, int)
+    """
+    point_r = np.zeros(3)
+    nb_cells = 0
+    npl = los_index.shape[0]
+    p_1 = point_b_dtm.copy()
+
+    h_intersect_p1 = h_intersect
+
+    (n_row, n_col) = alt_data.shape
+
+    # 1 - Init and preliminary tests
+    #   1.1 - Test if the vertex is above the DTM
+    #       - Compute DTM altitude ? vertex position
+    alti_1 = interpolate_numba(alt_data, p_1[0], p_1[1])
+    #       - Compute the altitude difference to the DTM
+    d_alti_1 = p_1[2] - alti_1
+
+    #       - Test if the new top point is above the DTM
+    if d_alti_1 < 0:
+        #       - The Point is below the DTM
+        #          . means that the line of sight goes into the DTM by the side
+        #          . then below, no solution.
+        return False, point_r, nb_cells
+
+    #   1.2 - Init the rank of the first vertex of the line of sight
+    i_0 = int(np.floor(h_intersect_p1))
+
+    #   1.3 - Init the starting point (in p_2)
+    p_2 = point_b_dtm.copy()
+    h_intersect_p2 = h_intersect
+
+    # 2. - Loop on the grid planes
+    while i_0 < (npl - 1):
+        # 2.1 - Init current vertex of line of sight
+        col_0 = los_index[i_0, 0]
+        row_0 = los_index[i_0, 1]
+        z_0 = los_index[i_0, 2]
+        z_1 = los_index[i_0 + 1, 2]
+
+        # 2.2 - Init line of sight DTM
+        los_dtm = los_index[i_0 + 1] - los_index[i_0]
+
+        # 2.3 - Test if line of sight is vertical
+        if los_dtm[0] == 0 and los_dtm[1] == 0:
+            # 2.3.1 - LOS is  vertical:
+            #    - Compute DTM altitude ? vertex position
+            alti_1 = interpolate_numba(alt_data, col_0, row_0)
+
+            #    Test if the next plane is above DTM
+            if los_index[i_0 + 1, 2] <= alti_1:
+                # Init exit point
+                p_1[0] = col_0
+                p_1[1] = row_0
+                p_1[2] = alti_1
+                return True, p_1, nb_cells
+            # Positioning on next vertex
+            i_0 += 1
+        else:
+            # 2.3.2 - LOS is not vertical :
+            #         it will fly over the DTM
+            #         . we can continue
+            #         . remains to demonstrate that the LOS will crash on DTM...
+            #
+            # Init starting point
+            # Init its LOS x-axis
+            a_2 = h_intersect_p2 - i_0
+
+            # Fixed an FA DG 10 bug, when  resetting, a_2 value can be 1
+            # Which has the consequence of jumping to the next segment of the LOS
+            # Thus, one can lose points on a slice of altitude
+            # To be sure to scan the aiming segment, we reset
+            # the starting point of the segment, i.e. a_2 = 0
+            if a_2 >= 1.0:
+                a_2 = 0.0
+
+            # Init first intersected mesh
+            #  - Init mesh index
+            col_c = int(np.floor(p_2[0]))
+            row_c = int(np.floor(p_2[1]))
+
+            # NB :    caution before to start:
+            #        . we put ourselves on the right side of the mesh
+            #        . in principle, you should not leave the DTM
+            # We enter from the bottom, the DTM mesh is the previous one
+            if (p_2[0] == col_c) and (los_dtm[0] < 0):
+                col_c -= 1
+
+            # We enter from the left, the DTM mesh is the previous one
+            if (p_2[1] == row_c) and (los_dtm[1] < 0):
+                row_c -= 1
+
+            # LDD - We're already out of bounds, we stop
+            if not ((a_2 < 1) and -1 < col_c < (n_row - 1) and -1 < row_c < (n_col - 1)):
+                return False, point_r, nb_cells
+
+            # Iterative search loop of the intersected cell
+            while (a_2 < 1) and -1 < col_c < (n_row - 1) and -1 < row_c < (n_col - 1):
+                # - Jump over the biggest block of cells under the line of sight
+                (skipped, a_skip, col_skip, row_skip) = skip_empty_blocks(
+                    p_2,
+                    los_dtm,
+                    col_0,
+                    row_0,
+                    z_0,
+                    col_c,
+                    row_c,
+                    n_row,
+                    n_col,
+                    alt_max_pyramid,
+                    pyramid_offsets,
+                    pyramid_shapes,
+                )
+                if skipped:
+                    a_2 = a_skip
+                    col_c = col_skip
+                    row_c = row_skip
+                    continue
+                nb_cells += 1
+
+                # - Min and max altitudes of the mesh
+                h_i = alt_min_cell[col_c, row_c]
+                h_s = alt_max_cell[col_c, row_c]
+
+                # - Transfer: the low point becomes the high point
+                # a1 = a_2;
+                # p_1 becomes p_2
+                p_1 = p_2.copy()
+
+                # 4.2 - Determination of a new low point
+                #      - LOS orientation test
+                if los_dtm[0] == 0:
+                    # 4.2.1 - LOS is completely oriented  east-west
+                    #   p_2[0] = p_1[0] ; // useless, is already init
+                    #       - LOS orientation test
+                    if los_dtm[1] < 0:
+                        # 4.2.1.1 - LOS goes due west
+                        p_2[1] = row_c
+                        row_c -= 1
+                    else:
+                        # 4.2.1.2 - LOS goes due east
+                        row_c += 1
+                        p_2[1] = row_c
+
+                    a_2 = (p_2[1] - row_0) / los_dtm[1]
+                    p_2[2] = z_0 + a_2 * los_dtm[2]
+
+                elif los_dtm[1] == 0:
+                    # 4.2.2 - LOS is oriented north-south
+                    #  p_2[1] = p_1[1] ;
+                    #       - LOS orientation test
+                    if los_dtm[0] < 0:
+                        # 4.2.2.1 - LOS goes due north
+                        p_2[0] = col_c
+                        col_c -= 1
+                    else:
+                        # 4.2.2.2 - LOS goes due south
+                        col_c += 1
+                        p_2[0] = col_c
 
-        # -----------------------------------------------------------------------
-        # Filtering points not located on the cube
-        alti_layer = 0
-        while alti_layer < nbi:
-            # test inside the cube
-            test_on_cube = (
-                (coord_col_i[alti_layer] >= self.plane_coef_d[0])
-                and (coord_col_i[alti_layer] <= self.plane_coef_d[1])
-                and (coord_row_i[alti_layer] >= self.plane_coef_d[2])
-                and (coord_row_i[alti_layer] <= self.plane_coef_d[3])
-                and (coord_alt_i[alti_layer] >= self.plane_coef_d[4])
-                and (coord_alt_i[alti_layer] <= self.plane_coef_d[5])
-            )
-            if not test_on_cube:
-                # We translate all the following points (we overwrite this invalid point)
-                for next_alti_layer in range(alti_layer + 1, nbi):
-                    coord_col_i[next_alti_layer - 1] = coord_col_i[next_alti_layer]
-                    coord_row_i[next_alti_layer - 1] = coord_row_i[next_alti_layer]
-                    coord_alt_i[next_alti_layer - 1] = coord_alt_i[next_alti_layer]
-                    alti_layer_i[next_alti_layer - 1] = alti_layer_i[next_alti_layer]
-                nbi -= 1
-            else:
-                alti_layer += 1
-        # -----------------------------------------------------------------------
-        # No solution if 0 or 1 single point is found (we have tangent to the cube)
-        if nbi < 2:
-            b_trouve = False
-            return True, b_trouve, point_b, h_intersect
-        # -----------------------------------------------------------------------
-        # There are only 2 points left so we cross the cube
-        # LAIG-FA-MAJA-2168-CNES: no more filtering on identical points. There may be a number of points > 2
-        # Init the current point
-        # DTM coordinates
-        point_dtm = np.zeros(3)
-        point_dtm[0] = coord_col_i[0]
-        point_dtm[1] = coord_row_i[0]
-        point_dtm[2] = coord_alt_i[0]
-        # point_dtm is the first intersection with the cube (line, column)
-        # -----------------------------------------------------------------------
-        # h is gld 3D
-        h_intersect = alti_layer_i[0]
-        # h_intersect is the h interpolation index (not integer)
-        # -----------------------------------------------------------------------
-        # Terrain coordinates
-        point_b = self.index_to_ter(point_dtm)
-        # point_b is the terrain point (lon,lat)
-        # -----------------------------------------------------------------------
-        # End, return
-        b_trouve = True
-        return (True, b_trouve, point_b, h_intersect)
+                    a_2 = (p_2[0] - col_0) / los_dtm[0]
+                    p_2[2] = z_0 + a_2 * los_dtm[2]
+                else:
+                    # 4.2.3 - Any other LOS here
+                    #            - Determination of the exit side
+                    if (los_dtm[0] < 0) and (los_dtm[0] <= los_dtm[1]) and (los_dtm[0] <= -los_dtm[1]):
+                        # 4.2.3.1 - LOS is mainly oriented north
+                        #             - Intersect with north side
+                        a_2 = (col_c - col_0) / los_dtm[0]
+                        p_2[1] = row_0 + a_2 * los_dtm[1]
+
+                        if (p_2[1] > row_c) and (p_2[1] < (row_c + 1)):
+                            # LOS goes out by the north
+                            p_2[0] = col_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
 
-    # gitlab issue #56
-    # pylint: disable=too-many-locals
-    # pylint: disable=too-many-function-args
-    # pylint: disable=too-many-nested-blocks
-    # pylint: disable=too-many-statements
-    def intersection(self, los, point_b, h_intersect):  # noqa: C901
-        """
-        DTM intersection
+                        elif p_2[1] < row_c:
+                            # LOS goes out by the west
+                            a_2 = (row_c - row_0) / los_dtm[1]
+                            p_2[0] = col_0 + a_2 * los_dtm[0]
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            row_c -= 1
 
-        :param los :  line of sight
-        :type los : numpy.array
-        :param point_b :  position of intersection in DTM cube
-        :type point_b : numpy.array
-        :param h_intersect :  altitude in DTM cube
-        :type h_intersect : float
-        :return intersection information (True,an intersection has been found ?, position of intersection)
-        :rtype tuple (bool, bool, numpy.array)
-        """
-        los_index = self.ters_to_indexs(los)
-        point_b_dtm = self.ter_to_index(point_b)
-        point_r = np.zeros(3)
-        (npl, _) = los.shape
-        alti = np.arange(npl, -1.0, -1.0)
-        p_1 = point_b_dtm.copy()  # [p_1[0],p_1[1],p_1[2]]
-
-        h_intersect_p1 = h_intersect
-
-        n_row = self.dtm_image.nb_rows
-        n_col = self.dtm_image.nb_columns
-
-        # 1 - Init and preliminary tests
-        #   1.1 - Test if the vertex is above the DTM
-        #       - Compute DTM altitude ? vertex position
-        alti_1 = self.interpolate(p_1[0], p_1[1])
-        #       - Compute the altitude difference to the DTM
-        d_alti_1 = p_1[2] - alti_1
-
-        #       - Test if the new top point is above the DTM
-        if d_alti_1 < 0:
-            #       - The Point is below the DTM
-            #          . means that the line of sight goes into the DTM by the side
-            #          . then below, no solution.
-            b_trouve = False
-            return True, b_trouve, point_r
-
-        #   1.2 - Init the rank of the first vertex of the line of sight
-        i_0 = int(np.floor(h_intersect_p1))
-
-        #   1.3 - Init the starting point (in p_2)
-        p_2 = point_b_dtm.copy()
-        h_intersect_p2 = h_intersect
-
-        nb_planes = los_index.shape[0]
-        # 2. - Loop on the grid planes
-        while i_0 < (nb_planes - 1):
-            # 2.1 - Init current vertex of line of sight
-            col_0 = los_index[i_0][0]
-            row_0 = los_index[i_0][1]
-            z_0 = los_index[i_0][2]
-            z_1 = los_index[i_0 + 1][2]
-
-            # 2.2 - Init line of sight DTM
-            los_dtm = los_index[i_0 + 1] - los_index[i_0]
-
-            # 2.3 - Test if line of sight is vertical
-            if los_dtm[0] == 0 and los_dtm[1] == 0:
-                # 2.3.1 - LOS is  vertical:
-                #    - Compute DTM altitude ? vertex position
-                alti_1 = self.interpolate(col_0, row_0)
-
-                #    Test if the next plane is above DTM
-                if los_index[i_0 + 1][2] <= alti_1:
-                    # Init exit point
-                    p_1[0] = col_0
-                    p_1[1] = row_0
-                    p_1[2] = alti_1
-                    b_trouve = True
-                    point_r = self.index_to_ter(p_1)
-                    return True, b_trouve, point_r
-                # Positioning on next vertex
-                i_0 += 1
-            else:
-                # 2.3.2 - LOS is not vertical :
-                #         it will fly over the DTM
-                #         . we can continue
-                #         . remains to demonstrate that the LOS will crash on DTM...
-                #
-                # Init starting point
-                # Init its LOS x-axis
-                a_2 = h_intersect_p2 - i_0
-
-                # Fixed an FA DG 10 bug, when  resetting, a_2 value can be 1
-                # Which has the consequence of jumping to the next segment of the LOS
-                # Thus, one can lose points on a slice of altitude
-                # To be sure to scan the aiming segment, we reset
-                # the starting point of the segment, i.e. a_2 = 0
-                if a_2 >= 1.0:
-                    a_2 = 0.0
-
-                # Init first intersected mesh
-                #  - Init mesh index
-                col_c = int(np.floor(p_2[0]))
-                row_c = int(np.floor(p_2[1]))
-
-                # NB :    caution before to start:
-                #        . we put ourselves on the right side of the mesh
-                #        . in principle, you should not leave the DTM
-                # We enter from the bottom, the DTM mesh is the previous one
-                if (p_2[0] == col_c) and (los_dtm[0] < 0):
-                    col_c -= 1
-
-                # We enter from the left, the DTM mesh is the previous one
-                if (p_2[1] == row_c) and (los_dtm[1] < 0):
-                    row_c -= 1
-
-                # LDD - We're already out of bounds, we stop
-                if not ((a_2 < 1) and -1 < col_c < (n_row - 1) and -1 < row_c < (n_col - 1)):
-                    b_trouve = False
-                    return True, b_trouve, point_r
-
-                # Iterative search loop of the intersected cell
-                while (a_2 < 1) and -1 < col_c < (n_row - 1) and -1 < row_c < (n_col - 1):
-                    # - Min and max altitudes of the mesh
-                    h_i = self.alt_min_cell[col_c, row_c]
-                    h_s = self.alt_max_cell[col_c, row_c]
-
-                    # - Transfer: the low point becomes the high point
-                    # a1 = a_2;
-                    # p_1 becomes p_2
-                    p_1 = p_2.copy()
-                    h_intersect_p1 = h_intersect_p2
-
-                    # 4.2 - Determination of a new low point
-                    #      - LOS orientation test
-                    if not los_dtm[0]:
-                        # 4.2.1 - LOS is completely oriented  east-west
-                        #   p_2[0] = p_1[0] ; // useless, is already init
-                        #       - LOS orientation test
-                        if los_dtm[1] < 0:
-                            # 4.2.1.1 - LOS goes due west
+                        elif p_2[1] > (row_c + 1):
+                            # LOS goes out by the east
+                            row_c += 1
+                            a_2 = (row_c - row_0) / los_dtm[1]
+                            p_2[0] = col_0 + a_2 * los_dtm[0]
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+
+                        elif p_2[1] == row_c:
+                            # LOS goes out by the north-west corner
+                            p_2[0] = col_c
                             p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
                             row_c -= 1
-                        else:
-                            # 4.2.1.2 - LOS goes due east
+
+                        elif p_2[1] == (row_c + 1):
+                            # LOS goes out by the north-east corner
+                            p_2[0] = col_c
                             row_c += 1
                             p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
 
-                        a_2 = (p_2[1] - row_0) / los_dtm[1]
-                        p_2[2] = z_0 + a_2 * los_dtm[2]
+                    elif (los_dtm[1] > 0) and (los_dtm[1] >= los_dtm[0]) and (los_dtm[1] >= -los_dtm[0]):
+                        # 4.2.3.2 - LOS is mainly oriented east
+                        #         - Intersect with east side
+                        a_2 = (row_c + 1 - row_0) / los_dtm[1]
+                        p_2[0] = col_0 + a_2 * los_dtm[0]
+
+                        if (p_2[0] > col_c) and (p_2[0] < (col_c + 1)):
+                            #  LOS goes out by the east
+                            row_c += 1
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
 
-                    elif not los_dtm[1]:
-                        # 4.2.2 - LOS is oriented north-south
-                        #  p_2[1] = p_1[1] ;
-                        #       - LOS orientation test
-                        if los_dtm[0] < 0:
-                            # 4.2.2.1 - LOS goes due north
+                        elif p_2[0] < col_c:
+                            # LOS goes out by the north
                             p_2[0] = col_c
+                            a_2 = (col_c - col_0) / los_dtm[0]
+                            p_2[1] = row_0 + a_2 * los_dtm[1]
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
                             col_c -= 1
-                        else:
-                            # 4.2.2.2 - LOS goes due south
+
+                        elif p_2[0] > (col_c + 1):
+                            # LOS goes out by the south
                             col_c += 1
                             p_2[0] = col_c
-
-                        a_2 = (p_2[0] - col_0) / los_dtm[0]
-                        p_2[2] = z_0 + a_2 * los_dtm[2]
-                    else:
-                        # 4.2.3 - Any other LOS here
-                        #            - Determination of the exit side
-                        if (los_dtm[0] < 0) and (los_dtm[0] <= los_dtm[1]) and (los_dtm[0] <= -los_dtm[1]):
-                            # 4.2.3.1 - LOS is mainly oriented north
-                            #             - Intersect with north side
                             a_2 = (col_c - col_0) / los_dtm[0]
                             p_2[1] = row_0 + a_2 * los_dtm[1]
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
 
-                            if (p_2[1] > row_c) and (p_2[1] < (row_c + 1)):
-                                # LOS goes out by the north
-                                p_2[0] = col_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-
-                            elif p_2[1] < row_c:
-                                # LOS goes out by the west
-                                a_2 = (row_c - row_0) / los_dtm[1]
-                                p_2[0] = col_0 + a_2 * los_dtm[0]
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                row_c -= 1
-
-                            elif p_2[1] > (row_c + 1):
-                                # LOS goes out by the east
-                                row_c += 1
-                                a_2 = (row_c - row_0) / los_dtm[1]
-                                p_2[0] = col_0 + a_2 * los_dtm[0]
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[1] == row_c:
-                                # LOS goes out by the north-west corner
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-                                row_c -= 1
-
-                            elif p_2[1] == (row_c + 1):
-                                # LOS goes out by the north-east corner
-                                p_2[0] = col_c
-                                row_c += 1
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-
-                        elif (los_dtm[1] > 0) and (los_dtm[1] >= los_dtm[0]) and (los_dtm[1] >= -los_dtm[0]):
-                            # 4.2.3.2 - LOS is mainly oriented east
-                            #         - Intersect with east side
-                            a_2 = (row_c + 1 - row_0) / los_dtm[1]
-                            p_2[0] = col_0 + a_2 * los_dtm[0]
+                        elif p_2[0] == col_c:
+                            # LOS goes out by the north-east corner
+                            row_c += 1
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
 
-                            if (p_2[0] > col_c) and (p_2[0] < (col_c + 1)):
-                                #  LOS goes out by the east
-                                row_c += 1
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[0] < col_c:
-                                # LOS goes out by the north
-                                p_2[0] = col_c
-                                a_2 = (col_c - col_0) / los_dtm[0]
-                                p_2[1] = row_0 + a_2 * los_dtm[1]
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-
-                            elif p_2[0] > (col_c + 1):
-                                # LOS goes out by the south
-                                col_c += 1
-                                p_2[0] = col_c
-                                a_2 = (col_c - col_0) / los_dtm[0]
-                                p_2[1] = row_0 + a_2 * los_dtm[1]
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[0] == col_c:
-                                # LOS goes out by the north-east corner
-                                row_c += 1
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-
-                            elif p_2[0] == (col_c + 1):
-                                # LOS goes out by the south-east corner
-                                col_c += 1
-                                row_c += 1
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                        elif (los_dtm[0] > 0) and (los_dtm[0] >= los_dtm[1]) and (los_dtm[0] >= -los_dtm[1]):
-                            # 4.2.3.3 - LOS is mainly oriented south
-                            #         - Intersect with south side
-                            a_2 = (col_c + 1 - col_0) / los_dtm[0]
-                            p_2[1] = row_0 + a_2 * los_dtm[1]
+                        elif p_2[0] == (col_c + 1):
+                            # LOS goes out by the south-east corner
+                            col_c += 1
+                            row_c += 1
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+
+                    elif (los_dtm[0] > 0) and (los_dtm[0] >= los_dtm[1]) and (los_dtm[0] >= -los_dtm[1]):
+                        # 4.2.3.3 - LOS is mainly oriented south
+                        #         - Intersect with south side
+                        a_2 = (col_c + 1 - col_0) / los_dtm[0]
+                        p_2[1] = row_0 + a_2 * los_dtm[1]
+
+                        if (p_2[1] > row_c) and (p_2[1] < (row_c + 1)):
+                            # LOS goes out by the south
+                            col_c += 1
+                            p_2[0] = col_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
 
-                            if (p_2[1] > row_c) and (p_2[1] < (row_c + 1)):
-                                # LOS goes out by the south
-                                col_c += 1
-                                p_2[0] = col_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[1] < row_c:
-                                # LOS goes out by the west
-                                a_2 = (row_c - row_0) / los_dtm[1]
-                                p_2[0] = col_0 + a_2 * los_dtm[0]
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                row_c -= 1
-
-                            elif p_2[1] > row_c + 1:
-                                # LOS goes out by the east
-                                row_c += 1
-                                a_2 = (row_c - row_0) / los_dtm[1]
-                                p_2[0] = col_0 + a_2 * los_dtm[0]
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[1] == row_c:
-                                # LOS goes out by the south-west corner
-                                col_c += 1
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                row_c -= 1
-
-                            elif p_2[1] == row_c + 1:
-                                # LOS goes out by the south-east corner
-                                col_c += 1
-                                row_c += 1
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                        elif (los_dtm[1] < 0) and (los_dtm[1] <= los_dtm[0]) and (los_dtm[1] <= -los_dtm[0]):
-                            #  4.2.3.4 - VLOS is mainly oriented west
-                            #          - Intersect with west side
+                        elif p_2[1] < row_c:
+                            # LOS goes out by the west
                             a_2 = (row_c - row_0) / los_dtm[1]
                             p_2[0] = col_0 + a_2 * los_dtm[0]
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            row_c -= 1
 
-                            if (p_2[0] > col_c) and (p_2[0] < col_c + 1):
-                                #  LOS goes out by the west
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                row_c -= 1
-
-                            elif p_2[0] < col_c:
-                                #  LOS goes out by the north
-                                p_2[0] = col_c
-                                a_2 = (col_c - col_0) / los_dtm[0]
-                                p_2[1] = row_0 + a_2 * los_dtm[1]
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-
-                            elif p_2[0] > (col_c + 1):
-                                #  LOS goes out by the south
-                                col_c += 1
-                                p_2[0] = col_c
-                                a_2 = (col_c - col_0) / los_dtm[0]
-                                p_2[1] = row_0 + a_2 * los_dtm[1]
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-
-                            elif p_2[0] == col_c:
-                                #  LOS goes out by the north-west corner
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                col_c -= 1
-                                row_c -= 1
-
-                            elif p_2[0] == (col_c + 1):
-                                #  LOS goes out by the south-west corner
-                                col_c += 1
-                                p_2[0] = col_c
-                                p_2[1] = row_c
-                                p_2[2] = z_0 + a_2 * los_dtm[2]
-                                row_c -= 1
-
-                    # LDD - min and max bounds of the "layer" Checking
-                    b_intersect = False
-
-                    if p_2[2] > z_0:
-                        # We've gone too high, and that's not good!!!
-                        b_intersect = not (((p_1[2] > h_s) and (z_0 > h_s)) or ((p_1[2] < h_i) and (z_0 < h_i)))
-
-                    elif p_2[2] < z_1:
-                        # We went too low, and that's not good either!!! (even if it already makes more sense)
-                        b_intersect = not (((p_1[2] > h_s) and (z_1 > h_s)) or ((p_1[2] < h_i) and (z_1 < h_i)))
+                        elif p_2[1] > row_c + 1:
+                            # LOS goes out by the east
+                            row_c += 1
+                            a_2 = (row_c - row_0) / los_dtm[1]
+                            p_2[0] = col_0 + a_2 * los_dtm[0]
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
 
-                    else:
-                        b_intersect = not (((p_1[2] > h_s) and (p_2[2] > h_s)) or ((p_1[2] < h_i) and (p_2[2] < h_i)))
-
-                    # 5. LOS intersection test with the cube
-
-                    if b_intersect:
-                        # There is intersection between LOS and the cube
-                        # 5.1 - DTM Altitudes
-                        alti_1 = self.interpolate(p_1[0], p_1[1])
-                        h_2 = self.interpolate(p_2[0], p_2[1])
-
-                        # 5.2 - Altitude differences with DTM
-                        d_alti_1 = p_1[2] - alti_1
-                        d_2 = p_2[2] - h_2
-
-                        # 5.3 - Intersection test with DTM
-                        if d_alti_1 * d_2 <= 0:
-                            # There is intersection between los and the DTM
-                            # 5.3.1 - Compute of approximate solution
-                            d_2 = 2 * self.tol_z  # Init d_2 > TOL_Z
-                            col_a = p_2[0]
-                            row_a = p_2[1]
-                            z_a = h_2
-
-                            while abs(d_2) > self.tol_z:
-                                # 5.3.1.1 - Linear interpolation coefficient of H
-                                c_h = (p_1[2] - alti_1) / ((h_2 - alti_1) - (p_2[2] - p_1[2]))
-
-                                # 5.3.1.2 - position of the interpolated point
-                                col_a = p_1[0] + c_h * (p_2[0] - p_1[0])
-                                row_a = p_1[1] + c_h * (p_2[1] - p_1[1])
-                                z_a = p_1[2] + c_h * (p_2[2] - p_1[2])
-
-                                # 5.3.1.3 - Altitude of the interpolated point
-                                z_v = self.interpolate(col_a, row_a)
-
-                                # 5.3.1.4 - Altitude difference of the interpolated point
-                                d_2 = z_v - z_a
-
-                                # 5.3.1.5 - Update
-                                if d_2 < 0:
-                                    # Update of the top point
-                                    p_1[0] = col_a
-                                    p_1[1] = row_a
-                                    p_1[2] = z_a
-                                    alti_1 = z_v
-
-                                else:
-                                    # Update of the low point
-                                    p_2[0] = col_a
-                                    p_2[1] = row_a
-                                    p_2[2] = z_a
-                                    h_2 = z_v
-
-                            # // End, return
-                            p_1[0] = col_a
-                            p_1[1] = row_a
-                            p_1[2] = z_a
-
-                            b_trouve = True
-                            point_r = self.index_to_ter(p_1)
-                            return True, b_trouve, point_r
-
-                # End loop on meshes
-
-                # Test if we are still in the DTM cube si on est toujours dans le cube DTM
-                if a_2 >= 1:
-                    logging.debug("Change of plane")
-                    # Change of plane
-                    i_0 += 1
-
-                    # Loading into p_2 of the new vertex
-                    p_2 = los_index[i_0].copy()
-                    h_intersect_p2 = alti[i_0]
+                        elif p_2[1] == row_c:
+                            # LOS goes out by the south-west corner
+                            col_c += 1
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            row_c -= 1
+
+                        elif p_2[1] == row_c + 1:
+                            # LOS goes out by the south-east corner
+                            col_c += 1
+                            row_c += 1
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+
+                    elif (los_dtm[1] < 0) and (los_dtm[1] <= los_dtm[0]) and (los_dtm[1] <= -los_dtm[0]):
+                        #  4.2.3.4 - VLOS is mainly oriented west
+                        #          - Intersect with west side
+                        a_2 = (row_c - row_0) / los_dtm[1]
+                        p_2[0] = col_0 + a_2 * los_dtm[0]
+
+                        if (p_2[0] > col_c) and (p_2[0] < col_c + 1):
+                            #  LOS goes out by the west
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            row_c -= 1
+
+                        elif p_2[0] < col_c:
+                            #  LOS goes out by the north
+                            p_2[0] = col_c
+                            a_2 = (col_c - col_0) / los_dtm[0]
+                            p_2[1] = row_0 + a_2 * los_dtm[1]
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
+
+                        elif p_2[0] > (col_c + 1):
+                            #  LOS goes out by the south
+                            col_c += 1
+                            p_2[0] = col_c
+                            a_2 = (col_c - col_0) / los_dtm[0]
+                            p_2[1] = row_0 + a_2 * los_dtm[1]
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+
+                        elif p_2[0] == col_c:
+                            #  LOS goes out by the north-west corner
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            col_c -= 1
+                            row_c -= 1
+
+                        elif p_2[0] == (col_c + 1):
+                            #  LOS goes out by the south-west corner
+                            col_c += 1
+                            p_2[0] = col_c
+                            p_2[1] = row_c
+                            p_2[2] = z_0 + a_2 * los_dtm[2]
+                            row_c -= 1
+
+                # LDD - min and max bounds of the "layer" Checking
+                b_intersect = False
+
+                if p_2[2] > z_0:
+                    # We've gone too high, and that's not good!!!
+                    b_intersect = not (((p_1[2] > h_s) and (z_0 > h_s)) or ((p_1[2] < h_i) and (z_0 < h_i)))
+
+                elif p_2[2] < z_1:
+                    # We went too low, and that's not good either!!! (even if it already makes more sense)
+                    b_intersect = not (((p_1[2] > h_s) and (z_1 > h_s)) or ((p_1[2] < h_i) and (z_1 < h_i)))
 
                 else:
+                    b_intersect = not (((p_1[2] > h_s) and (p_2[2] > h_s)) or ((p_1[2] < h_i) and (p_2[2] < h_i)))
+
+                # 5. LOS intersection test with the cube
+
+                if b_intersect:
+                    # There is intersection between LOS and the cube
+                    # 5.1 - DTM Altitudes
+                    alti_1 = interpolate_numba(alt_data, p_1[0], p_1[1])
+                    h_2 = interpolate_numba(alt_data, p_2[0], p_2[1])
+
+                    # 5.2 - Altitude differences with DTM
+                    d_alti_1 = p_1[2] - alti_1
+                    d_2 = p_2[2] - h_2
+
+                    # 5.3 - Intersection test with DTM
+                    if d_alti_1 * d_2 <= 0:
+                        # There is intersection between los and the DTM
+                        # 5.3.1 - Compute of approximate solution
+                        d_2 = 2 * tol_z  # Init d_2 > TOL_Z
+                        col_a = p_2[0]
+                        row_a = p_2[1]
+                        z_a = h_2
+
+                        while abs(d_2) > tol_z:
+                            # 5.3.1.1 - Linear interpolation coefficient of H
+                            c_h = (p_1[2] - alti_1) / ((h_2 - alti_1) - (p_2[2] - p_1[2]))
+
+                            # 5.3.1.2 - position of the interpolated point
+                            col_a = p_1[0] + c_h * (p_2[0] - p_1[0])
+                            row_a = p_1[1] + c_h * (p_2[1] - p_1[1])
+                            z_a = p_1[2] + c_h * (p_2[2] - p_1[2])
+
+                            # 5.3.1.3 - Altitude of the interpolated point
+                            z_v = interpolate_numba(alt_data, col_a, row_a)
+
+                            # 5.3.1.4 - Altitude difference of the interpolated point
+                            d_2 = z_v - z_a
+
+                            # 5.3.1.5 - Update
+                            if d_2 < 0:
+                                # Update of the top point
+                                p_1[0] = col_a
+                                p_1[1] = row_a
+                                p_1[2] = z_a
+                                alti_1 = z_v
+
+                            else:
+                                # Update of the low point
+                                p_2[0] = col_a
+                                p_2[1] = row_a
+                                p_2[2] = z_a
+                                h_2 = z_v
+
+                        # // End, return
+                        p_1[0] = col_a
+                        p_1[1] = row_a
+                        p_1[2] = z_a
+                        return True, p_1, nb_cells
+
+            # End loop on meshes
+
+            # Test if we are still in the DTM cube
+            if a_2 >= 1:
+                # Change of plane
+                i_0 += 1
 
-                    # LDD - We looped on the meshes, we found nothing and we did not reach the next plane
-                    # It means we're getting out of the grip, no need to continue
-                    b_trouve = False
-                    return True, b_trouve, point_r
-            # End of general case (LOS not vertical)
+                # Loading into p_2 of the new vertex
+                p_2 = los_index[i_0].copy()
+                h_intersect_p2 = float(npl - i_0)
 
-        # End loop on the vertices
-        # End, return
-        b_trouve = False
-        return True, b_trouve, point_r
+            else:
+                # LDD - We looped on the meshes, we found nothing and we did not reach the next plane
+                # It means we're getting out of the grip, no need to continue
+                return False, point_r, nb_cells
+        # End of general case (LOS not vertical)
+
+    # End loop on the vertices
+    # End, return
+    return False, point_r, nb_cells
+
+
+# pylint: disable=too-many-arguments
+@njit(
+    "f8[:, :](f8[:, :, :], f8[:], f8[:], f8[:], f8[:], f8[:, :], f8[:, :], f8[:, :], f8[:], i8[:], i8[:, :], f8)",
+    parallel=True,
+    cache=True,
+)
+def intersection_n_los_numba(
+    los_index,
+    plane_coef_a,
+    plane_coef_b,
+    plane_coef_c,
+    plane_coef_d,
+    alt_data,
+    alt_min_cell,
+    alt_max_cell,
+    alt_max_pyramid,
+    pyramid_offsets,
+    pyramid_shapes,
+    tol_z,
+):
+    """
+    DTM intersection of several lines of sight using numba to reduce calculation time on multiple points.
+    Each line of sight is intersected with the DTM cube then with the DTM.
+
+    :param los_index: lines of sight in index coordinates (row, col, alt)
+    :type los_index: 3D np.array (number of los, number of altitudes, 3) dtype np.float64
+    :param plane_coef_a: first coefficient of the 6 DTM cube planes equations
+    :type plane_coef_a: 1D np.array dtype np.float64
+    :param plane_coef_b: second coefficient of the 6 DTM cube planes equations
+    :type plane_coef_b: 1D np.array dtype np.float64
+    :param plane_coef_c: third coefficient of the 6 DTM cube planes equations
+    :type plane_coef_c: 1D np.array dtype np.float64
+    :param plane_coef_d: constant of the 6 DTM cube planes equations
+    :type plane_coef_d: 1D np.array dtype np.float64
+    :param alt_data: DTM altitudes
+    :type alt_data: 2D np.array dtype np.float64
+    :param alt_min_cell: min altitude of each DTM cell
+    :type alt_min_cell: 2D np.array dtype np.float64
+    :param alt_max_cell: max altitude of each DTM cell
+    :type alt_max_cell: 2D np.array dtype np.float64
+    :param alt_max_pyramid: flattened levels of DTM cells max altitudes pyramid
+    :type alt_max_pyramid: 1D np.array dtype np.float64
+    :param pyramid_offsets: first index of each pyramid level in alt_max_pyramid
+    :type pyramid_offsets: 1D np.array dtype np.int64
+    :param pyramid_shapes: shape of each pyramid level
+    :type pyramid_shapes: 2D np.array (number of levels, 2) dtype np.int64
+    :param tol_z: altitude tolerance of the intersection
+    :type tol_z: float 64
+    :return: intersections in index coordinates, numpy.nan if no intersection has been found
+    :rtype: 2D np.array (number of los, 3)
+    """
+    points_dtm = np.full((los_index.shape[0], 3), np.nan)
+
+    # pylint: disable=not-an-iterable
+    for i in prange(los_index.shape[0]):
+        (cube_found, point_b_dtm, h_intersect) = intersect_dtm_cube_numba(
+            los_index[i], plane_coef_a, plane_coef_b, plane_coef_c, plane_coef_d
+        )
+        if cube_found:
+            (dtm_found, point_r, __) = intersection_numba(
+                los_index[i],
+                point_b_dtm,
+                h_intersect,
+                alt_data,
+                alt_min_cell,
+                alt_max_cell,
+                alt_max_pyramid,
+                pyramid_offsets,
+                pyramid_shapes,
+                tol_z,
+            )
+            if dtm_found:
+                points_dtm[i, :] = point_r
+
+    return points_dtm
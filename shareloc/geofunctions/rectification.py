@@ -23,6 +23,7 @@ This module contains functions to generate stereo-rectification epipolar grids
 """
 
 # Standard imports
+import logging
 import math
 
 # Third party imports
@@ -103,7 +104,10 @@ def compute_epipolar_angle(end_line, start_line):
     return np.squeeze(alpha)
 
 
-def compute_local_epipolar_line(geom_model_left, geom_model_right, left_point, elevation, elevation_offset):
+# pylint: disable=too-many-arguments
+def compute_local_epipolar_line(
+    geom_model_left, geom_model_right, left_point, elevation, elevation_offset, right_point=None
+):
     """
     Estimate the beginning and the ending of local epipolar line in left image
 
@@ -118,6 +122,9 @@ def compute_local_epipolar_line(geom_model_left, geom_model_right, left_point, e
     :type elevation: shareloc.dtm or float
     :param elevation_offset: elevation difference used to estimate the local tangent
     :type elevation_offset: int
+    :param right_point: right correspondent of left_point at elevation (same shape as left_point),
+        colocalized if None
+    :type right_point: 1D or 2D numpy array
     :return: Coordinates of the beginning and the ending of local epipolar line in the left image
     :rtype: Tuple(1D np.array [row, col, altitude], 1D numpy array [row, col, altitude])
             or Tuple(2D np.array (nb points, [row, col, altitude]), 2D np.array (nb points, [row, col, altitude]))
@@ -127,25 +134,28 @@ def compute_local_epipolar_line(geom_model_left, geom_model_right, left_point, e
         left_point = np.expand_dims(left_point, axis=0)
 
     # Right correspondent of the left coordinates
-    right_corr = np.zeros((left_point.shape[0], 3))
-    right_corr[:, 0], right_corr[:, 1], right_corr[:, 2] = coloc(
-        geom_model_left, geom_model_right, left_point[:, 0], left_point[:, 1], elevation
-    )
+    if right_point is not None:
+        right_corr = np.atleast_2d(right_point)
+    else:
+        right_corr = np.zeros((left_point.shape[0], 3))
+        right_corr[:, 0], right_corr[:, 1], right_corr[:, 2] = coloc(
+            geom_model_left, geom_model_right, left_point[:, 0], left_point[:, 1], elevation
+        )
     ground_elev = np.array(right_corr[:, 2])
 
-    # Find the beginning of the epipolar line in the left image, using right correspondent at lower elevation
-    right_corr[:, 2] = ground_elev - elevation_offset
-    epi_line_start = np.zeros((left_point.shape[0], 3))
-    epi_line_start[:, 0], epi_line_start[:, 1], epi_line_start[:, 2] = coloc(
-        geom_model_right, geom_model_left, right_corr[:, 0], right_corr[:, 1], right_corr[:, 2]
-    )
-
-    # Find the ending of the epipolar line in the left image, using right correspondent at higher elevation
-    right_corr[:, 2] = ground_elev + elevation_offset
-    epi_line_end = np.zeros((left_point.shape[0], 3))
-    epi_line_end[:, 0], epi_line_end[:, 1], epi_line_end[:, 2] = coloc(
-        geom_model_right, geom_model_left, right_corr[:, 0], right_corr[:, 1], right_corr[:, 2]
+    # Find the beginning and the ending of the epipolar line in the left image, using right correspondent at lower
+    # and higher elevations: both colocalizations are stacked in a single direct and inverse localization
+    nb_points = left_point.shape[0]
+    epi_line_ends = np.zeros((2 * nb_points, 3))
+    epi_line_ends[:, 0], epi_line_ends[:, 1], epi_line_ends[:, 2] = coloc(
+        geom_model_right,
+        geom_model_left,
+        np.tile(right_corr[:, 0], 2),
+        np.tile(right_corr[:, 1], 2),
+        np.concatenate((ground_elev - elevation_offset, ground_elev + elevation_offset)),
     )
+    epi_line_start = epi_line_ends[:nb_points, :]
+    epi_line_end = epi_line_ends[nb_points:, :]
 
     return np.squeeze(epi_line_start), np.squeeze(epi_line_end)
 
@@ -397,11 +407,116 @@ def moving_along_lines(
     return next_left_coords, next_right_coords
 
 
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+def compute_epipolar_lines_starts(
+    geom_model_left,
+    geom_model_right,
+    start_left,
+    nb_lines,
+    mean_spacing,
+    elevation,
+    epi_step,
+    elevation_offset,
+    block_size,
+    tolerance=1e-6,
+    max_iter=20,
+):
+    """
+    Compute the starting points of epipolar lines by blocks of lines (predictor/corrector).
+
+    Each line start is the previous one moved orthogonally to the local epipolar direction at the previous start
+    (see moving_to_next_line). In a block, line starts are predicted with the epipolar angle of the previous line,
+    then the local epipolar angles of all the block lines are computed at once and line starts are recomputed by
+    cumulative sums of the moves, until they move less than tolerance.
+
+    :param geom_model_left: geometric model of the left image
+    :type geom_model_left: shareloc.grid or  shareloc.rpc
+    :param geom_model_right: geometric model of the right image
+    :type geom_model_right: shareloc.grid or  shareloc.rpc
+    :param start_left: starting point of the first line in the left image
+    :type start_left: 1D np.array [row, col, altitude]
+    :param nb_lines: number of epipolar lines
+    :type nb_lines: int
+    :param mean_spacing: mean spacing of epipolar grids
+    :type mean_spacing: float
+    :param elevation: elevation
+    :type elevation: shareloc.dtm or float
+    :param epi_step: epipolar step
+    :type epi_step: int
+    :param elevation_offset: elevation difference used to estimate the local tangent
+    :type elevation_offset: float
+    :param block_size: number of lines computed at once
+    :type block_size: int
+    :param tolerance: convergence threshold on line starts, in left image pixels (mean_spacing unit)
+    :type tolerance: float
+    :param max_iter: maximum number of corrections by block, a warning is logged if line starts still move
+        more than tolerance after max_iter corrections
+    :type max_iter: int
+    :return: left and right starting points of each epipolar line
+    :rtype: Tuple(2D np.array (nb_lines, [row, col, altitude]), 2D np.array (nb_lines, [row, col, altitude]))
+    """
+    step = epi_step * mean_spacing
+    left_starts = np.zeros((nb_lines, 3), dtype=np.float64)
+    left_starts[0, :] = start_left
+
+    # predictor of the first block: epipolar angle of the first line
+    local_epi_start, local_epi_end = compute_local_epipolar_line(
+        geom_model_left, geom_model_right, left_starts[0, :], elevation, elevation_offset
+    )
+    last_alpha = np.atleast_1d(compute_epipolar_angle(local_epi_end, local_epi_start))[-1]
+
+    first = 0
+    while first < nb_lines - 1:
+        last = min(first + block_size, nb_lines - 1)
+        # lines first + 1 .. last, moved from lines first .. last - 1
+        alphas = np.full(last - first, last_alpha)
+        for __ in range(max_iter):
+            block_starts = np.copy(left_starts[first + 1 : last + 1, 0:2])
+            left_starts[first + 1 : last + 1, 0] = left_starts[first, 0] + np.cumsum(step * np.cos(alphas))
+            left_starts[first + 1 : last + 1, 1] = left_starts[first, 1] - np.cumsum(step * np.sin(alphas))
+            move = np.max(np.abs(left_starts[first + 1 : last + 1, 0:2] - block_starts))
+            if move <= tolerance * mean_spacing:
+                break
+            # corrector: local epipolar angles at the predicted line starts
+            local_epi_start, local_epi_end = compute_local_epipolar_line(
+                geom_model_left, geom_model_right, left_starts[first:last, :], elevation, elevation_offset
+            )
+            alphas = np.atleast_1d(compute_epipolar_angle(local_epi_end, local_epi_start))
+        else:
+            # pylint: disable=logging-too-many-args
+            logging.warning(
+                "epipolar lines %d to %d starts did not converge after %d iterations (last move %g pixels)",
+                first + 1,
+                last,
+                max_iter,
+                move,
+            )
+        last_alpha = alphas[-1]
+        first = last
+
+    # corresponding starting points in the right image
+    right_starts = np.zeros((nb_lines, 3), dtype=np.float64)
+    right_starts[:, 0], right_starts[:, 1], right_starts[:, 2] = coloc(
+        geom_model_left, geom_model_right, left_starts[:, 0], left_starts[:, 1], elevation
+    )
+    return left_starts, right_starts
+
+
 # disable for api symmetry between left and right data
 # pylint: disable=unused-argument
 # pylint: disable=too-many-locals
+# pylint: disable=too-many-arguments
 def compute_stereorectification_epipolar_grids(
-    left_im, geom_model_left, right_im, geom_model_right, elevation=0.0, epi_step=1, elevation_offset=50.0
+    left_im,
+    geom_model_left,
+    right_im,
+    geom_model_right,
+    elevation=0.0,
+    epi_step=1,
+    elevation_offset=50.0,
+    line_block_size=None,
+    line_tolerance=1e-6,
 ):
     """
     Compute stereo-rectification epipolar grids
@@ -420,6 +535,11 @@ def compute_stereorectification_epipolar_grids(
     :type epi_step: int
     :param elevation_offset: elevation difference used to estimate the local tangent
     :type elevation_offset: float
+    :param line_block_size: if not None, starting points of epipolar lines are computed by blocks of line_block_size
+        lines (see compute_epipolar_lines_starts) instead of line by line
+    :type line_block_size: int
+    :param line_tolerance: convergence threshold of line starting points computed by blocks, in left image pixels
+    :type line_tolerance: float
     :return: return :
         - left epipolar grid, shareloc.image object convention [[row displacement, col displacement], nb rows, nb cols]
         - right epipolar grid, shareloc.image object convention [[row displacement, col displacement], nb rows, nb cols]
@@ -441,39 +561,54 @@ def compute_stereorectification_epipolar_grids(
 
     # Starting points are the upper-left origin of the left epipolar image, and it's correspondent in the right image
     start_left = np.copy(left_epi_origin)
-    start_right = np.zeros(3, dtype=start_left.dtype)
-    start_right[0], start_right[1], start_right[2] = coloc(
-        geom_model_left, geom_model_right, start_left[0], start_left[1], elevation
-    )
 
     mean_baseline_ratio = 0
 
     # Compute the starting point of each epipolar line to be able to move along the lines (useful to vectorize the code)
     # Georeferenced coordinates of each starting epipolar lines in left and right image
-    left_epi_lines = [np.copy(start_left)]
-    right_epi_lines = [np.copy(start_right)]
-
-    # For each rows of the epipolar geometry, define left and right starting coordinates of each epipolar lines
-    for __ in range(grid_size[0] - 1):
-        # --- Compute left local epipolar line, useful for moving to the next line ---
-        local_epi_start, local_epi_end = compute_local_epipolar_line(
-            geom_model_left, geom_model_right, left_epi_lines[-1], elevation, elevation_offset
+    if line_block_size is not None:
+        left_epi_coords, right_epi_coords = compute_epipolar_lines_starts(
+            geom_model_left,
+            geom_model_right,
+            start_left,
+            grid_size[0],
+            mean_spacing,
+            elevation,
+            epi_step,
+            elevation_offset,
+            line_block_size,
+            line_tolerance,
         )
-
-        # epipolar angle using the begin and the end of the left local epipolar line
-        alpha = compute_epipolar_angle(local_epi_end, local_epi_start)
-        # Find the start of next line in epipolar geometry
-        next_epi_line_left, next_epi_line_right = moving_to_next_line(
-            geom_model_left, geom_model_right, left_epi_lines[-1], mean_spacing, elevation, epi_step, alpha
+    else:
+        start_right = np.zeros(3, dtype=start_left.dtype)
+        start_right[0], start_right[1], start_right[2] = coloc(
+            geom_model_left, geom_model_right, start_left[0], start_left[1], elevation
         )
 
-        # Save the starting points, useful to be able to move along the lines in the next loop
-        left_epi_lines.append(np.copy(next_epi_line_left))
-        right_epi_lines.append(np.copy(next_epi_line_right))
+        left_epi_lines = [np.copy(start_left)]
+        right_epi_lines = [np.copy(start_right)]
+
+        # For each rows of the epipolar geometry, define left and right starting coordinates of each epipolar lines
+        for __ in range(grid_size[0] - 1):
+            # --- Compute left local epipolar line, useful for moving to the next line ---
+            local_epi_start, local_epi_end = compute_local_epipolar_line(
+                geom_model_left, geom_model_right, left_epi_lines[-1], elevation, elevation_offset
+            )
+
+            # epipolar angle using the begin and the end of the left local epipolar line
+            alpha = compute_epipolar_angle(local_epi_end, local_epi_start)
+            # Find the start of next line in epipolar geometry
+            next_epi_line_left, next_epi_line_right = moving_to_next_line(
+                geom_model_left, geom_model_right, left_epi_lines[-1], mean_spacing, elevation, epi_step, alpha
+            )
 
-    # Left and right epipolar coordinates of the current point
-    left_epi_coords = np.array(left_epi_lines)
-    right_epi_coords = np.array(right_epi_lines)
+            # Save the starting points, useful to be able to move along the lines in the next loop
+            left_epi_lines.append(np.copy(next_epi_line_left))
+            right_epi_lines.append(np.copy(next_epi_line_right))
+
+        # Left and right epipolar coordinates of the current point
+        left_epi_coords = np.array(left_epi_lines)
+        right_epi_coords = np.array(right_epi_lines)
 
     # Moving along epipolar lines
     rows = np.arange(grid_size[0])
@@ -511,3 +646,228 @@ def compute_stereorectification_epipolar_grids(
     mean_baseline_ratio /= grid_size[0] * grid_size[1]
 
     return left_grid, right_grid, rectified_image_size[0], rectified_image_size[1], mean_baseline_ratio
+
+
+# disable for api symmetry between left and right data
+# pylint: disable=unused-argument
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-statements
+def compute_stereorectification_epipolar_grids_adaptive(
+    left_im,
+    geom_model_left,
+    right_im,
+    geom_model_right,
+    elevation=0.0,
+    epi_step=1,
+    elevation_offset=50.0,
+    nb_levels=3,
+    tolerance=0.01,
+):
+    """
+    Compute stereo-rectification epipolar grids, coarse to fine.
+
+    Grid nodes are first computed every 2**nb_levels nodes, moving along epipolar lines as
+    compute_stereorectification_epipolar_grids does with a coarser step. Then, level by level, nodes at half the cell
+    size (middle of edges and center) are computed in cells where the previous level was not accurate enough:
+    they are moved from a computed corner along and orthogonally to its local epipolar line. Cells where the bilinear
+    interpolation of their corners predicts these nodes within tolerance are not refined further, cells beyond the
+    epipolar grid are never refined. Remaining nodes are interpolated from the finest cells with computed corners.
+
+    :param left_im: left image
+    :type left_im: shareloc.image object
+    :param geom_model_left: geometric model of the left image
+    :type geom_model_left: shareloc.grid or  shareloc.rpc
+    :param right_im: right image
+    :type right_im: shareloc.image object
+    :param geom_model_right: geometric model of the right image
+    :type geom_model_right: shareloc.grid or  shareloc.rpc
+    :param elevation: elevation
+    :type elevation: shareloc.dtm or float
+    :param epi_step: epipolar step
+    :type epi_step: int
+    :param elevation_offset: elevation difference used to estimate the local tangent
+    :type elevation_offset: float
+    :param nb_levels: number of refinement levels, coarse grid step is epi_step * 2**nb_levels
+    :type nb_levels: int
+    :param tolerance: refinement criterion, in left image pixels: a cell is refined if the bilinear interpolation of
+        its corners misses one of its refinement nodes left or right positions by more than tolerance.
+        It is estimated on refinement nodes only, it is not a strict bound of the interpolation error of other nodes.
+    :type tolerance: float
+    :return: return :
+        - left epipolar grid, shareloc.image object convention [[row displacement, col displacement], nb rows, nb cols]
+        - right epipolar grid, shareloc.image object convention [[row displacement, col displacement], nb rows, nb cols]
+        - number of rows of the epipolar image, int
+        - number of columns of the epipolar image, int
+        - mean value of the baseline to sensor altitude ratio, float
+    :rtype: Tuple
+    """
+    __, grid_size, rectified_image_size, left_epi_origin, __ = prepare_rectification(
+        left_im, geom_model_left, geom_model_right, elevation, epi_step, elevation_offset
+    )
+    mean_spacing = 0.5 * (abs(left_im.pixel_size_col) + abs(left_im.pixel_size_row))
+    step = epi_step * mean_spacing
+    coarse = 2**nb_levels
+
+    def compute_nodes(left_coords):
+        """
+        compute right positions, local epipolar angles and local baseline ratios of left positions
+
+        :param left_coords: left positions
+        :type left_coords: 2D np.array (nb nodes, [row, col, altitude])
+        :return: right positions, epipolar angles, baseline ratios
+        :rtype: Tuple(2D np.array (nb nodes, [row, col, altitude]), 1D np.array, 1D np.array)
+        """
+        right_coords = np.zeros(left_coords.shape, dtype=np.float64)
+        right_coords[:, 0], right_coords[:, 1], right_coords[:, 2] = coloc(
+            geom_model_left, geom_model_right, left_coords[:, 0], left_coords[:, 1], elevation
+        )
+        local_epi_start, local_epi_end = compute_local_epipolar_line(
+            geom_model_left, geom_model_right, left_coords, elevation, elevation_offset, right_point=right_coords
+        )
+        local_epi_start = np.atleast_2d(local_epi_start)
+        local_epi_end = np.atleast_2d(local_epi_end)
+        node_alphas = np.atleast_1d(compute_epipolar_angle(local_epi_end, local_epi_start))
+        node_ratios = np.sqrt(
+            (local_epi_end[:, 1] - local_epi_start[:, 1]) ** 2 + (local_epi_end[:, 0] - local_epi_start[:, 0]) ** 2
+        ) / (2 * elevation_offset)
+        return right_coords, node_alphas, node_ratios
+
+    def interpolate_cells(array, top, first, cell, weight_row, weight_col):
+        """
+        bilinear interpolation in cells from their corners
+
+        :param array: node values
+        :type array: 3D np.array (nb rows, nb cols, nb bands)
+        :param top: cells first row
+        :type top: 1D np.array
+        :param first: cells first col
+        :type first: 1D np.array
+        :param cell: cells size
+        :type cell: int
+        :param weight_row: row weights of interpolated positions
+        :type weight_row: float or 2D np.array (nb cells, 1)
+        :param weight_col: col weights of interpolated positions
+        :type weight_col: float or 2D np.array (nb cells, 1)
+        :return: interpolated values
+        :rtype: 2D np.array (nb cells, nb bands)
+        """
+        upper = (1.0 - weight_col) * array[top, first, :] + weight_col * array[top, first + cell, :]
+        lower = (1.0 - weight_col) * array[top + cell, first, :] + weight_col * array[top + cell, first + cell, :]
+        return (1.0 - weight_row) * upper + weight_row * lower
+
+    # Nodes of a grid covering the epipolar grid with a whole number of coarse cells
+    nb_cells = np.array([max(-(-(grid_size[0] - 1) // coarse), 1), max(-(-(grid_size[1] - 1) // coarse), 1)])
+    shape = (nb_cells[0] * coarse + 1, nb_cells[1] * coarse + 1)
+    left = np.zeros(shape + (3,), dtype=np.float64)
+    right = np.zeros(shape + (3,), dtype=np.float64)
+    alphas = np.zeros(shape, dtype=np.float64)
+    ratios = np.zeros(shape, dtype=np.float64)
+    computed = np.zeros(shape, dtype=bool)
+
+    # Coarse level: starting points of epipolar lines, then moving along lines
+    current_left, __ = compute_epipolar_lines_starts(
+        geom_model_left,
+        geom_model_right,
+        np.copy(left_epi_origin),
+        nb_cells[0] + 1,
+        mean_spacing,
+        elevation,
+        epi_step * coarse,
+        elevation_offset,
+        nb_cells[0] + 1,
+    )
+    for col in range(0, shape[1], coarse):
+        left[::coarse, col, :] = current_left
+        right[::coarse, col, :], alphas[::coarse, col], ratios[::coarse, col] = compute_nodes(current_left)
+        computed[::coarse, col] = True
+        current_left = np.copy(current_left)
+        current_left[:, 0] += coarse * step * np.sin(alphas[::coarse, col])
+        current_left[:, 1] += coarse * step * np.cos(alphas[::coarse, col])
+
+    # Refinement: middle of edges and center of active cells
+    active = np.ones(nb_cells, dtype=bool)
+    for level in range(nb_levels, 0, -1):
+        cell = 2**level
+        half = cell // 2
+        cell_rows, cell_cols = np.nonzero(active)
+        if cell_rows.size == 0:
+            break
+        offsets = np.array([[0, half], [half, 0], [half, half], [half, cell], [cell, half]])
+        node_rows = cell_rows[:, np.newaxis] * cell + offsets[np.newaxis, :, 0]
+        node_cols = cell_cols[:, np.newaxis] * cell + offsets[np.newaxis, :, 1]
+
+        # new nodes are moved from the upper left computed node of their cell
+        new_nodes = np.unique(node_rows * shape[1] + node_cols)
+        new_rows, new_cols = np.divmod(new_nodes[~computed.flat[new_nodes]], shape[1])
+        base_rows = new_rows - new_rows % cell
+        base_cols = new_cols - new_cols % cell
+        base_alphas = alphas[base_rows, base_cols]
+        move_along = (new_cols - base_cols) * step
+        move_ortho = (new_rows - base_rows) * step
+        new_left = np.zeros((new_rows.size, 3), dtype=np.float64)
+        new_left[:, 0] = (
+            left[base_rows, base_cols, 0] + move_along * np.sin(base_alphas) + move_ortho * np.cos(base_alphas)
+        )
+        new_left[:, 1] = (
+            left[base_rows, base_cols, 1] + move_along * np.cos(base_alphas) - move_ortho * np.sin(base_alphas)
+        )
+        left[new_rows, new_cols, :] = new_left
+        right[new_rows, new_cols, :], alphas[new_rows, new_cols], ratios[new_rows, new_cols] = compute_nodes(new_left)
+        computed[new_rows, new_cols] = True
+
+        # bilinear interpolation error of active cells at their new nodes
+        positions = np.concatenate((left[:, :, 0:2], right[:, :, 0:2]), axis=2)
+        errors = np.zeros(cell_rows.size, dtype=np.float64)
+        for offset_index, (offset_row, offset_col) in enumerate(offsets):
+            predicted = interpolate_cells(
+                positions, cell_rows * cell, cell_cols * cell, cell, offset_row / cell, offset_col / cell
+            )
+            node_positions = positions[node_rows[:, offset_index], node_cols[:, offset_index], :]
+            errors = np.maximum(errors, np.max(np.abs(node_positions - predicted), axis=1))
+
+        # refined cells are split in 4 active cells for next level,
+        # sub-cells beyond the epipolar grid (coarse cells padding) are not refined
+        refined = errors > tolerance * mean_spacing
+        active = np.zeros(2 * np.array(active.shape), dtype=bool)
+        for sub_row in range(2):
+            for sub_col in range(2):
+                active[2 * cell_rows[refined] + sub_row, 2 * cell_cols[refined] + sub_col] = True
+        sub_cells_rows, sub_cells_cols = np.ogrid[0 : active.shape[0], 0 : active.shape[1]]
+        active &= (sub_cells_rows * half < grid_size[0]) & (sub_cells_cols * half < grid_size[1])
+
+    # Not computed nodes are interpolated, from coarse to fine cells with computed corners
+    values = np.concatenate((left[:, :, 0:2], right[:, :, 0:2], ratios[:, :, np.newaxis]), axis=2)
+    missing_rows, missing_cols = np.nonzero(~computed)
+    for level in range(nb_levels, 0, -1):
+        cell = 2**level
+        top = np.minimum(missing_rows - missing_rows % cell, shape[0] - 1 - cell)
+        first = np.minimum(missing_cols - missing_cols % cell, shape[1] - 1 - cell)
+        valid = (
+            computed[top, first]
+            & computed[top, first + cell]
+            & computed[top + cell, first]
+            & computed[top + cell, first + cell]
+        )
+        values[missing_rows[valid], missing_cols[valid], :] = interpolate_cells(
+            values,
+            top[valid],
+            first[valid],
+            cell,
+            ((missing_rows[valid] - top[valid]) / cell)[:, np.newaxis],
+            ((missing_cols[valid] - first[valid]) / cell)[:, np.newaxis],
+        )
+
+    # Epipolar grids displacements
+    values = values[: grid_size[0], : grid_size[1], :]
+    left_grid, right_grid = initialize_grids(epi_step, grid_size[0], grid_size[1])
+    grid_rows, grid_cols = np.mgrid[0 : grid_size[0], 0 : grid_size[1]]
+    left_grid_rows, left_grid_cols = left_grid.transform_index_to_physical_point(grid_rows, grid_cols)
+    right_grid_rows, right_grid_cols = right_grid.transform_index_to_physical_point(grid_rows, grid_cols)
+    left_grid.data[0, :, :] = values[:, :, 0] - left_grid_rows
+    left_grid.data[1, :, :] = values[:, :, 1] - left_grid_cols
+    right_grid.data[0, :, :] = values[:, :, 2] - right_grid_rows
+    right_grid.data[1, :, :] = values[:, :, 3] - right_grid_cols
+    mean_baseline_ratio = np.mean(values[:, :, 4])
+
+    return left_grid, right_grid, rectified_image_size[0], rectified_image_size[1], mean_baseline_ratio
@@ -23,10 +23,19 @@ This module contains the rectification_grids class to handle CARS rectification
 """
 # pylint: disable=no-member
 
+# Standard imports
+from functools import lru_cache
+
 # Third party imports
 import numpy as np
 import rasterio as rio
-from scipy import interpolate
+from numba import config, njit, prange
+
+# Set numba type of threading layer before parallel target compilation
+config.THREADING_LAYER = "omp"
+
+# Maximum number of rectification grids kept in memory by load_rectification_grid
+RECTIFICATION_GRID_CACHE_SIZE = 16
 
 
 class RectificationGrid:
@@ -34,36 +43,81 @@ class RectificationGrid:
     Rectification grid
     """
 
-    def __init__(self, grid_filename):
+    def __init__(self, grid_filename, roi=None, margin=1):
         """
         Constructor
         :param grid_filename: grid filename
         :type filename: string
+        :param roi: epipolar region of interest [row_min, col_min, row_max, col_max], the whole grid is loaded if None.
+            Otherwise only grid nodes covering the roi are loaded, and interpolated positions are expected in the roi.
+        :type roi: list
+        :param margin: number of grid nodes loaded around the roi (1 is enough for linear and cubic interpolations)
+        :type margin: int
         """
         self.filename = grid_filename
 
-        dataset = rio.open(grid_filename)
+        with rio.open(grid_filename) as dataset:
+            window = None
+            if roi is not None:
+                window = self.roi_window(dataset, roi, margin)
+
+            transform = dataset.transform
+            (width, height) = (dataset.width, dataset.height)
+            if window is not None:
+                transform = dataset.window_transform(window)
+                (width, height) = (window.width, window.height)
+
+            # transform dep to positions
+            self.row_dep = dataset.read(2, window=window).transpose()
+            self.col_dep = dataset.read(1, window=window).transpose()
 
-        transform = dataset.transform
         step_col = transform[0]
         step_row = transform[4]
         # 0 or 0.5
         [ori_col, ori_row] = transform * (0.5, 0.5)  # center pixel position
 
         # print("ori {} {} step {} {}".format(ori_col,ori_y,step_x,step_y))
-        last_col = ori_col + step_col * dataset.width
-        last_row = ori_row + step_row * dataset.height
-
-        # transform dep to positions
-        self.row_dep = dataset.read(2).transpose()
-        self.col_dep = dataset.read(1).transpose()
+        last_col = ori_col + step_col * width
+        last_row = ori_row + step_row * height
 
         cols = np.arange(ori_col, last_col, step_col)
         rows = np.arange(ori_row, last_row, step_row)
         self.grid_row, self.grid_col = np.mgrid[ori_col:last_col:step_col, ori_row:last_row:step_row]
         self.points = (cols, rows)
-        self.row_positions = self.row_dep + self.grid_col
-        self.col_positions = self.col_dep + self.grid_row
+        self.origin = (ori_col, ori_row)
+        self.step = (step_col, step_row)
+        # col and row positions are interleaved to be interpolated in a single pass
+        self.positions = np.empty(self.row_dep.shape + (2,), dtype=np.float64)
+        self.positions[:, :, 0] = self.col_dep + self.grid_row
+        self.positions[:, :, 1] = self.row_dep + self.grid_col
+        self.col_positions = self.positions[:, :, 0]
+        self.row_positions = self.positions[:, :, 1]
+
+    @staticmethod
+    def roi_window(dataset, roi, margin):
+        """
+        grid window covering an epipolar region of interest
+
+        :param dataset: grid dataset
+        :type dataset: rasterio.io.DatasetReader
+        :param roi: epipolar region of interest [row_min, col_min, row_max, col_max]
+        :type roi: list
+        :param margin: number of grid nodes added around the roi
+        :type margin: int
+        :return grid window, at least 2x2 nodes
+        :rtype rasterio.windows.Window
+        """
+        transform = dataset.transform
+        [ori_col, ori_row] = transform * (0.5, 0.5)
+        first_col = int(np.floor((roi[1] - ori_col) / transform[0])) - margin
+        last_col = int(np.ceil((roi[3] - ori_col) / transform[0])) + margin
+        first_row = int(np.floor((roi[0] - ori_row) / transform[4])) - margin
+        last_row = int(np.ceil((roi[2] - ori_row) / transform[4])) + margin
+        first_col = min(max(first_col, 0), dataset.width - 2)
+        last_col = max(min(last_col, dataset.width - 1), first_col + 1)
+        first_row = min(max(first_row, 0), dataset.height - 2)
+        last_row = max(min(last_row, dataset.height - 1), first_row + 1)
+        return rio.windows.Window(first_col, first_row, last_col - first_col + 1, last_row - first_row + 1)
 
     def get_positions(self):
         """
@@ -74,20 +128,160 @@ class RectificationGrid:
         """
         return self.row_positions, self.col_positions
 
-    def interpolate(self, positions):
+    def interpolate(self, positions, method="linear", dtype=np.float64):
         """
-        interpolate position
+        interpolate position, positions outside the grid are linearly extrapolated
 
         :param positions : positions to interpolate : array  Nx2 [col,row]
         :type positions: np.array
+        :param method : interpolation method, "linear" or "cubic" (cubic convolution inside the grid, linear
+            extrapolation outside)
+        :type method: str
+        :param dtype : interpolated positions type, np.float64 or np.float32
+        :type dtype: np.dtype
         :return interpolated positions : array  Nx2 [col,row]
         :rtype  np.array
         """
-        interp_row = interpolate.interpn(
-            self.points, self.row_positions, positions, method="linear", bounds_error=False, fill_value=None
-        )
-        interp_col = interpolate.interpn(
-            self.points, self.col_positions, positions, method="linear", bounds_error=False, fill_value=None
+        if method not in ("linear", "cubic"):
+            raise ValueError(f"interpolation method should be linear or cubic, not {method}")
+        positions = np.asarray(positions, dtype=np.float64)
+        if positions.ndim == 1:
+            positions = positions[np.newaxis, :]
+        interp_pos = np.empty((positions.shape[0], 2), dtype=dtype)
+        interpolate_regular_grid_numba(
+            positions,
+            self.positions,
+            self.origin[0],
+            self.origin[1],
+            self.step[0],
+            self.step[1],
+            method == "cubic",
+            interp_pos,
         )
-        interp_pos = np.stack((interp_col, interp_row)).transpose()
         return interp_pos
+
+
+@lru_cache(maxsize=RECTIFICATION_GRID_CACHE_SIZE)
+def load_rectification_grid(grid_filename):
+    """
+    load rectification grid. Last loaded grids are kept in memory (keyed by filename) for next calls, grid files are
+    assumed not to be modified meanwhile (load_rectification_grid.cache_clear() empties the cache).
+
+    :param grid_filename: grid filename
+    :type grid_filename: str
+    :return rectification grid
+    :rtype shareloc.geofunctions.rectification_grid.RectificationGrid
+    """
+    return RectificationGrid(grid_filename)
+
+
+@njit("Tuple((i8, i8, f8, f8))(i8, i8)", cache=True)
+def ghost_node(index, size):
+    """
+    nodes and weights giving the value of a node of index in [-1, size], nodes outside the grid are linearly
+    extrapolated from the two nearest ones
+
+    :param index : node index
+    :type index : int
+    :param size : grid size
+    :type size : int
+    :return first node index, second node index, first node weight, second node weight
+    :rtype tuple(int, int, float, float)
+    """
+    if index < 0:
+        return 0, 1, 2.0, -1.0
+    if index >= size:
+        return size - 1, size - 2, 2.0, -1.0
+    return index, index, 1.0, 0.0
+
+
+@njit("f8(f8)", cache=True)
+def cubic_convolution_weight(dist):
+    """
+    Keys cubic convolution kernel (a = -0.5)
+
+    :param dist : distance to the node, in grid steps
+    :type dist : float
+    :return node weight
+    :rtype float
+    """
+    dist = abs(dist)
+    if dist <= 1.0:
+        return (1.5 * dist - 2.5) * dist * dist + 1.0
+    if dist < 2.0:
+        return ((-0.5 * dist + 2.5) * dist - 4.0) * dist + 2.0
+    return 0.0
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+@njit(
+    [
+        "void(f8[:, :], f8[:, :, :], f8, f8, f8, f8, b1, f8[:, :])",
+        "void(f8[:, :], f8[:, :, :], f8, f8, f8, f8, b1, f4[:, :])",
+    ],
+    parallel=True,
+    cache=True,
+)
+def interpolate_regular_grid_numba(positions, grid, ori_col, ori_row, step_col, step_row, cubic, interp_pos):
+    """
+    interpolate all bands of a regular grid at once: bilinear interpolation (with extrapolation outside the grid
+    using edge cells), or cubic convolution inside the grid.
+
+    :param positions : positions to interpolate [col,row]
+    :type positions : 2D np.array (N,2) dtype np.float64
+    :param grid : grid values
+    :type grid : 3D np.array (nb_col,nb_row,2) dtype np.float64
+    :param ori_col : first node col position
+    :type ori_col : float
+    :param ori_row : first node row position
+    :type ori_row : float
+    :param step_col : col step
+    :type step_col : float
+    :param step_row : row step
+    :type step_row : float
+    :param cubic : cubic convolution interpolation
+    :type cubic : bool
+    :param interp_pos : output interpolated values
+    :type interp_pos : 2D np.array (N,2) dtype np.float64 or np.float32
+    """
+    nb_col = grid.shape[0]
+    nb_row = grid.shape[1]
+    # pylint: disable=not-an-iterable
+    for i in prange(positions.shape[0]):
+        pos_col = (positions[i, 0] - ori_col) / step_col
+        pos_row = (positions[i, 1] - ori_row) / step_row
+        if not (np.isfinite(pos_col) and np.isfinite(pos_row)):
+            interp_pos[i, 0] = np.nan
+            interp_pos[i, 1] = np.nan
+            continue
+        # cell index, edge cells are used for extrapolation
+        index_col = min(max(int(np.floor(pos_col)), 0), nb_col - 2)
+        index_row = min(max(int(np.floor(pos_row)), 0), nb_row - 2)
+        delta_col = pos_col - index_col
+        delta_row = pos_row - index_row
+
+        if cubic and 0.0 <= delta_col <= 1.0 and 0.0 <= delta_row <= 1.0:
+            for band in range(2):
+                value = 0.0
+                for offset_col in range(-1, 3):
+                    weight_col = cubic_convolution_weight(delta_col - offset_col)
+                    (col_a, col_b, wcol_a, wcol_b) = ghost_node(index_col + offset_col, nb_col)
+                    for offset_row in range(-1, 3):
+                        weight_row = cubic_convolution_weight(delta_row - offset_row)
+                        (row_a, row_b, wrow_a, wrow_b) = ghost_node(index_row + offset_row, nb_row)
+                        node = (
+                            wcol_a * (wrow_a * grid[col_a, row_a, band] + wrow_b * grid[col_a, row_b, band])
+                            + wcol_b * (wrow_a * grid[col_b, row_a, band] + wrow_b * grid[col_b, row_b, band])
+                        )
+                        value += weight_col * weight_row * node
+                interp_pos[i, band] = value
+        else:
+            for band in range(2):
+                interp_pos[i, band] = (1.0 - delta_col) * (
+                    (1.0 - delta_row) * grid[index_col, index_row, band]
+                    + delta_row * grid[index_col, index_row + 1, band]
+                ) + delta_col * (
+                    (1.0 - delta_row) * grid[index_col + 1, index_row, band]
+                    + delta_row * grid[index_col + 1, index_row + 1, band]
+                )
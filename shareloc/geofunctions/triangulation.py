@@ -24,12 +24,16 @@ This module contains triangulation methods.
 
 # Third party imports
 import numpy as np
+from numba import config, njit, prange
 
 # Shareloc imports
-from shareloc.geofunctions.rectification_grid import RectificationGrid
+from shareloc.geofunctions.rectification_grid import RectificationGrid, load_rectification_grid
 from shareloc.geomodels.los import LOS
 from shareloc.proj_utils import coordinates_conversion
 
+# Set numba type of threading layer before parallel target compilation
+config.THREADING_LAYER = "omp"
+
 
 def sensor_triangulation(
     matches,
@@ -74,17 +78,78 @@ def sensor_triangulation(
     matches_right = matches[:, 2:4]
     right_los = LOS(matches_right, geometrical_model_right, right_min_max, fill_nan)
 
-    # LOS conversion
-    # LOS intersection
-    intersections_ecef = los_triangulation(left_los, right_los)
+    # LOS intersection, residues are computed in the same pass
+    intersections_residues = None
+    if residues is True:
+        intersections_residues = np.empty(matches.shape[0], dtype=np.float64)
+    intersections_ecef = los_triangulation(left_los, right_los, residues=intersections_residues)
     in_crs = 4978
     out_crs = 4326
     intersections_wgs84 = coordinates_conversion(intersections_ecef, in_crs, out_crs)
+    return intersections_ecef, intersections_wgs84, intersections_residues
 
-    # refine matches
-    intersections_residues = None
-    if residues is True:
-        intersections_residues = distance_point_los(left_los, intersections_ecef)
+
+def sensor_triangulation_n_views(
+    matches,
+    geometrical_models,
+    alt_min_max=None,
+    valid=None,
+    residues=False,
+    fill_nan=False,
+):
+    """
+    triangulation in sensor geometry of matches between any number of views
+
+    according to the formula:
+    .. math::
+        x =
+        \\left(\\sum_i I-\\hat v_i \\hat v_i^\\top\\right)^{-1} \\left(\\sum_i (I-\\hat v_i \\hat v_i^\\top) s_i\\right)
+    where i runs over the valid views of each match.
+
+    :param matches :  matches in sensor coordinates Mx[col (view 0), row (view 0), ..., col (view K-1), row (view K-1)]
+    :type matches : np.array
+    :param geometrical_models : geometrical model of each view
+    :type geometrical_models : list of shareloc.grid or shareloc.rpc
+    :param alt_min_max : min/max for los creation of each view, if None model min/max will be used
+    :type alt_min_max : list of list
+    :param valid : validity of each view for each match (MxK), all views are used if None
+    :type valid : np.array of bool
+    :param residues : calculates residues (distance in meters between each los and 3D points, NaN for invalid views)
+    :type residues : boolean
+    :param fill_nan : fill numpy.nan values with lon and lat offset if true (same as OTB/OSSIM), nan is returned
+        otherwise
+    :type fill_nan : boolean
+    :return intersections in cartesian crs, intersections in wgs84 crs and optionnaly residues (MxK)
+    :rtype (numpy.array,numpy,array,numpy.array)
+    """
+    nb_views = len(geometrical_models)
+    nb_matches = matches.shape[0]
+    if matches.shape[1] != 2 * nb_views:
+        raise ValueError(f"matches should have {2 * nb_views} columns for {nb_views} views")
+    if alt_min_max is None:
+        alt_min_max = [None] * nb_views
+    if valid is None:
+        valid = np.full((nb_matches, nb_views), True, dtype=bool)
+
+    # LOS instantiation, only on valid matches of each view
+    sis = np.full((nb_views, nb_matches, 3), np.nan, dtype=np.float64)
+    vis = np.full((nb_views, nb_matches, 3), np.nan, dtype=np.float64)
+    for view, geometrical_model in enumerate(geometrical_models):
+        valid_view = valid[:, view]
+        if np.any(valid_view):
+            los = LOS(matches[valid_view, 2 * view : 2 * view + 2], geometrical_model, alt_min_max[view], fill_nan)
+            sis[view, valid_view, :] = los.sis
+            vis[view, valid_view, :] = los.vis
+
+    # LOS intersection
+    intersections_ecef = np.empty((nb_matches, 3), dtype=np.float64)
+    intersections_residues = np.empty((nb_matches, nb_views), dtype=np.float64)
+    los_triangulation_n_views_numba(sis, vis, valid, intersections_ecef, intersections_residues, residues)
+    if residues is False:
+        intersections_residues = None
+    in_crs = 4978
+    out_crs = 4326
+    intersections_wgs84 = coordinates_conversion(intersections_ecef, in_crs, out_crs)
     return intersections_ecef, intersections_wgs84, intersections_residues
 
 
@@ -108,33 +173,201 @@ def distance_point_los(los, points):
     return dist
 
 
-def los_triangulation(left_los, right_los):
+def los_triangulation(left_los, right_los, out=None, residues=None):
     """
     LOS triangulation
 
+    intersection is the point minimizing the sum of squared distances to both LOS, i.e. the middle of their
+    common perpendicular. NaN is returned for LOS containing NaN and for parallel LOS.
+
     :param left_los :  left los
     :type left_los : shareloc.los
     :param right_los :  right los
     :type right_los : shareloc.los
+    :param out :  output buffer (N,3), allocated if None
+    :type out : numpy.array dtype np.float64
+    :param residues :  output buffer (N) filled with distances in meters between intersections and left LOS,
+        not computed if None
+    :type residues : numpy.array dtype np.float64
     :return intersections in cartesian crs
     :rtype numpy.array
     """
-    vis = np.dstack((left_los.vis, right_los.vis))
-    vis = np.swapaxes(vis, 1, 2)
-
-    sis = np.dstack((left_los.sis, right_los.sis))
-    sis = np.swapaxes(sis, 1, 2)
-
-    vivi = vis[..., :, np.newaxis] * vis[..., np.newaxis, :]
-    id_vivi = np.eye(3) - vivi
-    sum_id_vivi = np.nansum(id_vivi, axis=-3)
+    nb_los = left_los.sis.shape[0]
+    if out is None:
+        out = np.empty((nb_los, 3), dtype=np.float64)
+    compute_residues = residues is not None
+    if not compute_residues:
+        residues = np.empty(0, dtype=np.float64)
+    los_triangulation_numba(
+        np.asarray(left_los.sis, dtype=np.float64),
+        np.asarray(left_los.vis, dtype=np.float64),
+        np.asarray(right_los.sis, dtype=np.float64),
+        np.asarray(right_los.vis, dtype=np.float64),
+        out,
+        residues,
+        compute_residues,
+    )
+    return out
 
-    id_vivi_si = np.nansum(id_vivi * sis[..., np.newaxis, :], axis=-1)
-    sum_id_vivi_si = np.nansum(id_vivi_si, axis=-2)
 
-    inv_sum_id_vivi = np.linalg.inv(sum_id_vivi)
-    intersection = np.nansum(inv_sum_id_vivi * sum_id_vivi_si[..., np.newaxis, :], axis=-1)
-    return intersection
+# pylint: disable=too-many-locals
+@njit(
+    "void(f8[:, :], f8[:, :], f8[:, :], f8[:, :], f8[:, :], f8[:], b1)",
+    parallel=True,
+    cache=True,
+)
+def los_triangulation_numba(left_sis, left_vis, right_sis, right_vis, intersections, residues, compute_residues):
+    """
+    closed form two LOS intersection: middle of the common perpendicular of both LOS
+
+    :param left_sis : left LOS starting points
+    :type left_sis : 2D np.array (N,3) dtype np.float64
+    :param left_vis : left LOS viewing vectors
+    :type left_vis : 2D np.array (N,3) dtype np.float64
+    :param right_sis : right LOS starting points
+    :type right_sis : 2D np.array (N,3) dtype np.float64
+    :param right_vis : right LOS viewing vectors
+    :type right_vis : 2D np.array (N,3) dtype np.float64
+    :param intersections : output intersections
+    :type intersections : 2D np.array (N,3) dtype np.float64
+    :param residues : output distances between intersections and left LOS
+    :type residues : 1D np.array (N) dtype np.float64
+    :param compute_residues : fill residues
+    :type compute_residues : bool
+    """
+    # pylint: disable=not-an-iterable
+    for i in prange(left_sis.shape[0]):
+        diff_x = left_sis[i, 0] - right_sis[i, 0]
+        diff_y = left_sis[i, 1] - right_sis[i, 1]
+        diff_z = left_sis[i, 2] - right_sis[i, 2]
+        vl_vl = left_vis[i, 0] * left_vis[i, 0] + left_vis[i, 1] * left_vis[i, 1] + left_vis[i, 2] * left_vis[i, 2]
+        vl_vr = left_vis[i, 0] * right_vis[i, 0] + left_vis[i, 1] * right_vis[i, 1] + left_vis[i, 2] * right_vis[i, 2]
+        vr_vr = (
+            right_vis[i, 0] * right_vis[i, 0] + right_vis[i, 1] * right_vis[i, 1] + right_vis[i, 2] * right_vis[i, 2]
+        )
+        vl_diff = left_vis[i, 0] * diff_x + left_vis[i, 1] * diff_y + left_vis[i, 2] * diff_z
+        vr_diff = right_vis[i, 0] * diff_x + right_vis[i, 1] * diff_y + right_vis[i, 2] * diff_z
+        denom = vl_vl * vr_vr - vl_vr * vl_vr
+
+        # squared sine of LOS angle threshold, below it LOS are considered parallel
+        if denom > 1e-12 * vl_vl * vr_vr:
+            # abscissas of the common perpendicular feet on both LOS
+            left_t = (vl_vr * vr_diff - vr_vr * vl_diff) / denom
+            right_t = (vl_vl * vr_diff - vl_vr * vl_diff) / denom
+            half_x = 0.5 * (right_t * right_vis[i, 0] - diff_x - left_t * left_vis[i, 0])
+            half_y = 0.5 * (right_t * right_vis[i, 1] - diff_y - left_t * left_vis[i, 1])
+            half_z = 0.5 * (right_t * right_vis[i, 2] - diff_z - left_t * left_vis[i, 2])
+            intersections[i, 0] = left_sis[i, 0] + left_t * left_vis[i, 0] + half_x
+            intersections[i, 1] = left_sis[i, 1] + left_t * left_vis[i, 1] + half_y
+            intersections[i, 2] = left_sis[i, 2] + left_t * left_vis[i, 2] + half_z
+            if compute_residues:
+                residues[i] = np.sqrt(half_x * half_x + half_y * half_y + half_z * half_z)
+        else:
+            # NaN LOS (comparison is False) or parallel LOS
+            intersections[i, 0] = np.nan
+            intersections[i, 1] = np.nan
+            intersections[i, 2] = np.nan
+            if compute_residues:
+                residues[i] = np.nan
+
+
+# pylint: disable=too-many-locals
+@njit("void(f8[:, :, :], f8[:, :, :], b1[:, :], f8[:, :], f8[:, :], b1)", parallel=True, cache=True)
+def los_triangulation_n_views_numba(sis, vis, valid, intersections, residues, compute_residues):
+    """
+    intersection of K LOS per point, least squares solution of the normal equations accumulated over valid views.
+    LOS containing NaN are skipped, NaN is returned for points with less than 2 valid LOS or (nearly) parallel LOS.
+
+    :param sis : LOS starting points of each view
+    :type sis : 3D np.array (K,M,3) dtype np.float64
+    :param vis : LOS viewing vectors of each view
+    :type vis : 3D np.array (K,M,3) dtype np.float64
+    :param valid : validity of each view for each point
+    :type valid : 2D np.array (M,K) dtype bool
+    :param intersections : output intersections
+    :type intersections : 2D np.array (M,3) dtype np.float64
+    :param residues : output distances between intersections and each LOS, NaN for skipped LOS
+    :type residues : 2D np.array (M,K) dtype np.float64
+    :param compute_residues : fill residues
+    :type compute_residues : bool
+    """
+    nb_views = sis.shape[0]
+    # pylint: disable=not-an-iterable
+    for i in prange(sis.shape[1]):
+        # symmetric normal matrix upper part and second member, starting points are taken relatively to the
+        # first used one to limit cancellation
+        a_xx = a_xy = a_xz = a_yy = a_yz = a_zz = 0.0
+        b_x = b_y = b_z = 0.0
+        origin_x = origin_y = origin_z = 0.0
+        nb_los = 0
+        for view in range(nb_views):
+            if not valid[i, view]:
+                continue
+            norm = np.sqrt(vis[view, i, 0] ** 2 + vis[view, i, 1] ** 2 + vis[view, i, 2] ** 2)
+            pos_x = sis[view, i, 0]
+            pos_y = sis[view, i, 1]
+            pos_z = sis[view, i, 2]
+            # NaN LOS (comparison is False) or null viewing vector
+            if not (norm > 0.0 and np.isfinite(norm) and np.isfinite(pos_x + pos_y + pos_z)):
+                continue
+            if nb_los == 0:
+                origin_x = pos_x
+                origin_y = pos_y
+                origin_z = pos_z
+            v_x = vis[view, i, 0] / norm
+            v_y = vis[view, i, 1] / norm
+            v_z = vis[view, i, 2] / norm
+            pos_x -= origin_x
+            pos_y -= origin_y
+            pos_z -= origin_z
+            v_pos = v_x * pos_x + v_y * pos_y + v_z * pos_z
+            a_xx += 1.0 - v_x * v_x
+            a_xy -= v_x * v_y
+            a_xz -= v_x * v_z
+            a_yy += 1.0 - v_y * v_y
+            a_yz -= v_y * v_z
+            a_zz += 1.0 - v_z * v_z
+            b_x += pos_x - v_pos * v_x
+            b_y += pos_y - v_pos * v_y
+            b_z += pos_z - v_pos * v_z
+            nb_los += 1
+
+        # cofactors of the symmetric normal matrix
+        c_xx = a_yy * a_zz - a_yz * a_yz
+        c_xy = a_xz * a_yz - a_xy * a_zz
+        c_xz = a_xy * a_yz - a_xz * a_yy
+        det = a_xx * c_xx + a_xy * c_xy + a_xz * c_xz
+        # two LOS with angle theta give det = 2 sin(theta)^2
+        if nb_los < 2 or det <= 1e-12:
+            intersections[i, :] = np.nan
+            if compute_residues:
+                residues[i, :] = np.nan
+            continue
+        c_yy = a_xx * a_zz - a_xz * a_xz
+        c_yz = a_xy * a_xz - a_xx * a_yz
+        c_zz = a_xx * a_yy - a_xy * a_xy
+        rel_x = (c_xx * b_x + c_xy * b_y + c_xz * b_z) / det
+        rel_y = (c_xy * b_x + c_yy * b_y + c_yz * b_z) / det
+        rel_z = (c_xz * b_x + c_yz * b_y + c_zz * b_z) / det
+        intersections[i, 0] = origin_x + rel_x
+        intersections[i, 1] = origin_y + rel_y
+        intersections[i, 2] = origin_z + rel_z
+
+        if compute_residues:
+            for view in range(nb_views):
+                norm = np.sqrt(vis[view, i, 0] ** 2 + vis[view, i, 1] ** 2 + vis[view, i, 2] ** 2)
+                # distance between intersection and LOS: norm of cross product between the LOS starting point to
+                # intersection vector and the viewing vector
+                diff_x = rel_x - (sis[view, i, 0] - origin_x)
+                diff_y = rel_y - (sis[view, i, 1] - origin_y)
+                diff_z = rel_z - (sis[view, i, 2] - origin_z)
+                cross_x = diff_y * vis[view, i, 2] - diff_z * vis[view, i, 1]
+                cross_y = diff_z * vis[view, i, 0] - diff_x * vis[view, i, 2]
+                cross_z = diff_x * vis[view, i, 1] - diff_y * vis[view, i, 0]
+                if valid[i, view]:
+                    residues[i, view] = np.sqrt(cross_x * cross_x + cross_y * cross_y + cross_z * cross_z) / norm
+                else:
+                    residues[i, view] = np.nan
 
 
 def transform_disp_to_matches(disp, mask=None):
@@ -178,6 +411,8 @@ def epipolar_triangulation(
     right_min_max=None,
     residues=False,
     fill_nan=False,
+    block_size=None,
+    out=None,
 ):
     """
     epipolar triangulation
@@ -192,10 +427,11 @@ def epipolar_triangulation(
     :type geometrical_model_left : shareloc.grid or shareloc.rpc
     :param geometrical_model_right : right image geometrical model
     :type geometrical_model_right : shareloc.grid or shareloc.rpc
-    :param grid_left : left rectification grid filename
-    :type grid_left : str
-    :param grid_right : right rectification grid filename
-    :type grid_right : str
+    :param grid_left : left rectification grid, or its filename (loaded grids are cached, see
+        shareloc.geofunctions.rectification_grid.load_rectification_grid)
+    :type grid_left : shareloc.geofunctions.rectification_grid.RectificationGrid or str
+    :param grid_right : right rectification grid, or its filename
+    :type grid_right : shareloc.geofunctions.rectification_grid.RectificationGrid or str
     :param left_min_max : left min/max for los creation, if None model min/max will be used
     :type left_min_max : list
     :param right_min_max : right min/max for los creation, if None model min/max will be used
@@ -205,9 +441,36 @@ def epipolar_triangulation(
     :param fill_nan : fill numpy.nan values with lon and lat offset if true (same as OTB/OSSIM), nan is returned
         otherwise
     :type fill_nan : boolean
-    :return intersections in cartesian crs
-    :rtype numpy.array
+    :param block_size : number of disparity rows triangulated at once ('disp' matches only), whole disparity map if
+        None. Memory used by the triangulation is then bounded whatever the disparity map size.
+    :type block_size : int
+    :param out : output arrays (intersections in cartesian crs (Nx3), intersections in wgs84 crs (Nx3), residues
+        (Nx1)) filled in place, allocated if None
+    :type out : tuple(numpy.array, numpy.array, numpy.array)
+    :return intersections in cartesian crs, intersections in wgs84 crs and residues
+    :rtype (numpy.array,numpy,array,numpy.array)
     """
+    if matches_type == "disp" and block_size is not None:
+        if out is None:
+            tab_size = matches.disp.size
+            out = (np.zeros((tab_size, 3)), np.zeros((tab_size, 3)), np.zeros((tab_size, 1)))
+        for block, block_ecef, block_wgs84, block_residues in epipolar_triangulation_blocks(
+            matches,
+            mask,
+            geometrical_model_left,
+            geometrical_model_right,
+            grid_left,
+            grid_right,
+            block_size,
+            left_min_max,
+            right_min_max,
+            residues,
+            fill_nan,
+        ):
+            out[0][block, :] = block_ecef
+            out[1][block, :] = block_wgs84
+            out[2][block, :] = block_residues
+        return out
 
     # retrieve point matches in sensor geometry
     if matches_type == "sift":
@@ -219,11 +482,15 @@ def epipolar_triangulation(
     else:
         raise Exception("matches type should be sift or disp")
 
-    # interpolate left
-    rectif_grid_left = RectificationGrid(grid_left)
-    rectif_grid_right = RectificationGrid(grid_right)
+    # rectification grids, loaded or taken from cache if filenames are given
+    rectif_grid_left = grid_left
+    if not isinstance(grid_left, RectificationGrid):
+        rectif_grid_left = load_rectification_grid(grid_left)
+    rectif_grid_right = grid_right
+    if not isinstance(grid_right, RectificationGrid):
+        rectif_grid_right = load_rectification_grid(grid_right)
 
-    # interpolate_right
+    # interpolate left and right
     matches_sensor_left = rectif_grid_left.interpolate(epi_pos_left)
     matches_sensor_right = rectif_grid_right.interpolate(epi_pos_right)
     matches_sensor = np.concatenate((matches_sensor_left, matches_sensor_right), axis=1)
@@ -234,11 +501,109 @@ def epipolar_triangulation(
     )
 
     tab_size = values_ok.shape[0]
-    intersections_ecef_masked = np.zeros((tab_size, 3))
-    intersections_wgs84_masked = np.zeros((tab_size, 3))
-    intersections_residues_masked = np.zeros((tab_size, 1))
-    intersections_ecef_masked[values_ok, :] = intersections_ecef
-    intersections_wgs84_masked[values_ok, :] = intersections_wgs84
-    intersections_residues_masked[values_ok, 0] = intersections_residues
-
-    return intersections_ecef_masked, intersections_wgs84_masked, intersections_residues_masked
+    if out is None:
+        out = (np.zeros((tab_size, 3)), np.zeros((tab_size, 3)), np.zeros((tab_size, 1)))
+    else:
+        # masked matches are set to 0
+        for out_array in out:
+            out_array[...] = 0.0
+    out[0][values_ok, :] = intersections_ecef
+    out[1][values_ok, :] = intersections_wgs84
+    out[2][values_ok, 0] = intersections_residues
+
+    return out
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+def epipolar_triangulation_blocks(
+    disp,
+    mask,
+    geometrical_model_left,
+    geometrical_model_right,
+    grid_left,
+    grid_right,
+    block_size,
+    left_min_max=None,
+    right_min_max=None,
+    residues=False,
+    fill_nan=False,
+):
+    """
+    epipolar triangulation of a disparity map by blocks of rows, memory used is bounded by block size.
+
+    yielded arrays are buffers allocated once and reused by next block, they have to be copied to be kept.
+
+    :param disp :  disparity xarray
+    :type disp : xarray
+    :param mask :  mask, same shape as disparity
+    :type mask : numpy.array
+    :param geometrical_model_left : left image geometrical model
+    :type geometrical_model_left : shareloc.grid or shareloc.rpc
+    :param geometrical_model_right : right image geometrical model
+    :type geometrical_model_right : shareloc.grid or shareloc.rpc
+    :param grid_left : left rectification grid, or its filename (loaded grids are cached, see
+        shareloc.geofunctions.rectification_grid.load_rectification_grid)
+    :type grid_left : shareloc.geofunctions.rectification_grid.RectificationGrid or str
+    :param grid_right : right rectification grid, or its filename
+    :type grid_right : shareloc.geofunctions.rectification_grid.RectificationGrid or str
+    :param block_size : number of disparity rows triangulated at once
+    :type block_size : int
+    :param left_min_max : left min/max for los creation, if None model min/max will be used
+    :type left_min_max : list
+    :param right_min_max : right min/max for los creation, if None model min/max will be used
+    :type right_min_max : list
+    :param residues : calculates residues (distance in meters)
+    :type residues : boolean
+    :param fill_nan : fill numpy.nan values with lon and lat offset if true (same as OTB/OSSIM), nan is returned
+        otherwise
+    :type fill_nan : boolean
+    :return generator of block indexes in the flattened disparity map, block intersections in cartesian crs,
+        block intersections in wgs84 crs and block residues
+    :rtype generator of (slice, numpy.array, numpy.array, numpy.array)
+    """
+    rectif_grid_left = grid_left
+    if not isinstance(grid_left, RectificationGrid):
+        rectif_grid_left = load_rectification_grid(grid_left)
+    rectif_grid_right = grid_right
+    if not isinstance(grid_right, RectificationGrid):
+        rectif_grid_right = load_rectification_grid(grid_right)
+
+    (nb_rows, nb_cols) = disp.disp.shape
+    block_ecef_buffer = np.empty((block_size * nb_cols, 3))
+    block_wgs84_buffer = np.empty((block_size * nb_cols, 3))
+    block_residues_buffer = np.empty((block_size * nb_cols, 1))
+
+    for first_row in range(0, nb_rows, block_size):
+        rows = slice(first_row, min(first_row + block_size, nb_rows))
+        block_mask = None
+        if mask is not None:
+            block_mask = mask[rows, :]
+        [epi_pos_left, epi_pos_right, values_ok] = transform_disp_to_matches(disp.isel(row=rows), block_mask)
+
+        tab_size = values_ok.shape[0]
+        block_ecef = block_ecef_buffer[:tab_size, :]
+        block_wgs84 = block_wgs84_buffer[:tab_size, :]
+        block_residues = block_residues_buffer[:tab_size, :]
+        block_ecef.fill(0.0)
+        block_wgs84.fill(0.0)
+        block_residues.fill(0.0)
+
+        if epi_pos_left.shape[0] > 0:
+            matches_sensor = np.concatenate(
+                (rectif_grid_left.interpolate(epi_pos_left), rectif_grid_right.interpolate(epi_pos_right)), axis=1
+            )
+            [intersections_ecef, intersections_wgs84, intersections_residues] = sensor_triangulation(
+                matches_sensor,
+                geometrical_model_left,
+                geometrical_model_right,
+                left_min_max,
+                right_min_max,
+                residues,
+                fill_nan,
+            )
+            block_ecef[values_ok, :] = intersections_ecef
+            block_wgs84[values_ok, :] = intersections_wgs84
+            block_residues[values_ok, 0] = intersections_residues
+
+        yield slice(rows.start * nb_cols, rows.stop * nb_cols), block_ecef, block_wgs84, block_residues
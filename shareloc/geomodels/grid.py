@@ -28,12 +28,16 @@ import logging
 
 # Third party imports
 import numpy as np
+from numba import config, njit, prange
 
 # Shareloc imports
 from shareloc.image import Image
 from shareloc.math_utils import interpol_bilin, interpol_bilin_vectorized
 from shareloc.proj_utils import coordinates_conversion
 
+# Set numba type of threading layer before parallel target compilation
+config.THREADING_LAYER = "omp"
+
 
 # gitlab issue #58
 # pylint: disable=too-many-instance-attributes
@@ -161,110 +165,106 @@ class Grid:
 
     def direct_loc_h(self, row, col, alt, fill_nan=False):
         """
-        direct localization at constant altitude
+        direct localization at given altitudes
 
         :param row :  line sensor position
         :type row : float or 1D numpy.ndarray dtype=float64
         :param col :  column sensor position
         :type col : float or 1D numpy.ndarray dtype=float64
-        :param alt :  altitude
-        :type alt : float
+        :param alt :  altitude, one altitude per point or the same for all points
+        :type alt : float or 1D numpy.ndarray dtype=float64
         :param fill_nan : fill numpy.nan values with lon and lat offset if true (same as OTB/OSSIM), nan is returned
             otherwise
         :type fill_nan : boolean
         :return ground position (lon,lat,h)
         :rtype numpy.ndarray 2D dimension with (N,3) shape, where N is number of input coordinates
         """
-        # Vectorization doesn't handle yet altitude as np.ndarray (3D interpolation work).
-        # TODO: clean interfaces to remove this part
-        if isinstance(alt, (list, np.ndarray)):
-            logging.debug("grid doesn't handle alt as array, first value is used")
-            alt = alt[0]
         if fill_nan:
             # pylint: disable=logging-too-many-args
             logging.debug("fill nan %s", fill_nan)
-        (grid_index_up, grid_index_down) = self.return_grid_index(alt)
-        alt_down = self.alts_down[grid_index_down]
-        alt_up = self.alts_down[grid_index_up]
-        alti_coef = (alt - alt_down) / (alt_up - alt_down)
-        mats = [
-            self.lon_data[grid_index_up : grid_index_down + 1, :, :],
-            self.lat_data[grid_index_up : grid_index_down + 1, :, :],
-        ]
 
         # float are converted to np.ndarray for vectorization
         # TODO: refactoring to remove this part.
         if not isinstance(col, (list, np.ndarray)):
             col = np.array([col])
             row = np.array([row])
+        # one altitude per point
+        alt = np.broadcast_to(np.asarray(alt, dtype=np.float64), np.shape(col))
+
+        (grid_index_up, grid_index_down) = self.return_grid_index(alt)
+        alt_down = self.alts_down[grid_index_down]
+        alt_up = self.alts_down[grid_index_up]
+        alti_coef = (alt - alt_down) / (alt_up - alt_down)
 
         position = np.zeros((col.size, 3))
         position[:, 2] = alt
         pos_row = (row - self.row0) / self.steprow
         pos_col = (col - self.col0) / self.stepcol
+        # planimetric interpolation on the enclosing layers of each point only, then in altitude
         # pylint disable for code clarity interpol_bilin_vectorized returns one list of 2 elements in this case
         # pylint: disable=unbalanced-tuple-unpacking
-        [vlon, vlat] = interpol_bilin_vectorized(mats, self.nbrow, self.nbcol, pos_row, pos_col)
-        position[:, 0] = alti_coef * vlon[0, :] + (1 - alti_coef) * vlon[1, :]
-        position[:, 1] = alti_coef * vlat[0, :] + (1 - alti_coef) * vlat[1, :]
+        mats = [self.lon_data, self.lat_data]
+        layers = np.stack([grid_index_up, grid_index_down])
+        [vlon, vlat] = interpol_bilin_vectorized(mats, self.nbrow, self.nbcol, pos_row, pos_col, layers)
+        position[:, 0] = alti_coef * vlon[0] + (1 - alti_coef) * vlon[1]
+        position[:, 1] = alti_coef * vlat[0] + (1 - alti_coef) * vlat[1]
 
         return position
 
     def compute_los(self, row, col, epsg):
         """
-        Compute Line of Sight
+        Compute Line of Sight, sampled on grid altitudes
 
         :param row :  line sensor position
-        :type row : float
+        :type row : float or 1D numpy.ndarray dtype=float64
         :param col :  column sensor position
-        :type col : float
+        :type col : float or 1D numpy.ndarray dtype=float64
         :param  epsg  : epsg code
-        :type epsg  : int
-        :return los
+        :type  epsg  : int
+        :return los, (nbalt, 3) array for a single position, (N, nbalt, 3) array for N positions
         :rtype numpy.array
         """
-        los = np.zeros((3, self.nbalt))
-        loslonlat = self.interpolate_grid_in_plani(row, col)
-        los[0, :] = loslonlat[0]
-        los[1, :] = loslonlat[1]
-        los[2, :] = self.alts_down
-        los = los.T
+        pos_row = np.atleast_1d(np.asarray(row, dtype=np.float64) - self.row0) / self.steprow
+        pos_col = np.atleast_1d(np.asarray(col, dtype=np.float64) - self.col0) / self.stepcol
+        # pylint disable for code clarity interpol_bilin_vectorized returns one list of 2 elements in this case
+        # pylint: disable=unbalanced-tuple-unpacking
+        mats = [self.lon_data, self.lat_data]
+        [vlon, vlat] = interpol_bilin_vectorized(mats, self.nbrow, self.nbcol, pos_row, pos_col)
+        los = np.zeros((pos_row.size, self.nbalt, 3))
+        los[:, :, 0] = vlon.T
+        los[:, :, 1] = vlat.T
+        los[:, :, 2] = self.alts_down
         if epsg != self.epsg:
-            los = coordinates_conversion(los, self.epsg, epsg)
+            los = coordinates_conversion(los.reshape((-1, 3)), self.epsg, epsg).reshape(los.shape)
+        if not isinstance(row, (list, np.ndarray)):
+            los = los[0]
         return los
 
     def direct_loc_dtm(self, row, col, dtm):
         """
         direct localization on dtm
 
-        TODO: explain algorithm
-        TODO: optimize code (for loop, ...)
+        lines of sight of all points are computed at once on grid altitudes, converted in dtm coordinates system,
+        then intersected with the dtm in a single call (see DTMIntersection.intersection_n_los)
 
         :param row :  line sensor position
-        :type row : float
+        :type row : float or 1D numpy.ndarray dtype=float64
         :param col :  column sensor position
-        :type col : float
+        :type col : float or 1D numpy.ndarray dtype=float64
         :param dtm : dtm model
         :type dtm  : shareloc.dtm
-        :return ground position (lon,lat,h) in dtm coordinates system.
+        :return ground position (lon,lat,h) in dtm coordinates system, numpy.nan if los doesn't intersect DTM
         :rtype numpy.ndarray 2D dimension with (N,3) shape, where N is number of input coordinates
         """
         if not isinstance(row, (list, np.ndarray)):
             row = np.array([row])
             col = np.array([col])
 
-        points_nb = len(row)
-        points_dtm = np.zeros((points_nb, 3))
-        for point_index in np.arange(points_nb):
-            row_i = row[point_index]
-            col_i = col[point_index]
-            los = self.compute_los(row_i, col_i, dtm.epsg)
-            (__, __, position_cube, alti) = dtm.intersect_dtm_cube(los)
-            if position_cube is not None:
-                (__, __, points_dtm[point_index, :]) = dtm.intersection(los, position_cube, alti)
-            else:
-                logging.warning("LOS doesn't instersect DTM cube")
-                points_dtm[point_index, :] = np.full(3, fill_value=np.nan)
+        los = self.compute_los(np.asarray(row), np.asarray(col), dtm.epsg)
+        points_dtm = dtm.intersection_n_los(los)
+        if np.any(np.isnan(points_dtm[:, 0])):
+            # pylint: disable=logging-too-many-args
+            logging.warning("%d LOS don't instersect DTM cube", np.sum(np.isnan(points_dtm[:, 0])))
         return points_dtm
 
     def los_extrema(self, row, col, alt_min, alt_max):
@@ -320,26 +320,36 @@ class Grid:
         else:
             list_alts = np.linspace(self.alts_down[0], self.alts_down[-1], nbalt)
 
-        lon_data = np.zeros((nbalt, nbrow, nbcol))
-        lat_data = np.zeros((nbalt, nbrow, nbcol))
-
         # generates an interpolated direction cube of nrow/ncol directions
-        # row_max = self.row0 + self.steprow * (self.nbrow-1)
-        # col_max = self.col0 + self.stepcol * (self.nbcol-1)
-
         steprow = (self.rowmax - self.row0) / (nbrow - 1)
         stepcol = (self.colmax - self.col0) / (nbcol - 1)
+        (pos_row, pos_col) = np.meshgrid(
+            (self.row0 + steprow * np.arange(nbrow, dtype=np.float64) - self.row0) / self.steprow,
+            (self.col0 + stepcol * np.arange(nbcol, dtype=np.float64) - self.col0) / self.stepcol,
+            indexing="ij",
+        )
 
-        for index, alt in enumerate(list_alts):
-
-            res = self.direct_loc_grid_h(self.row0, self.col0, steprow, stepcol, nbrow, nbcol, alt)
-            lon_data[index] = res[0]
-            lat_data[index] = res[1]
+        # planimetric interpolation is done once on all grid layers, then each altitude is interpolated
+        # between its enclosing layers
+        # pylint disable for code clarity interpol_bilin_vectorized returns one list of 2 elements in this case
+        # pylint: disable=unbalanced-tuple-unpacking
+        [vlon, vlat] = interpol_bilin_vectorized(
+            [self.lon_data, self.lat_data], self.nbrow, self.nbcol, pos_row.ravel(), pos_col.ravel()
+        )
+        (grid_index_up, grid_index_down) = self.return_grid_index(list_alts)
+        alti_coef = (list_alts - self.alts_down[grid_index_down]) / (
+            self.alts_down[grid_index_up] - self.alts_down[grid_index_down]
+        )
+        alti_coef = alti_coef[:, np.newaxis]
+        lon_data = alti_coef * vlon[grid_index_up] + (1 - alti_coef) * vlon[grid_index_down]
+        lat_data = alti_coef * vlat[grid_index_up] + (1 - alti_coef) * vlat[grid_index_down]
+        lon_data = lon_data.reshape((nbalt, nbrow, nbcol))
+        lat_data = lat_data.reshape((nbalt, nbrow, nbcol))
         return lon_data, lat_data
 
     def direct_loc_grid_dtm(self, row0, col0, steprow, stepcol, nbrow, nbcol, dtm):
         """
-        direct localization  grid on dtm
+        direct localization  grid on dtm, all grid nodes are localized at once
         :param row0 :  grid origin (row)
         :type row0 : int
         :param col0 :  grid origin (col)
@@ -357,51 +367,39 @@ class Grid:
         :return direct localization grid
         :rtype numpy.array
         """
-        glddtm = np.zeros((3, nbrow, nbcol))
-        los = np.zeros((3, self.nbalt))
-        for i in range(nbrow):
-            for j in range(nbcol):
-                col = col0 + stepcol * j
-                row = row0 + steprow * i
-                los = self.compute_los(row, col, dtm.epsg)
-                (__, __, position_cube, alti) = dtm.intersect_dtm_cube(los)
-                if position_cube is not None:
-                    (__, __, point_dtm) = dtm.intersection(los, position_cube, alti)
-                else:
-                    point_dtm = np.full(3, fill_value=np.nan)
-                # conversion of all tab
-                # if self.epsg != dtm.epsg:
-                #    point_r = coordinates_conversion(point_r, dtm.epsg, self.epsg)
-                glddtm[:, i, j] = point_dtm
+        (row, col) = np.meshgrid(
+            row0 + steprow * np.arange(nbrow, dtype=np.float64),
+            col0 + stepcol * np.arange(nbcol, dtype=np.float64),
+            indexing="ij",
+        )
+        glddtm = self.direct_loc_dtm(row.ravel(), col.ravel(), dtm).T.reshape((3, nbrow, nbcol))
         return glddtm
 
     def return_grid_index(self, alt):
         """
-        return layer index enclosing a given altitude
+        return layer index enclosing given altitudes
 
         :param alt :  altitude
-        :type alt : float
-        :return grid index (up,down)
-        :rtype tuple
-        """
-        if alt > self.alts_down[0]:
-            (high_index, low_index) = (0, 0)
-        elif alt < self.alts_down[-1]:
-            (high_index, low_index) = (self.nbalt - 1, self.nbalt - 1)
-        else:
-            i = 0
-            while i < self.nbalt and self.alts_down[i] >= alt:
-                i += 1
-            if i == self.nbalt:  # to handle alt min
-                i = self.nbalt - 1
-            low_index = i  # grid low index
-            high_index = i - 1  # grid high index
+        :type alt : float or 1D numpy.ndarray dtype=float64
+        :return grid index (up,down), both layers are the first (resp. last) one above (resp. below) grid altitudes
+        :rtype tuple (int or 1D np.array, int or 1D np.array)
+        """
+        # number of layers above or at the altitude, layers are in decreasing altitude order
+        low_index = np.sum(self.alts_down >= np.asarray(alt)[..., np.newaxis], axis=-1)
+        # to handle alt min
+        low_index = np.minimum(low_index, self.nbalt - 1)
+        high_index = low_index - 1
+        above = alt > self.alts_down[0]
+        below = alt < self.alts_down[-1]
+        high_index = np.where(above, 0, np.where(below, self.nbalt - 1, high_index))
+        low_index = np.where(above, 0, np.where(below, self.nbalt - 1, low_index))
+        if np.ndim(alt) == 0:
+            return (int(high_index), int(low_index))
         return (high_index, low_index)
 
     def direct_loc_grid_h(self, row0, col0, steprow, stepcol, nbrow, nbcol, alt):
         """
-        direct localization  grid at constant altitude
-        TODO: not tested.
+        direct localization  grid at constant altitude, all grid nodes are localized at once
 
         :param row0 :  grid origin (row)
         :type row0 : int
@@ -423,29 +421,12 @@ class Grid:
         if isinstance(alt, (list, np.ndarray)):
             logging.warning("grid doesn't handle alt as array, first value is used")
             alt = alt[0]
-        gldalt = np.zeros((3, nbrow, nbcol))
-        (grid_index_up, grid_index_down) = self.return_grid_index(alt)
-        alt_down = self.alts_down[grid_index_down]
-        alt_up = self.alts_down[grid_index_up]
-        alti_coef = (alt - alt_down) / (alt_up - alt_down)
-        mats = [
-            self.lon_data[grid_index_up : grid_index_down + 1, :, :],
-            self.lat_data[grid_index_up : grid_index_down + 1, :, :],
-        ]
-        position = np.zeros(3)
-        position[2] = alt
-        for row_index in range(nbrow):
-            row = row0 + steprow * row_index
-            pos_row = (row - self.row0) / self.steprow
-            for col_index in range(nbcol):
-                col = col0 + stepcol * col_index
-                pos_col = (col - self.col0) / self.stepcol
-                # pylint disable for code clarity interpol_bilin_vectorized returns one list of 2 elements in this case
-                # pylint: disable=unbalanced-tuple-unpacking
-                [vlon, vlat] = interpol_bilin(mats, self.nbrow, self.nbcol, pos_row, pos_col)
-                position[0] = alti_coef * vlon[0] + (1 - alti_coef) * vlon[1]
-                position[1] = alti_coef * vlat[0] + (1 - alti_coef) * vlat[1]
-                gldalt[:, row_index, col_index] = position
+        (row, col) = np.meshgrid(
+            row0 + steprow * np.arange(nbrow, dtype=np.float64),
+            col0 + stepcol * np.arange(nbcol, dtype=np.float64),
+            indexing="ij",
+        )
+        gldalt = self.direct_loc_h(row.ravel(), col.ravel(), alt).T.reshape((3, nbrow, nbcol))
         return gldalt
 
     # gitlab issue #58
@@ -547,53 +528,47 @@ class Grid:
 
     def inverse_loc_predictor(self, lon, lat, alt=0.0):
         """
-        evaluate inverse localization predictor at a given geographic position
+        evaluate inverse localization predictor at given geographic positions
 
         :param lon : longitude
-        :type lon : float
+        :type lon : float or 1D numpy.ndarray dtype=float64
         :param lat : latitude
-        :type lat : float
+        :type lat : float or 1D numpy.ndarray dtype=float64
         :param alt : altitude (0.0 by default)
-        :type alt : float
+        :type alt : float or 1D numpy.ndarray dtype=float64
         :return sensor position and extrapolation state (row,col, is extrapolated)
-        :rtype tuple (float, float, boolean)
+        :rtype tuple (float or 1D np.array, float or 1D np.array, boolean or 1D np.array)
         """
         extrapolation_threshold = 20.0
-        is_extrapolated = False
         altmin = self.alts_down[-1]
         altmax = self.alts_down[0]
 
         # normalization
         lon_n = (lon - self.pred_ofset_scale_lon[0]) / self.pred_ofset_scale_lon[1]
         lat_n = (lat - self.pred_ofset_scale_lat[0]) / self.pred_ofset_scale_lat[1]
-        if abs(lon_n) > (1 + extrapolation_threshold / 100.0):
+        lon_extrapolated = np.abs(lon_n) > (1 + extrapolation_threshold / 100.0)
+        lat_extrapolated = np.abs(lat_n) > (1 + extrapolation_threshold / 100.0)
+        if np.any(lon_extrapolated):
             # pylint: disable=logging-too-many-args
-            logging.warning("Be careful: longitude extrapolation: %1.8f", lon_n)
-            is_extrapolated = True
-        if abs(lat_n) > (1 + extrapolation_threshold / 100.0):
+            logging.warning("Be careful: longitude extrapolation: %1.8f", np.max(np.abs(lon_n)))
+        if np.any(lat_extrapolated):
             # pylint: disable=logging-too-many-args
-            logging.warning("Be careful: latitude extrapolation: %1.8f", lat_n)
-            is_extrapolated = True
+            logging.warning("Be careful: latitude extrapolation: %1.8f", np.max(np.abs(lat_n)))
+        is_extrapolated = np.logical_or(lon_extrapolated, lat_extrapolated)
 
         # polynome application
-        vect_sol = np.array([1, lon_n, lat_n, lon_n**2, lat_n**2, lon_n * lat_n])
-        col_min = ((self.pred_col_min * vect_sol).sum() * self.pred_ofset_scale_col[1]) + self.pred_ofset_scale_col[0]
-        row_min = ((self.pred_row_min * vect_sol).sum() * self.pred_ofset_scale_row[1]) + self.pred_ofset_scale_row[0]
-        col_max = ((self.pred_col_max * vect_sol).sum() * self.pred_ofset_scale_col[1]) + self.pred_ofset_scale_col[0]
-        row_max = ((self.pred_row_max * vect_sol).sum() * self.pred_ofset_scale_row[1]) + self.pred_ofset_scale_row[0]
+        vect_sol = [np.ones_like(lon_n), lon_n, lat_n, lon_n**2, lat_n**2, lon_n * lat_n]
+        col_min = np.dot(self.pred_col_min, vect_sol) * self.pred_ofset_scale_col[1] + self.pred_ofset_scale_col[0]
+        row_min = np.dot(self.pred_row_min, vect_sol) * self.pred_ofset_scale_row[1] + self.pred_ofset_scale_row[0]
+        col_max = np.dot(self.pred_col_max, vect_sol) * self.pred_ofset_scale_col[1] + self.pred_ofset_scale_col[0]
+        row_max = np.dot(self.pred_row_max, vect_sol) * self.pred_ofset_scale_row[1] + self.pred_ofset_scale_row[0]
 
         h_x = (alt - altmin) / (altmax - altmin)
         col = (1 - h_x) * col_min + h_x * col_max
         row = (1 - h_x) * row_min + h_x * row_max
 
-        if row > self.rowmax:
-            row = self.rowmax
-        if row < self.row0:
-            row = self.row0
-        if col > self.colmax:
-            col = self.colmax
-        if col < self.col0:
-            col = self.col0
+        row = np.clip(row, self.row0, self.rowmax)
+        col = np.clip(col, self.col0, self.colmax)
         return row, col, is_extrapolated
 
     # gitlab issue #58
@@ -675,15 +650,15 @@ class Grid:
         * calculate senor correction dlon,dlat -> dcol,drow
         * apply direct localization  -> lon_i,lat_i
 
-        TODO: explain algo
-        TODO: optimization (for loop,...)
+        Iterations are run independently for each point in a compiled kernel, until the geographic error is
+        lower than 1mm or nb_iterations is reached. Sensor position is NaN for extrapolated points.
 
         :param lon : longitude
-        :type lon: float
+        :type lon: float or 1D numpy.ndarray dtype=float64
         :param lat : latitude
-        :type lat: float
+        :type lat: float or 1D numpy.ndarray dtype=float64
         :param alt : altitude
-        :type alt: float
+        :type alt: float or 1D numpy.ndarray dtype=float64
         :param nb_iterations : max number of iterations (15 by default)
         :type nb_iterations : int
         :return sensor position (row,col,alt)
@@ -701,46 +676,33 @@ class Grid:
         if alt.shape[0] != lon.shape[0]:
             alt = np.full(lon.shape[0], fill_value=alt[0])
 
-        points_nb = len(lon)
-        row = np.zeros((points_nb))
-        col = np.zeros((points_nb))
-        for point_index in np.arange(points_nb):
-            lon_i = lon[point_index]
-            lat_i = lat[point_index]
-            alt_i = alt[point_index]
-            deg2mrad = np.deg2rad(1.0) * 1e6
-            iteration = 0
-            coslon = np.cos(np.deg2rad(lat_i))
-            rtx = 1e-12 * 6378000**2
-            (row_i, col_i, extrapol) = self.inverse_loc_predictor(lon_i, lat_i, alt_i)
-            m2_error = 10.0
-            valid_point = 0
-            if not extrapol:
-                # Iterative process
-                # while error in m2 > 1mm
-                while (m2_error > 1e-6) and (iteration < nb_iterations):
-                    position = self.direct_loc_h(row_i, col_i, alt_i)
-                    dlon_microrad = (position[0][0] - lon_i) * deg2mrad
-                    dlat_microrad = (position[0][1] - lat_i) * deg2mrad
-                    m2_error = rtx * (dlat_microrad**2 + (dlon_microrad * coslon) ** 2)
-                    dsol = np.array([dlon_microrad, dlat_microrad])
-                    mat_dp = self.inverse_partial_derivative(row_i, col_i, alt_i)
-                    dimg = mat_dp @ dsol
-                    col_i += -dimg[0]
-                    row_i += -dimg[1]
-                    iteration += 1
-                    valid_point = 1
-            if valid_point == 0:
-                (row_i, col_i) = (None, None)
-            row[point_index] = row_i
-            col[point_index] = col_i
+        (row_start, col_start, extrapol) = self.inverse_loc_predictor(lon, lat, alt)
+        valid = np.logical_not(extrapol) & np.isfinite(lon) & np.isfinite(lat) & np.isfinite(alt)
+        (row, col) = inverse_loc_numba(
+            lon.astype(np.float64),
+            lat.astype(np.float64),
+            alt.astype(np.float64),
+            row_start,
+            col_start,
+            valid,
+            self.lon_data,
+            self.lat_data,
+            self.alts_down,
+            self.row0,
+            self.col0,
+            self.steprow,
+            self.stepcol,
+            nb_iterations,
+        )
         return row, col, alt
 
 
-def coloc(multi_h_grid_src, multi_h_grid_dst, dtm, origin, step, size):
+# pylint: disable=too-many-arguments
+def coloc(multi_h_grid_src, multi_h_grid_dst, dtm, origin, step, size, chunk_size=None):
     """
     colocalization grid on dtm
     localization on dtm from src grid, then inverse localization in right grid
+    all grid nodes are localized at once, or by chunks of chunk_size nodes to bound memory
 
     :param multi_h_grid_src : source grid
     :type multi_h_grid_src : shareloc.grid
@@ -752,19 +714,191 @@ def coloc(multi_h_grid_src, multi_h_grid_dst, dtm, origin, step, size):
      :type step : list(int)
      :param size :  grid nb row and nb col
      :type size : list(int)
+     :param chunk_size :  number of grid nodes localized at once, all nodes if None
+     :type chunk_size : int
      :return colocalization grid
      :rtype numpy.array
     """
     [l0_src, c0_src] = origin
     [steprow_src, stepcol_src] = step
     [nbrow_src, nbcol_src] = size
-    gricoloc = np.zeros((3, nbrow_src, nbcol_src))
-    for index_row in range(nbrow_src):
-        row = l0_src + steprow_src * index_row
-        for index_col in range(nbcol_src):
-            col = c0_src + stepcol_src * index_col
-            # TODO: refacto interfaces to avoid np.squeeze if not necessary
-            (lon, lat, alt) = np.squeeze(multi_h_grid_src.direct_loc_dtm(row, col, dtm))
-            pos_dst = multi_h_grid_dst.inverse_loc(lon, lat, alt)
-            gricoloc[:, index_row, index_col] = pos_dst
-    return gricoloc
+    (row, col) = np.meshgrid(
+        l0_src + steprow_src * np.arange(nbrow_src, dtype=np.float64),
+        c0_src + stepcol_src * np.arange(nbcol_src, dtype=np.float64),
+        indexing="ij",
+    )
+    row = row.ravel()
+    col = col.ravel()
+    if chunk_size is None:
+        chunk_size = max(row.size, 1)
+    gricoloc = np.zeros((3, row.size))
+    for chunk_start in range(0, row.size, chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        lonlatalt = multi_h_grid_src.direct_loc_dtm(row[chunk], col[chunk], dtm)
+        gricoloc[:, chunk] = multi_h_grid_dst.inverse_loc(lonlatalt[:, 0], lonlatalt[:, 1], lonlatalt[:, 2])
+    return gricoloc.reshape((3, nbrow_src, nbcol_src))
+
+
+@njit("f8(f8[:, :, :], i8, f8, f8)", cache=True)
+def interpol_bilin_layer(mat, layer, delta_shift_row, delta_shift_col):
+    """
+    bilinear interpolation on one layer of a multi layer matrix, positions out of the matrix are extrapolated
+    from its border cells (same as shareloc.math_utils.interpol_bilin)
+
+    :param mat: multi layer grid (: , nb_rows,nb_cols)
+    :type mat: 3D np.array dtype np.float 64
+    :param layer: layer index
+    :type layer: int
+    :param delta_shift_row: position (line)
+    :type delta_shift_row: float 64
+    :param delta_shift_col: position (column)
+    :type delta_shift_col: float 64
+    :return: interpolated value
+    :rtype: float 64
+    """
+    lower_shift_row = min(max(int(np.floor(delta_shift_row)), 0), mat.shape[1] - 2)
+    lower_shift_col = min(max(int(np.floor(delta_shift_col)), 0), mat.shape[2] - 2)
+    # (col_shift, row_shift) are subpixel distance to interpolate along each axis
+    col_shift = delta_shift_col - lower_shift_col
+    row_shift = delta_shift_row - lower_shift_row
+    return (
+        (1 - col_shift) * (1 - row_shift) * mat[layer, lower_shift_row, lower_shift_col]
+        + col_shift * (1 - row_shift) * mat[layer, lower_shift_row, lower_shift_col + 1]
+        + (1 - col_shift) * row_shift * mat[layer, lower_shift_row + 1, lower_shift_col]
+        + col_shift * row_shift * mat[layer, lower_shift_row + 1, lower_shift_col + 1]
+    )
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+# pylint: disable=too-many-statements
+@njit(
+    "Tuple((f8[:], f8[:]))(f8[:], f8[:], f8[:], f8[:], f8[:], b1[:], f8[:, :, :], f8[:, :, :], f8[:], "
+    "f8, f8, f8, f8, i8)",
+    parallel=True,
+    cache=True,
+)
+def inverse_loc_numba(
+    lon,
+    lat,
+    alt,
+    row_start,
+    col_start,
+    valid,
+    lon_data,
+    lat_data,
+    alts_down,
+    row0,
+    col0,
+    steprow,
+    stepcol,
+    nb_iterations,
+):
+    """
+    Iterative inverse localization on multi H grid using numba to reduce calculation time on multiple points.
+    For each point, starting from its predicted sensor position, the geographic error of the direct localization
+    is converted in sensor shifts using the grid partial derivatives, until the error is lower than 1mm
+    or nb_iterations is reached.
+
+    :param lon: longitude
+    :type lon: 1D np.array dtype np.float 64
+    :param lat: latitude
+    :type lat: 1D np.array dtype np.float 64
+    :param alt: altitude
+    :type alt: 1D np.array dtype np.float 64
+    :param row_start: predicted row (see Grid.inverse_loc_predictor)
+    :type row_start: 1D np.array dtype np.float 64
+    :param col_start: predicted col (see Grid.inverse_loc_predictor)
+    :type col_start: 1D np.array dtype np.float 64
+    :param valid: points to localize, NaN is returned for the others
+    :type valid: 1D np.array dtype bool
+    :param lon_data: grid longitudes (nbalt, nbrow, nbcol), altitudes in decreasing order
+    :type lon_data: 3D np.array dtype np.float 64
+    :param lat_data: grid latitudes (nbalt, nbrow, nbcol), altitudes in decreasing order
+    :type lat_data: 3D np.array dtype np.float 64
+    :param alts_down: grid altitudes in decreasing order
+    :type alts_down: 1D np.array dtype np.float 64
+    :param row0: grid first row
+    :type row0: float 64
+    :param col0: grid first col
+    :type col0: float 64
+    :param steprow: grid step in row
+    :type steprow: float 64
+    :param stepcol: grid step in col
+    :type stepcol: float 64
+    :param nb_iterations: max number of iterations
+    :type nb_iterations: int
+    :return: sensor position (row, col)
+    :rtype: Tuple(np.ndarray, np.ndarray)
+    """
+    nbalt = alts_down.shape[0]
+    row_out = np.full((lon.shape[0]), np.nan, dtype=np.float64)
+    col_out = np.full((lon.shape[0]), np.nan, dtype=np.float64)
+    deg2mrad = np.deg2rad(1.0) * 1e6
+    rtx = 1e-12 * 6378000**2
+
+    # pylint: disable=not-an-iterable
+    for i in prange(lon.shape[0]):
+        # altitudes out of grid layers are not handled
+        if not valid[i] or nb_iterations < 1 or alt[i] > alts_down[0] or alt[i] < alts_down[nbalt - 1]:
+            continue
+
+        # layers enclosing altitude
+        index_down = 0
+        while index_down < nbalt - 1 and alts_down[index_down] >= alt[i]:
+            index_down += 1
+        index_up = index_down - 1
+        h_x = (alt[i] - alts_down[index_down]) / (alts_down[index_up] - alts_down[index_down])
+
+        coslon = np.cos(np.deg2rad(lat[i]))
+        row_i = row_start[i]
+        col_i = col_start[i]
+        m2_error = 10.0
+        iteration = 0
+        while m2_error > 1e-6 and iteration < nb_iterations:
+            pos_row = (row_i - row0) / steprow
+            pos_col = (col_i - col0) / stepcol
+
+            # direct localization
+            lon_i = h_x * interpol_bilin_layer(lon_data, index_up, pos_row, pos_col) + (
+                1 - h_x
+            ) * interpol_bilin_layer(lon_data, index_down, pos_row, pos_col)
+            lat_i = h_x * interpol_bilin_layer(lat_data, index_up, pos_row, pos_col) + (
+                1 - h_x
+            ) * interpol_bilin_layer(lat_data, index_down, pos_row, pos_col)
+            dlon_microrad = (lon_i - lon[i]) * deg2mrad
+            dlat_microrad = (lat_i - lat[i]) * deg2mrad
+            m2_error = rtx * (dlat_microrad**2 + (dlon_microrad * coslon) ** 2)
+
+            # partial derivatives on grid cell
+            index_row = min(max(int(np.floor(pos_row)), 0), lon_data.shape[1] - 2)
+            index_col = min(max(int(np.floor(pos_col)), 0), lon_data.shape[2] - 2)
+            dlon_c = 0.0
+            dlat_c = 0.0
+            dlon_l = 0.0
+            dlat_l = 0.0
+            for (index_layer, coef) in ((index_down, 1 - h_x), (index_up, h_x)):
+                lon_00 = lon_data[index_layer, index_row, index_col]
+                lat_00 = lat_data[index_layer, index_row, index_col]
+                dlon_c += coef * np.deg2rad(lon_data[index_layer, index_row, index_col + 1] - lon_00) / stepcol
+                dlat_c += coef * np.deg2rad(lat_data[index_layer, index_row, index_col + 1] - lat_00) / stepcol
+                dlon_l += coef * np.deg2rad(lon_data[index_layer, index_row + 1, index_col] - lon_00) / steprow
+                dlat_l += coef * np.deg2rad(lat_data[index_layer, index_row + 1, index_col] - lat_00) / steprow
+            dlon_c *= 1e6
+            dlat_c *= 1e6
+            dlon_l *= 1e6
+            dlat_l *= 1e6
+            det = dlon_c * dlat_l - dlon_l * dlat_c
+            if abs(det) <= 0.000000000001:
+                row_i = np.nan
+                col_i = np.nan
+                break
+
+            col_i += -(dlat_l * dlon_microrad - dlon_l * dlat_microrad) / det
+            row_i += -(-dlat_c * dlon_microrad + dlon_c * dlat_microrad) / det
+            iteration += 1
+
+        row_out[i] = row_i
+        col_out[i] = col_i
+
+    return row_out, col_out
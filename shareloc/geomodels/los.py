@@ -63,15 +63,13 @@ class LOS:
         self.los_nb = self.sensors_positions.shape[0]
         if alt_min_max is None:
             alt_min, alt_max = self.geometrical_model.get_alt_min_max()
+        else:
+            alt_min, alt_max = alt_min_max
 
-        # LOS construction right
-        los_extrema = np.zeros([2 * self.los_nb, 3])
+        # LOS construction right, (alt max, alt min) extrema of all los are localized at once
         list_col, list_row = (self.sensors_positions[:, 0], self.sensors_positions[:, 1])
-        los_extrema[np.arange(0, 2 * self.los_nb, 2), :] = self.geometrical_model.direct_loc_h(
-            list_row, list_col, alt_max, fill_nan
-        )
-        los_extrema[np.arange(1, 2 * self.los_nb, 2), :] = self.geometrical_model.direct_loc_h(
-            list_row, list_col, alt_min, fill_nan
+        los_extrema = self.geometrical_model.direct_loc_h(
+            np.repeat(list_row, 2), np.repeat(list_col, 2), np.tile([alt_max, alt_min], self.los_nb), fill_nan
         )
 
         in_crs = 4326
@@ -23,6 +23,7 @@ This module contains the RPC class corresponding to the RPC models.
 RPC models covered are : DIMAP V1, DIMAP V2, ossim (geom file), geotiff.
 """
 # pylint: disable=no-member
+# pylint: disable=too-many-lines
 
 # Standard imports
 import logging
@@ -404,7 +405,7 @@ class RPC:
         return cls(rpc_params)
 
     @classmethod
-    def from_geotiff(cls, image_filename, topleftconvention=True):
+    def from_geotiff(cls, image_filename, topleftconvention=True, fit_direct_tolerance=None):
         """
         Load from a  geotiff image file
 
@@ -414,6 +415,9 @@ class RPC:
         :type topleftconvention  : boolean
         If False : [0,0] is at the center of the Top Left pixel
         If True : [0,0] is at the top left of the Top Left pixel (OSSIM)
+        :param fit_direct_tolerance  : if not None, direct coefficients are fitted from inverse ones and used
+            if the fit residuals (in pixels) are lower than this tolerance, see fit_direct_coefficients
+        :type fit_direct_tolerance  : float
         """
         dataset = rio.open(image_filename)
         rpc_dict = dataset.tags(ns="RPC")
@@ -446,7 +450,10 @@ class RPC:
         if topleftconvention:
             rpc_params["offset_col"] += 0.5
             rpc_params["offset_row"] += 0.5
-        return cls(rpc_params)
+        rpc = cls(rpc_params)
+        if fit_direct_tolerance is not None:
+            rpc.fit_direct_coefficients(tolerance=fit_direct_tolerance)
+        return rpc
 
     @classmethod
     def from_ossim_kwl(cls, ossim_kwl_filename, topleftconvention=True):
@@ -509,7 +516,7 @@ class RPC:
         return cls(rpc_params)
 
     @classmethod
-    def from_any(cls, primary_file, topleftconvention=True):
+    def from_any(cls, primary_file, topleftconvention=True, fit_direct_tolerance=None):
         """
         Load from any RPC (auto identify driver)
 
@@ -519,6 +526,8 @@ class RPC:
         :type topleftconvention  : boolean
         If False : [0,0] is at the center of the Top Left pixel
         If True : [0,0] is at the top left of the Top Left pixel (OSSIM)
+        :param fit_direct_tolerance  : geotiff only, see from_geotiff
+        :type fit_direct_tolerance  : float
         """
         if basename(primary_file.upper()).endswith("XML"):
             dimap_version = identify_dimap(primary_file)
@@ -532,7 +541,7 @@ class RPC:
             return cls.from_ossim_kwl(primary_file, topleftconvention)
         geotiff_rpc_dict = identify_geotiff_rpc(primary_file)
         if geotiff_rpc_dict is not None:
-            return cls.from_geotiff(primary_file, topleftconvention)
+            return cls.from_geotiff(primary_file, topleftconvention, fit_direct_tolerance=fit_direct_tolerance)
         raise ValueError("can not read rpc file")
 
     def direct_loc_h(self, row, col, alt, fill_nan=False):
@@ -562,8 +571,10 @@ class RPC:
 
         points = np.zeros((col.size, 3))
         filter_nan, points[:, 0], points[:, 1] = self.filter_coordinates(row, col, fill_nan)
+        points[:, 2] = alt
         row = row[filter_nan]
         col = col[filter_nan]
+        alt = alt[filter_nan]
 
         # Direct localization using direct RPC
         if self.direct_coefficient:
@@ -599,13 +610,12 @@ class RPC:
             (points[filter_nan, 0], points[filter_nan, 1], points[filter_nan, 2]) = self.direct_loc_inverse_iterative(
                 row, col, alt, 10, fill_nan
             )
-        points[:, 2] = alt
         return points
 
     def direct_loc_grid_h(self, row0, col0, steprow, stepcol, nbrow, nbcol, alt):
         """
         calculates a direct loc grid (lat, lon) from the direct RPCs at constant altitude
-        TODO: not tested.
+        All grid nodes are localized at once.
 
         :param row0 :  grid origin (row)
         :type row0 : int
@@ -624,13 +634,14 @@ class RPC:
         :return: direct localization grid longitude and latitude
         :rtype Tuple(numpy.array, numpy.array)
         """
-        gri_lon = np.zeros((nbrow, nbcol))
-        gri_lat = np.zeros((nbrow, nbcol))
-        for column in range(int(nbcol)):
-            col = col0 + stepcol * column
-            for line in range(int(nbrow)):
-                row = row0 + steprow * line
-                (gri_lon[line, column], gri_lat[line, column], __) = self.direct_loc_h(row, col, alt)
+        (row, col) = np.meshgrid(
+            row0 + steprow * np.arange(int(nbrow), dtype=np.float64),
+            col0 + stepcol * np.arange(int(nbcol), dtype=np.float64),
+            indexing="ij",
+        )
+        points = self.direct_loc_h(row.ravel(), col.ravel(), alt)
+        gri_lon = points[:, 0].reshape((int(nbrow), int(nbcol)))
+        gri_lat = points[:, 1].reshape((int(nbrow), int(nbcol)))
         return (gri_lon, gri_lat)
 
     def direct_loc_dtm(self, row, col, dtm):
@@ -652,8 +663,6 @@ class RPC:
             points_nb = 1
             row = np.array([row])
             col = np.array([col])
-        direct_dtm = np.zeros((points_nb, 3))
-
         diff_alti_min, diff_alti_max = dtm.get_alt_offset(self.epsg)
         # print("min {} max {}".format(dtm.Zmin,dtm.Zmax))
         (min_dtm, max_dtm) = (dtm.alt_min - 1.0 + diff_alti_min, dtm.alt_max + 1.0 + diff_alti_max)
@@ -662,15 +671,8 @@ class RPC:
         if max_dtm > self.offset_alt + self.scale_alt:
             logging.debug("maximum dtm value is outside RPC validity domain, extrapolation will be done")
         los = self.los_extrema(row, col, min_dtm, max_dtm, epsg=dtm.epsg)
-        for i in range(points_nb):
-            los_i = los[2 * i : 2 * i + 2, :]
-            (__, __, position_cube, alti) = dtm.intersect_dtm_cube(los_i)
-            if position_cube is not None:
-                (__, __, position) = dtm.intersection(los_i, position_cube, alti)
-                direct_dtm[i, :] = position
-            else:
-                position = np.full(3, fill_value=np.nan)
-            direct_dtm[i, :] = position
+        # los_extrema returns (max,min) altitude couples, one couple per point
+        direct_dtm = dtm.intersection_n_los(los.reshape((points_nb, 2, 3)))
         return direct_dtm
 
     def inverse_loc(self, lon, lat, alt):
@@ -833,47 +835,36 @@ class RPC:
             if not np.any(filter_nan):
                 return long_out, lat_out, alt
 
-            # inverse localization starting from the center of the scene
-            lon = np.array([self.offset_x])
-            lat = np.array([self.offset_y])
-            (row_start, col_start, __) = self.inverse_loc(lon, lat, alt)
-
             # desired precision in pixels
             eps = 1e-6
 
-            iteration = 0
-            # computing the residue between the sensor positions and those estimated by the inverse localization
-            delta_col = col - col_start
-            delta_row = row - row_start
-
-            # ground coordinates (latitude and longitude) of each point
-            lon = np.repeat(lon, delta_col.size)
-            lat = np.repeat(lat, delta_col.size)
-            # while the required precision is not achieved
-            while (np.max(abs(delta_col)) > eps or np.max(abs(delta_row)) > eps) and iteration < nb_iter_max:
-                # list of points that require another iteration
-                iter_ = np.where((abs(delta_col) > eps) | (abs(delta_row) > eps))[0]
-
-                # partial derivatives
-                (dcol_dlon, dcol_dlat, drow_dlon, drow_dlat) = self.compute_loc_inverse_derivates(
-                    lon[iter_], lat[iter_], alt[iter_]
+            # Newton iterations starting from the center of the scene, run per point in a compiled kernel
+            lon, lat, nb_iter = direct_loc_inverse_iterative_numba(
+                row.astype(np.float64),
+                col.astype(np.float64),
+                alt.astype(np.float64),
+                self.num_col,
+                self.den_col,
+                self.num_row,
+                self.den_row,
+                self.scale_col,
+                self.offset_col,
+                self.scale_row,
+                self.offset_row,
+                self.scale_x,
+                self.offset_x,
+                self.scale_y,
+                self.offset_y,
+                self.scale_alt,
+                self.offset_alt,
+                nb_iter_max,
+                eps,
+            )
+            if np.any(nb_iter == nb_iter_max):
+                logging.debug(
+                    "direct localisation from inverse iterative: %d points reached the max number of iterations",
+                    np.sum(nb_iter == nb_iter_max),
                 )
-                det = dcol_dlon * drow_dlat - drow_dlon * dcol_dlat
-
-                delta_lon = (drow_dlat * delta_col[iter_] - dcol_dlat * delta_row[iter_]) / det
-                delta_lat = (-drow_dlon * delta_col[iter_] + dcol_dlon * delta_row[iter_]) / det
-
-                # update ground coordinates
-                lon[iter_] += delta_lon
-                lat[iter_] += delta_lat
-
-                # inverse localization
-                (row_estim, col_estim, __) = self.inverse_loc(lon[iter_], lat[iter_], alt[iter_])
-
-                # updating the residue between the sensor positions and those estimated by the inverse localization
-                delta_col[iter_] = col[iter_] - col_estim
-                delta_row[iter_] = row[iter_] - row_estim
-                iteration += 1
 
             long_out[filter_nan] = lon
             lat_out[filter_nan] = lat
@@ -884,6 +875,89 @@ class RPC:
 
         return long_out, lat_out, alt
 
+    # pylint: disable=too-many-locals
+    def fit_direct_coefficients(self, nb_points=(21, 21, 11), tolerance=0.01):
+        """
+        Fit direct RPC coefficients from inverse RPC, by least squares over a 3D sampling of the validity domain.
+        Ground positions of the sampling are computed by iterative direct localization, the rational functions
+        are linearized (denominator first coefficient fixed to 1).
+        Residuals are computed on the centers of the sampling cells: ground positions given by the fitted
+        direct RPC are projected back in the image with the inverse RPC.
+        Fitted coefficients are attached to the model, and then used by direct_loc_h, only if the maximum residual
+        is lower than tolerance.
+
+        :param nb_points: number of samples in row, col and altitude
+        :type nb_points: tuple(int, int, int)
+        :param tolerance: maximum residual in pixels to attach fitted coefficients
+        :type tolerance: float
+        :return: fit residuals in pixels (row max, col max, rms), None if inverse coefficients are not defined
+        :rtype: dict
+        """
+        if not self.inverse_coefficient:
+            logging.error("direct coefficients can't be fitted, inverse coefficients have not been defined")
+            return None
+
+        rows = np.linspace(self.row0, self.rowmax, nb_points[0])
+        cols = np.linspace(self.col0, self.colmax, nb_points[1])
+        alts = np.linspace(self.alt_minmax[0], self.alt_minmax[1], nb_points[2])
+        (row, col, alt) = (grid.ravel() for grid in np.meshgrid(rows, cols, alts, indexing="ij"))
+        (lon, lat, __) = self.direct_loc_inverse_iterative(row, col, alt)
+
+        # monomials of normalized sensor coordinates, in polynomial_equation order
+        sensor_norm = np.stack(
+            [
+                (col - self.offset_col) / self.scale_col,
+                (row - self.offset_row) / self.scale_row,
+                (alt - self.offset_alt) / self.scale_alt,
+            ],
+            axis=1,
+        )
+        monomials = np.prod(sensor_norm[:, np.newaxis, :] ** self.monomes[np.newaxis, :, 1:], axis=2)
+
+        coefficients = []
+        for ground_norm in [(lon - self.offset_x) / self.scale_x, (lat - self.offset_y) / self.scale_y]:
+            # ground_norm * (1 + den[1:].monomials[1:]) = num.monomials
+            design = np.hstack([monomials, -ground_norm[:, np.newaxis] * monomials[:, 1:]])
+            solution = np.linalg.lstsq(design, ground_norm, rcond=None)[0]
+            coefficients.append((solution[:20], np.concatenate([[1.0], solution[20:]])))
+        ((num_x, den_x), (num_y, den_y)) = coefficients
+
+        # residuals on sampling cells centers
+        (row, col, alt) = (
+            grid.ravel()
+            for grid in np.meshgrid(
+                (rows[:-1] + rows[1:]) / 2.0, (cols[:-1] + cols[1:]) / 2.0, (alts[:-1] + alts[1:]) / 2.0, indexing="ij"
+            )
+        )
+        # pylint: disable=unbalanced-tuple-unpacking
+        (lat, lon) = compute_rational_function_polynomial(
+            (col - self.offset_col) / self.scale_col,
+            (row - self.offset_row) / self.scale_row,
+            (alt - self.offset_alt) / self.scale_alt,
+            num_x,
+            den_x,
+            num_y,
+            den_y,
+            self.scale_x,
+            self.offset_x,
+            self.scale_y,
+            self.offset_y,
+        )
+        (row_inv, col_inv, __) = self.inverse_loc(lon, lat, alt)
+        residuals = {
+            "row_max": np.max(np.abs(row_inv - row)),
+            "col_max": np.max(np.abs(col_inv - col)),
+            "rms": np.sqrt(np.mean((row_inv - row) ** 2 + (col_inv - col) ** 2)),
+        }
+        logging.debug("direct coefficients fit residuals %s", residuals)
+
+        if max(residuals["row_max"], residuals["col_max"]) <= tolerance:
+            (self.num_x, self.den_x, self.num_y, self.den_y) = (num_x, den_x, num_y, den_y)
+            self.direct_coefficient = True
+        else:
+            logging.warning("direct coefficients fit residuals are above tolerance %f, they are not used", tolerance)
+        return residuals
+
     def get_alt_min_max(self):
         """
         returns altitudes min and max layers
@@ -1189,3 +1263,135 @@ def compute_loc_inverse_derivates_numba(
         drow_dlat[i] = scale_lin / scale_lat * (num_drow_dlat * den_drow - den_drow_dlat * num_drow) / den_drow**2
 
     return dcol_dlon, dcol_dlat, drow_dlon, drow_dlat
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+@njit(
+    "Tuple((f8[:], f8[:], i8[:]))(f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], "
+    "f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, i8, f8)",
+    parallel=True,
+    cache=True,
+    fastmath=True,
+)
+def direct_loc_inverse_iterative_numba(
+    row,
+    col,
+    alt,
+    num_col,
+    den_col,
+    num_lin,
+    den_lin,
+    scale_col,
+    offset_col,
+    scale_lin,
+    offset_lin,
+    scale_lon,
+    offset_lon,
+    scale_lat,
+    offset_lat,
+    scale_alt,
+    offset_alt,
+    nb_iter_max,
+    eps,
+):
+    """
+    Iterative direct localization using inverse RPC, Newton iterations are run independently for each point
+    using numba to reduce calculation time on multiple points.
+    Each point starts from the center of the scene (lon and lat offsets) at its own altitude and stops
+    when its residue is below eps pixel or after nb_iter_max iterations.
+
+    :param row: line sensor position
+    :type row: 1D np.array dtype np.float 64
+    :param col: column sensor position
+    :type col: 1D np.array dtype np.float 64
+    :param alt: altitude
+    :type alt: 1D np.array dtype np.float 64
+    :param num_col: Column numerator coefficients
+    :type num_col: 1D np.array dtype np.float 64
+    :param den_col: Column denominator coefficients
+    :type den_col: 1D np.array dtype np.float 64
+    :param num_lin: Line numerator coefficients
+    :type num_lin: 1D np.array dtype np.float 64
+    :param den_lin: Line denominator coefficients
+    :type den_lin: 1D np.array dtype np.float 64
+    :param scale_col: Column scale
+    :type scale_col: float 64
+    :param offset_col: Column offset
+    :type offset_col: float 64
+    :param scale_lin: Line scale
+    :type scale_lin: float 64
+    :param offset_lin: Line offset
+    :type offset_lin: float 64
+    :param scale_lon: Geodetic longitude scale
+    :type scale_lon: float 64
+    :param offset_lon: Geodetic longitude offset
+    :type offset_lon: float 64
+    :param scale_lat: Geodetic latitude scale
+    :type scale_lat: float 64
+    :param offset_lat: Geodetic latitude offset
+    :type offset_lat: float 64
+    :param scale_alt: Altitude scale
+    :type scale_alt: float 64
+    :param offset_alt: Altitude offset
+    :type offset_alt: float 64
+    :param nb_iter_max: max number of iteration
+    :type nb_iter_max: int
+    :param eps: desired precision in pixels
+    :type eps: float 64
+    :return: ground position (lon, lat) and number of iterations of each point
+    :rtype: Tuple(np.ndarray, np.ndarray, np.ndarray dtype np.int64)
+    """
+    lon_out = np.zeros((row.shape[0]), dtype=np.float64)
+    lat_out = np.zeros((row.shape[0]), dtype=np.float64)
+    nb_iter_out = np.zeros((row.shape[0]), dtype=np.int64)
+
+    # pylint: disable=not-an-iterable
+    for i in prange(row.shape[0]):
+        lon = offset_lon
+        lat = offset_lat
+        alt_norm = (alt[i] - offset_alt) / scale_alt
+        nb_iter = 0
+        while True:
+            lon_norm = (lon - offset_lon) / scale_lon
+            lat_norm = (lat - offset_lat) / scale_lat
+
+            # inverse localization
+            num_dcol = polynomial_equation(lon_norm, lat_norm, alt_norm, num_col)
+            den_dcol = polynomial_equation(lon_norm, lat_norm, alt_norm, den_col)
+            num_drow = polynomial_equation(lon_norm, lat_norm, alt_norm, num_lin)
+            den_drow = polynomial_equation(lon_norm, lat_norm, alt_norm, den_lin)
+
+            # residue between the sensor position and the one estimated by the inverse localization
+            delta_col = col[i] - (num_dcol / den_dcol * scale_col + offset_col)
+            delta_row = row[i] - (num_drow / den_drow * scale_lin + offset_lin)
+            if nb_iter == nb_iter_max or not (abs(delta_col) > eps or abs(delta_row) > eps):
+                break
+
+            # partial derivatives
+            num_dcol_dlon = derivative_polynomial_longitude(lon_norm, lat_norm, alt_norm, num_col)
+            den_dcol_dlon = derivative_polynomial_longitude(lon_norm, lat_norm, alt_norm, den_col)
+            num_drow_dlon = derivative_polynomial_longitude(lon_norm, lat_norm, alt_norm, num_lin)
+            den_drow_dlon = derivative_polynomial_longitude(lon_norm, lat_norm, alt_norm, den_lin)
+
+            num_dcol_dlat = derivative_polynomial_latitude(lon_norm, lat_norm, alt_norm, num_col)
+            den_dcol_dlat = derivative_polynomial_latitude(lon_norm, lat_norm, alt_norm, den_col)
+            num_drow_dlat = derivative_polynomial_latitude(lon_norm, lat_norm, alt_norm, num_lin)
+            den_drow_dlat = derivative_polynomial_latitude(lon_norm, lat_norm, alt_norm, den_lin)
+
+            dcol_dlon = scale_col / scale_lon * (num_dcol_dlon * den_dcol - den_dcol_dlon * num_dcol) / den_dcol**2
+            dcol_dlat = scale_col / scale_lat * (num_dcol_dlat * den_dcol - den_dcol_dlat * num_dcol) / den_dcol**2
+            drow_dlon = scale_lin / scale_lon * (num_drow_dlon * den_drow - den_drow_dlon * num_drow) / den_drow**2
+            drow_dlat = scale_lin / scale_lat * (num_drow_dlat * den_drow - den_drow_dlat * num_drow) / den_drow**2
+            det = dcol_dlon * drow_dlat - drow_dlon * dcol_dlat
+
+            # update ground coordinates
+            lon += (drow_dlat * delta_col - dcol_dlat * delta_row) / det
+            lat += (-drow_dlon * delta_col + dcol_dlon * delta_row) / det
+            nb_iter += 1
+
+        lon_out[i] = lon
+        lat_out[i] = lat
+        nb_iter_out[i] = nb_iter
+
+    return lon_out, lat_out, nb_iter_out
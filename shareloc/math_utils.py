@@ -67,7 +67,7 @@ def interpol_bilin(mats, nb_rows, nb_cols, delta_shift_row, delta_shift_col):
     return matis
 
 
-def interpol_bilin_vectorized(mats, nb_rows, nb_cols, delta_shift_row, delta_shift_col):
+def interpol_bilin_vectorized(mats, nb_rows, nb_cols, delta_shift_row, delta_shift_col, layers=slice(None)):
     """
     bilinear interpolation on multi points and layer  matrix
     :param mats: multi layer grid (: , nb_rows,nb_cols)
@@ -80,6 +80,9 @@ def interpol_bilin_vectorized(mats, nb_rows, nb_cols, delta_shift_row, delta_shi
     :type delta_shift_row: 1D numpy.ndarray, dtype=float64
     :param delta_shift_col: position (column)
     :type delta_shift_col: 1D numpy.ndarray, dtype=float64
+    :param layers: layers to interpolate, all by default, or layer index of each point
+        (integer array broadcastable against positions, only these layers are read)
+    :type layers: slice or numpy.ndarray dtype=int
     :return interpolated value on each layer
     :rtype list
     """
@@ -101,10 +104,10 @@ def interpol_bilin_vectorized(mats, nb_rows, nb_cols, delta_shift_row, delta_shi
     matis = []
     for mat in mats:
         mati = (
-            (1 - col_shift) * (1 - row_shift) * mat[:, lower_shift_row, lower_shift_col]
-            + col_shift * (1 - row_shift) * mat[:, lower_shift_row, upper_shift_col]
-            + (1 - col_shift) * row_shift * mat[:, upper_shift_row, lower_shift_col]
-            + col_shift * row_shift * mat[:, upper_shift_row, upper_shift_col]
+            (1 - col_shift) * (1 - row_shift) * mat[layers, lower_shift_row, lower_shift_col]
+            + col_shift * (1 - row_shift) * mat[layers, lower_shift_row, upper_shift_col]
+            + (1 - col_shift) * row_shift * mat[layers, upper_shift_row, lower_shift_col]
+            + col_shift * row_shift * mat[layers, upper_shift_row, upper_shift_col]
         )
         matis.append(mati)
 
@@ -23,29 +23,182 @@
 This module contains the projection functions for shareloc
 """
 
+# Standard imports
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Third party imports
 import numpy as np
+from numba import config, njit, prange
 from rasterio import crs, warp
 
+# Set numba type of threading layer before parallel target compilation
+config.THREADING_LAYER = "omp"
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
 
-def coordinates_conversion(coords, epsg_in, epsg_out):
+
+@lru_cache(maxsize=None)
+def get_crs_pair(epsg_in, epsg_out):
+    """
+    return the (input, output) SRS of a conversion, SRS are built once per process and EPSG codes couple
+
+    :param epsg_in: EPSG code of the input SRS
+    :type epsg_in: int
+    :param epsg_out: EPSG code of the output SRS
+    :type epsg_out: int
+    :returns: input and output SRS
+    :rtype: tuple(rasterio.crs.CRS, rasterio.crs.CRS)
+    """
+    return crs.CRS.from_epsg(epsg_in), crs.CRS.from_epsg(epsg_out)
+
+
+# pylint: disable=too-many-arguments
+def coordinates_conversion(coords, epsg_in, epsg_out, out=None, chunk_size=None, nb_workers=1):
     """
     Convert coords from a SRS to another one.
+    3D conversions between WGS84 geodetic (EPSG:4326) and geocentric (EPSG:4978) coordinates are computed
+    analytically (see geodetic_to_ecef_numba and ecef_to_geodetic_numba), others are done by rasterio.
+    Converted coordinates are written in out buffer if given, which can be coords itself for an in place conversion.
+    Large arrays can be converted by chunks of chunk_size coordinates, in nb_workers threads.
     :param coords: coords to project
     :type coords: numpy array of 2D coords  (shape  (2,) or (N,2) or 3D coords (shape  (3,) or (N,3))
     :param epsg_in: EPSG code of the input SRS
     :type epsg_in: int
     :param epsg_out: EPSG code of the output SRS
     :type epsg_out: int
+    :param out: output buffer, same shape as coords (N,2) or (N,3), dtype float64
+    :type out: numpy array
+    :param chunk_size: number of coordinates converted at once (rasterio conversions), all if None
+    :type chunk_size: int
+    :param nb_workers: number of threads converting chunks (rasterio conversions)
+    :type nb_workers: int
     :returns: converted coordinates
     :rtype: numpy array of 2D coord (N,2) or 3D coords (N,3)
     """
-    srs_in = crs.CRS.from_epsg(epsg_in)
-    srs_out = crs.CRS.from_epsg(epsg_out)
     if (coords.size / 3 == 1 or coords.size / 2 == 1) and (coords.ndim == 1):
         coords = coords[np.newaxis, :]
-    alti = None
+    coords = np.asarray(coords, dtype=np.float64)
+    if out is None:
+        out = np.empty(coords.shape, dtype=np.float64)
+    elif out.ndim == 1:
+        out = out[np.newaxis, :]
+
     if coords.shape[1] == 3:
-        alti = coords[:, 2]
-    coords = np.array(warp.transform(srs_in, srs_out, coords[:, 0], coords[:, 1], alti))
-    coords = coords.transpose()
-    return coords
+        if (epsg_in, epsg_out) == (4326, 4978):
+            return geodetic_to_ecef_numba(coords, out, WGS84_A, WGS84_F)
+        if (epsg_in, epsg_out) == (4978, 4326):
+            return ecef_to_geodetic_numba(coords, out, WGS84_A, WGS84_F)
+
+    (srs_in, srs_out) = get_crs_pair(epsg_in, epsg_out)
+
+    def convert_chunk(chunk):
+        """
+        convert a chunk of coordinates in out buffer
+        :param chunk: coordinates indexes
+        :type chunk: slice
+        """
+        alti = None
+        if coords.shape[1] == 3:
+            alti = coords[chunk, 2]
+        converted = warp.transform(srs_in, srs_out, coords[chunk, 0], coords[chunk, 1], alti)
+        for axis, values in enumerate(converted):
+            out[chunk, axis] = values
+
+    nb_coords = coords.shape[0]
+    if chunk_size is None:
+        chunk_size = max(-(-nb_coords // nb_workers), 1)
+    chunks = [slice(start, start + chunk_size) for start in range(0, nb_coords, chunk_size)]
+    if nb_workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=nb_workers) as executor:
+            list(executor.map(convert_chunk, chunks))
+    else:
+        for chunk in chunks:
+            convert_chunk(chunk)
+    return out
+
+
+@njit("f8[:, :](f8[:, :], f8[:, :], f8, f8)", parallel=True, cache=True)
+def geodetic_to_ecef_numba(coords, ecef, semi_major_axis, flattening):
+    """
+    Convert geodetic coordinates to geocentric (ECEF) ones, closed form
+
+    :param coords: geodetic coordinates (lon, lat in degrees, h in meters above ellipsoid)
+    :type coords: 2D np.array (N,3) dtype np.float64
+    :param ecef: output buffer, can be coords
+    :type ecef: 2D np.array (N,3) dtype np.float64
+    :param semi_major_axis: ellipsoid semi major axis in meters
+    :type semi_major_axis: float 64
+    :param flattening: ellipsoid flattening
+    :type flattening: float 64
+    :return: geocentric coordinates (x, y, z) in meters
+    :rtype: 2D np.array (N,3) dtype np.float64
+    """
+    ecc2 = flattening * (2.0 - flattening)
+    # pylint: disable=not-an-iterable
+    for i in prange(coords.shape[0]):
+        lon = np.deg2rad(coords[i, 0])
+        lat = np.deg2rad(coords[i, 1])
+        alt = coords[i, 2]
+        sin_lat = np.sin(lat)
+        cos_lat = np.cos(lat)
+        # prime vertical radius of curvature
+        radius = semi_major_axis / np.sqrt(1.0 - ecc2 * sin_lat * sin_lat)
+        ecef[i, 0] = (radius + alt) * cos_lat * np.cos(lon)
+        ecef[i, 1] = (radius + alt) * cos_lat * np.sin(lon)
+        ecef[i, 2] = (radius * (1.0 - ecc2) + alt) * sin_lat
+    return ecef
+
+
+@njit("f8[:, :](f8[:, :], f8[:, :], f8, f8)", parallel=True, cache=True)
+def ecef_to_geodetic_numba(coords, geodetic, semi_major_axis, flattening):
+    """
+    Convert geocentric (ECEF) coordinates to geodetic ones.
+    Latitude is computed by Bowring's formula, refined by one iteration on the parametric latitude
+    (sub micrometer accuracy for terrestrial points), height is computed without singularity at poles.
+    Angles are handled through their (cos, sin) couples, only the final latitude and longitude need an arctan.
+
+    :param coords: geocentric coordinates (x, y, z) in meters
+    :type coords: 2D np.array (N,3) dtype np.float64
+    :param geodetic: output buffer, can be coords
+    :type geodetic: 2D np.array (N,3) dtype np.float64
+    :param semi_major_axis: ellipsoid semi major axis in meters
+    :type semi_major_axis: float 64
+    :param flattening: ellipsoid flattening
+    :type flattening: float 64
+    :return: geodetic coordinates (lon, lat in degrees, h in meters above ellipsoid)
+    :rtype: 2D np.array (N,3) dtype np.float64
+    """
+    ecc2 = flattening * (2.0 - flattening)
+    semi_minor_axis = semi_major_axis * (1.0 - flattening)
+    # second eccentricity
+    ecc2_prime = ecc2 / (1.0 - ecc2)
+    # pylint: disable=not-an-iterable
+    for i in prange(coords.shape[0]):
+        pos_x = coords[i, 0]
+        pos_y = coords[i, 1]
+        pos_z = coords[i, 2]
+        dist_axis = np.sqrt(pos_x * pos_x + pos_y * pos_y)
+        # parametric latitude first guess
+        cos_beta = dist_axis * semi_minor_axis
+        sin_beta = pos_z * semi_major_axis
+        for iteration in range(2):
+            norm = np.sqrt(cos_beta * cos_beta + sin_beta * sin_beta)
+            cos_beta /= norm
+            sin_beta /= norm
+            # Bowring's formula
+            cos_lat = dist_axis - ecc2 * semi_major_axis * cos_beta**3
+            sin_lat = pos_z + ecc2_prime * semi_minor_axis * sin_beta**3
+            norm = np.sqrt(cos_lat * cos_lat + sin_lat * sin_lat)
+            cos_lat /= norm
+            sin_lat /= norm
+            if iteration == 0:
+                # parametric latitude from geodetic one: tan(beta) = (1 - f) tan(lat)
+                cos_beta = cos_lat
+                sin_beta = (1.0 - flattening) * sin_lat
+        geodetic[i, 0] = np.rad2deg(np.arctan2(pos_y, pos_x))
+        geodetic[i, 1] = np.rad2deg(np.arctan2(sin_lat, cos_lat))
+        geodetic[i, 2] = dist_axis * cos_lat + pos_z * sin_lat - semi_major_axis * np.sqrt(1.0 - ecc2 * sin_lat**2)
+    return geodetic
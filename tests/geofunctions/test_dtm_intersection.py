@@ -23,15 +23,29 @@ Test module for localisation class shareloc/geofunctions/dtm_intersection.py
 """
 
 # Standard imports
+import logging
 import os
+import tempfile
+import time
 
 import numpy as np
 
 # Third party imports
 import pytest
+import rasterio
+from affine import Affine
+from scipy import interpolate
 
 # Shareloc imports
-from shareloc.geofunctions.dtm_intersection import DTMIntersection, interpolate_geoid_height
+from shareloc.dtm_image import DTMMosaic
+from shareloc.geofunctions.dtm_intersection import (
+    DTMIntersection,
+    interpolate_geoid_height,
+    intersect_dtm_cube_numba,
+    intersection_n_los_numba,
+    intersection_numba,
+    load_geoid,
+)
 
 # Shareloc test imports
 from ..helpers import data_path
@@ -57,6 +71,43 @@ def test_geoid_height(lon, lat, valid_alt):
     assert geoid_height == pytest.approx(valid_alt, abs=1e-6)
 
 
+@pytest.mark.unit_tests
+def test_geoid_height_interpn():
+    """
+    Test compiled geoid height interpolation against scipy interpn, and geoid cache
+    """
+    geoid_file = os.path.join(data_path(), "dtm/geoid/egm96_15.gtx")
+    rng = np.random.default_rng(0)
+    positions = np.column_stack([rng.uniform(-179.0, 179.0, 10000), rng.uniform(-89.0, 89.0, 10000)])
+    geoid_height = interpolate_geoid_height(geoid_file, positions.copy())
+
+    geoid_image = load_geoid(geoid_file)
+    assert load_geoid(geoid_file) is geoid_image
+    indexes_geoid = geoid_image.transform_physical_point_to_index(positions[:, 1], positions[:, 0])
+    points = (np.arange(geoid_image.nb_rows), np.arange(geoid_image.nb_columns))
+    geoid_height_interpn = interpolate.interpn(points, geoid_image.data, indexes_geoid)
+    np.testing.assert_allclose(geoid_height, geoid_height_interpn, rtol=0.0, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        interpolate_geoid_height(geoid_file, np.array([[179.99, 0.0]]))
+
+
+@pytest.mark.unit_tests
+def test_geoid_subsampling():
+    """
+    Test geoid height computed on a sub-grid
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    roi = [256, 256, 512, 600]
+    dtm_ventoux = DTMIntersection(dtm_file, geoid_file, roi=roi, roi_is_in_physical_space=False)
+    for geoid_subsampling in [10, 50]:
+        dtm_sub = DTMIntersection(
+            dtm_file, geoid_file, roi=roi, roi_is_in_physical_space=False, geoid_subsampling=geoid_subsampling
+        )
+        np.testing.assert_allclose(dtm_sub.alt_data, dtm_ventoux.alt_data, rtol=0.0, atol=5e-2)
+
+
 @pytest.mark.parametrize("index_col,index_row, valid_alt", [(10.0, 20.0, 196.0), (20.5, 25.5, 189.5)])
 @pytest.mark.unit_tests
 def test_interp_dtm(index_col, index_row, valid_alt):
@@ -114,3 +165,332 @@ def test_dtm_alt_min_max():
     alt_max_vt = np.load(alt_valid_max)
     np.testing.assert_array_equal(alt_min, alt_min_vt)
     np.testing.assert_array_equal(alt_max, alt_max_vt)
+
+
+@pytest.mark.unit_tests
+def test_dtm_alt_min_max_nan():
+    """
+    Test dtm alt min/max with nan values, compared to a cell by cell computation
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    dtm_ventoux = DTMIntersection(dtm_file, roi=[0, 0, 32, 32], roi_is_in_physical_space=False)
+    dtm_ventoux.alt_data[3, 3] = np.nan
+    dtm_ventoux.alt_data[10:12, 10:12] = np.nan
+    dtm_ventoux.alt_data[20, 20] = 40000.0
+    dtm_ventoux.init_min_max()
+
+    (nb_rows, nb_cols) = dtm_ventoux.alt_data.shape
+    alt_min_vt = np.zeros((nb_rows - 1, nb_cols - 1))
+    alt_max_vt = np.zeros((nb_rows - 1, nb_cols - 1))
+    for row in range(nb_rows - 1):
+        for col in range(nb_cols - 1):
+            (d_alt_min, d_alt_max) = (32000, -32000)
+            for d_z in dtm_ventoux.alt_data[row : row + 2, col : col + 2].ravel():
+                # nan comparisons are False: nan values are ignored
+                d_alt_min = min(d_alt_min, d_z)
+                d_alt_max = max(d_alt_max, d_z)
+            alt_min_vt[row, col] = np.floor(d_alt_min)
+            alt_max_vt[row, col] = np.ceil(d_alt_max)
+    np.testing.assert_array_equal(dtm_ventoux.alt_min_cell, alt_min_vt)
+    np.testing.assert_array_equal(dtm_ventoux.alt_max_cell, alt_max_vt)
+
+
+@pytest.mark.parametrize("dtm_size", [128, 256, 512, 1024])
+@pytest.mark.benchmark
+def test_dtm_construction_benchmark(dtm_size):
+    """
+    Benchmark DTMIntersection construction time against DTM size
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    roi = [0, 0, dtm_size, dtm_size]
+    start = time.perf_counter()
+    dtm_ventoux = DTMIntersection(dtm_file, roi=roi, roi_is_in_physical_space=False)
+    construction_time = time.perf_counter() - start
+    start = time.perf_counter()
+    dtm_ventoux.init_min_max()
+    min_max_time = time.perf_counter() - start
+    # pylint: disable=logging-too-many-args
+    logging.info(
+        "DTM %dx%d: construction %.4f s, init_min_max %.4f s",
+        dtm_ventoux.dtm_image.nb_rows,
+        dtm_ventoux.dtm_image.nb_columns,
+        construction_time,
+        min_max_time,
+    )
+    assert dtm_ventoux.alt_min_cell.shape == (dtm_size - 1, dtm_size - 1)
+
+
+@pytest.mark.unit_tests
+def test_dtm_min_max_pyramid():
+    """
+    Test dtm min/max pyramid and empty space skipping in DTM intersection
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    dtm_ventoux = DTMIntersection(dtm_file, geoid_file, roi=[256, 256, 512, 600], roi_is_in_physical_space=False)
+
+    # level 0 is the cell min/max, last level is the whole dtm
+    nb_cells = dtm_ventoux.alt_max_cell.size
+    np.testing.assert_array_equal(dtm_ventoux.alt_max_pyramid[:nb_cells], dtm_ventoux.alt_max_cell.ravel())
+    np.testing.assert_array_equal(dtm_ventoux.pyramid_shapes[-1], [1, 1])
+    assert dtm_ventoux.alt_max_pyramid[-1] == dtm_ventoux.alt_max_cell.max()
+    assert dtm_ventoux.alt_min_pyramid[-1] == dtm_ventoux.alt_min_cell.min()
+    offset = dtm_ventoux.pyramid_offsets[1]
+    assert dtm_ventoux.alt_max_pyramid[offset + 1 * dtm_ventoux.pyramid_shapes[1, 1] + 2] == np.max(
+        dtm_ventoux.alt_max_cell[2:4, 4:6]
+    )
+
+    # intersection with and without blocks skipping
+    rng = np.random.default_rng(0)
+    nb_los = 500
+    los_index = np.zeros((nb_los, 2, 3))
+    los_index[:, 1, 0] = rng.uniform(10, dtm_ventoux.dtm_image.nb_rows - 10, nb_los)
+    los_index[:, 1, 1] = rng.uniform(10, dtm_ventoux.dtm_image.nb_columns - 10, nb_los)
+    los_index[:, 0, 0] = los_index[:, 1, 0] + rng.uniform(-100, 100, nb_los)
+    los_index[:, 0, 1] = los_index[:, 1, 1] + rng.uniform(-100, 100, nb_los)
+    los_index[:, 0, 2] = dtm_ventoux.alt_max + 10.0
+    los_index[:, 1, 2] = dtm_ventoux.alt_min - 10.0
+    los = dtm_ventoux.indexs_to_ters(los_index.reshape((-1, 3))).reshape(los_index.shape)
+    points = dtm_ventoux.intersection_n_los(los)
+    points_no_skip = intersection_n_los_numba(
+        dtm_ventoux.ters_to_indexs(los.reshape((-1, 3))).reshape(los_index.shape),
+        dtm_ventoux.plane_coef_a,
+        dtm_ventoux.plane_coef_b,
+        dtm_ventoux.plane_coef_c,
+        dtm_ventoux.plane_coef_d,
+        dtm_ventoux.alt_data,
+        dtm_ventoux.alt_min_cell,
+        dtm_ventoux.alt_max_cell,
+        dtm_ventoux.alt_max_pyramid,
+        dtm_ventoux.pyramid_offsets[:1],
+        dtm_ventoux.pyramid_shapes[:1],
+        dtm_ventoux.tol_z,
+    )
+    assert np.count_nonzero(~np.isnan(points_no_skip[:, 0])) > nb_los // 2
+    np.testing.assert_allclose(points, dtm_ventoux.indexs_to_ters(points_no_skip), rtol=0.0, atol=1e-9)
+
+    # lines of sight fly over blocks under them: fewer cells are searched with blocks skipping
+    los_index = dtm_ventoux.ters_to_indexs(los.reshape((-1, 3))).reshape(los_index.shape)
+    nb_cells = np.zeros(nb_los, dtype=np.int64)
+    nb_cells_no_skip = np.zeros(nb_los, dtype=np.int64)
+    for index in range(nb_los):
+        (cube_found, point_b_dtm, h_intersect) = intersect_dtm_cube_numba(
+            los_index[index],
+            dtm_ventoux.plane_coef_a,
+            dtm_ventoux.plane_coef_b,
+            dtm_ventoux.plane_coef_c,
+            dtm_ventoux.plane_coef_d,
+        )
+        if not cube_found:
+            continue
+        for levels, cells in [(slice(None), nb_cells), (slice(0, 1), nb_cells_no_skip)]:
+            (__, __, cells[index]) = intersection_numba(
+                los_index[index],
+                point_b_dtm,
+                h_intersect,
+                dtm_ventoux.alt_data,
+                dtm_ventoux.alt_min_cell,
+                dtm_ventoux.alt_max_cell,
+                dtm_ventoux.alt_max_pyramid,
+                dtm_ventoux.pyramid_offsets[levels],
+                dtm_ventoux.pyramid_shapes[levels],
+                dtm_ventoux.tol_z,
+            )
+    assert np.all(nb_cells <= nb_cells_no_skip)
+    assert np.sum(nb_cells) < np.sum(nb_cells_no_skip) // 2
+
+
+@pytest.mark.unit_tests
+def test_dtm_tiled():
+    """
+    Test DTM intersection in tiled mode against in memory DTM
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    roi = [100, 200, 700, 900]
+    dtm_ventoux = DTMIntersection(
+        dtm_file, geoid_file, roi=roi, roi_is_in_physical_space=False, fill_nodata="constant", fill_value=100.0
+    )
+    dtm_tiled = DTMIntersection(
+        dtm_file,
+        geoid_file,
+        roi=roi,
+        roi_is_in_physical_space=False,
+        fill_nodata="constant",
+        fill_value=100.0,
+        tile_size=128,
+        cache_size=6,
+    )
+    assert dtm_tiled.alt_min == dtm_ventoux.alt_min
+    assert dtm_tiled.alt_max == dtm_ventoux.alt_max
+    # tiles are not read at construction
+    assert len(dtm_tiled.dtm_image.tiles) == 0
+    assert dtm_tiled.interpolate(300.3, 400.7) == dtm_ventoux.interpolate(300.3, 400.7)
+    assert dtm_tiled.interpolate(-3.0, 800.0) == dtm_ventoux.interpolate(-3.0, 800.0)
+
+    rng = np.random.default_rng(0)
+    nb_los = 200
+    los_index = np.zeros((nb_los, 2, 3))
+    los_index[:, 1, 0] = rng.uniform(10, dtm_ventoux.dtm_image.nb_rows - 10, nb_los)
+    los_index[:, 1, 1] = rng.uniform(10, dtm_ventoux.dtm_image.nb_columns - 10, nb_los)
+    los_index[:, 0, 0] = los_index[:, 1, 0] + rng.uniform(-50, 50, nb_los)
+    los_index[:, 0, 1] = los_index[:, 1, 1] + rng.uniform(-50, 50, nb_los)
+    los_index[:, 0, 2] = dtm_ventoux.alt_max + 10.0
+    los_index[:, 1, 2] = dtm_ventoux.alt_min - 10.0
+    los = dtm_ventoux.indexs_to_ters(los_index.reshape((-1, 3))).reshape(los_index.shape)
+    points = dtm_ventoux.intersection_n_los(los)
+    np.testing.assert_allclose(dtm_tiled.intersection_n_los(los), points, rtol=0.0, atol=1e-9)
+    # lines of sight are split into windows bounded by the tiles cache
+    assert len(dtm_tiled.split_los(dtm_tiled.ters_to_indexs(los.reshape((-1, 3))).reshape(los.shape))) > 1
+    assert dtm_tiled.window[2] * dtm_tiled.window[3] <= 6 * 128 * 128
+
+    # DTM larger than overview without statistics: altitude bounds must be given
+    with pytest.raises(ValueError):
+        dtm_tiled.overview_min_max(overview_size=64)
+
+    # one window by line of sight
+    for index in range(20):
+        dtm_tiled.window = None
+        (__, __, point_b, alti) = dtm_tiled.intersect_dtm_cube(los[index])
+        window = dtm_tiled.window
+        assert window[2] < 110 and window[3] < 110
+        if point_b is None:
+            assert np.all(np.isnan(points[index]))
+        else:
+            (__, found, point_dtm) = dtm_tiled.intersection(los[index], point_b, alti)
+            assert dtm_tiled.window == window
+            assert found == np.all(np.isfinite(points[index]))
+            if found:
+                np.testing.assert_allclose(point_dtm, points[index], rtol=0.0, atol=1e-9)
+
+
+@pytest.mark.unit_tests
+def test_dtm_tiled_alt_bounds():
+    """
+    Test tiled mode without altitude bounds on a DTM larger than the overview
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    with pytest.raises(ValueError):
+        DTMIntersection(dtm_file, geoid_file, fill_nodata="constant", fill_value=100.0, tile_size=128)
+
+    dtm_ventoux = DTMIntersection(dtm_file, geoid_file, fill_nodata="constant", fill_value=100.0)
+    with tempfile.TemporaryDirectory() as directory:
+        # copy with dataset statistics
+        stats_file = os.path.join(directory, "N44E005.tif")
+        with rasterio.open(dtm_file) as src:
+            data = src.read(1)
+            profile = src.profile
+            profile.update(driver="GTiff")
+            with rasterio.open(stats_file, "w", **profile) as dst:
+                dst.write(data, 1)
+                valid = data[data != src.nodata]
+                dst.update_tags(1, STATISTICS_MINIMUM=valid.min(), STATISTICS_MAXIMUM=valid.max())
+        dtm_tiled = DTMIntersection(
+            stats_file, geoid_file, fill_nodata="constant", fill_value=100.0, tile_size=128, cache_size=8
+        )
+        assert dtm_tiled.alt_min <= dtm_ventoux.alt_min
+        assert dtm_tiled.alt_max >= dtm_ventoux.alt_max
+
+        # lines of sight built from the estimated bounds
+        rng = np.random.default_rng(1)
+        nb_los = 300
+        los_index = np.zeros((nb_los, 2, 3))
+        los_index[:, 1, 0] = rng.uniform(100, 800, nb_los)
+        los_index[:, 1, 1] = rng.uniform(200, 900, nb_los)
+        los_index[:, 0, 0] = los_index[:, 1, 0] + rng.uniform(-0.5, 0.5, nb_los)
+        los_index[:, 0, 1] = los_index[:, 1, 1] + rng.uniform(-0.5, 0.5, nb_los)
+        los_index[:, 0, 2] = dtm_tiled.alt_max + 1.0
+        los_index[:, 1, 2] = dtm_tiled.alt_min - 1.0
+        los = dtm_ventoux.indexs_to_ters(los_index.reshape((-1, 3))).reshape(los_index.shape)
+        points = dtm_ventoux.intersection_n_los(los)
+        assert np.all(np.isfinite(points))
+        # cube bounds differ from in memory DTM ones: intersection search starts from another point
+        np.testing.assert_allclose(dtm_tiled.intersection_n_los(los), points, rtol=0.0, atol=1e-6)
+
+
+@pytest.mark.unit_tests
+def test_dtm_mosaic():
+    """
+    Test DTM intersection on a directory of DTM tiles against the mosaicked DTM
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    with rasterio.open(dtm_file) as dataset:
+        mosaic_data = dataset.read(1, window=rasterio.windows.Window(0, 0, 201, 201))
+    # N43E006 tile is missing
+    mosaic_data[100:, 100:] = 0
+    profile = {"driver": "GTiff", "count": 1, "dtype": "int16", "crs": "EPSG:4326", "nodata": -32768}
+    with tempfile.TemporaryDirectory() as tiles_directory:
+        # 1 degree tiles of 101x101 pixels, sharing their border pixels like SRTM tiles
+        for lat, lon, row, col in [(44, 5, 0, 0), (44, 6, 0, 100), (43, 5, 100, 0)]:
+            tile_file = os.path.join(tiles_directory, f"N{lat:02d}E{lon:03d}.tif")
+            transform = Affine(0.01, 0.0, lon - 0.005, 0.0, -0.01, lat + 1.005)
+            with rasterio.open(tile_file, "w", height=101, width=101, transform=transform, **profile) as tile:
+                tile.write(mosaic_data[row : row + 101, col : col + 101], 1)
+        mosaic_file = os.path.join(tiles_directory, "mosaic.tif")
+        transform = Affine(0.01, 0.0, 4.995, 0.0, -0.01, 45.005)
+        with rasterio.open(mosaic_file, "w", height=201, width=201, transform=transform, **profile) as mosaic:
+            mosaic.write(mosaic_data, 1)
+
+        mosaic_image = DTMMosaic(tiles_directory, cache_size=2)
+        assert (mosaic_image.nb_rows, mosaic_image.nb_columns) == (201, 201)
+        assert mosaic_image.transform.almost_equals(transform)
+        np.testing.assert_array_equal(mosaic_image.read_window(90, 80, 111, 40), mosaic_data[90:, 80:120])
+        assert len(mosaic_image.tiles) == 2
+
+        # tiles are not scanned: altitude bounds are required
+        with pytest.raises(ValueError):
+            DTMIntersection(tiles_directory)
+        dtm_mosaic = DTMIntersection(tiles_directory, alt_bounds=[mosaic_data.min(), mosaic_data.max()])
+        dtm_ref = DTMIntersection(mosaic_file)
+        assert dtm_mosaic.epsg == 4326
+        assert dtm_mosaic.interpolate(99.5, 100.5) == dtm_ref.interpolate(99.5, 100.5)
+
+        rng = np.random.default_rng(0)
+        nb_los = 200
+        los_index = np.zeros((nb_los, 2, 3))
+        los_index[:, 1, 0:2] = rng.uniform(5, 195, (nb_los, 2))
+        los_index[:, 0, 0:2] = los_index[:, 1, 0:2] + rng.uniform(-30, 30, (nb_los, 2))
+        los_index[:, 0, 2] = dtm_ref.alt_max + 10.0
+        los_index[:, 1, 2] = dtm_ref.alt_min - 10.0
+        los = dtm_ref.indexs_to_ters(los_index.reshape((-1, 3))).reshape(los_index.shape)
+        points = dtm_ref.intersection_n_los(los)
+        assert np.count_nonzero(np.isfinite(points[:, 0])) > nb_los // 2
+        np.testing.assert_allclose(dtm_mosaic.intersection_n_los(los), points, rtol=0.0, atol=1e-9)
+
+
+@pytest.mark.unit_tests
+def test_dtm_mosaic_non_square_pixels():
+    """
+    Test DTM mosaic of tiles whose rows and columns resolutions differ (COP-DEM above 50 degrees of latitude)
+    """
+    rng = np.random.default_rng(0)
+    mosaic_data = rng.integers(0, 1000, (200, 100)).astype(np.int16)
+    profile = {"driver": "GTiff", "count": 1, "dtype": "int16", "crs": "EPSG:4326", "nodata": -32768}
+    with tempfile.TemporaryDirectory() as tiles_directory:
+        # 1 degree tiles of 100 rows x 50 columns, without overlap like COP-DEM tiles
+        for lat, lon, row, col in [(51, 5, 0, 0), (51, 6, 0, 50), (50, 5, 100, 0), (50, 6, 100, 50)]:
+            tile_file = os.path.join(tiles_directory, f"N{lat:02d}E{lon:03d}.tif")
+            transform = Affine(0.02, 0.0, lon, 0.0, -0.01, lat + 1)
+            with rasterio.open(tile_file, "w", height=100, width=50, transform=transform, **profile) as tile:
+                tile.write(mosaic_data[row : row + 100, col : col + 50], 1)
+
+        mosaic_image = DTMMosaic(tiles_directory, cache_size=4)
+        assert (mosaic_image.rows_per_degree, mosaic_image.cols_per_degree) == (100, 50)
+        assert (mosaic_image.nb_rows, mosaic_image.nb_columns) == (200, 100)
+        assert mosaic_image.transform.almost_equals(Affine(0.02, 0.0, 5.0, 0.0, -0.01, 52.0))
+        np.testing.assert_array_equal(mosaic_image.read_window(0, 0, 200, 100), mosaic_data)
+        np.testing.assert_array_equal(mosaic_image.read_window(90, 40, 20, 20), mosaic_data[90:110, 40:60])
+
+        # tile misaligned with the reference tile
+        tile_file = os.path.join(tiles_directory, "N50E006.tif")
+        transform = Affine(0.02, 0.0, 6.01, 0.0, -0.01, 51.0)
+        with rasterio.open(tile_file, "w", height=100, width=50, transform=transform, **profile) as tile:
+            tile.write(mosaic_data[100:, 50:], 1)
+        with pytest.raises(ValueError):
+            DTMMosaic(tiles_directory)
+        # tile shape differs from the reference tile one
+        with rasterio.open(tile_file, "w", height=100, width=100, transform=transform, **profile) as tile:
+            tile.write(mosaic_data[100:, :], 1)
+        with pytest.raises(ValueError):
+            DTMMosaic(tiles_directory)
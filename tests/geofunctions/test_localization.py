@@ -161,6 +161,25 @@ def test_gld_dtm(idxrow, idxcol, row0, col0, steprow, stepcol, nbrow, nbcol):
     assert lonlatalt == pytest.approx(valid_lonlatalt, abs=1e-12)
 
 
+@pytest.mark.unit_tests
+def test_grid_direct_loc_dtm_multi_points():
+    """
+    Test grid direct localization on dtm of several points at once against los by los intersection
+    """
+    dtmbsq, gri = prepare_loc()
+    rng = np.random.default_rng(0)
+    row = rng.uniform(gri.row0, gri.rowmax, 20)
+    col = rng.uniform(gri.col0, gri.colmax, 20)
+    lonlatalt = gri.direct_loc_dtm(row, col, dtmbsq)
+    los = gri.compute_los(row, col, dtmbsq.epsg)
+    assert los.shape == (20, gri.nbalt, 3)
+    for index in range(20):
+        np.testing.assert_array_equal(los[index], gri.compute_los(row[index], col[index], dtmbsq.epsg))
+        (__, __, position_cube, alti) = dtmbsq.intersect_dtm_cube(los[index])
+        (__, __, valid_lonlatalt) = dtmbsq.intersection(los[index], position_cube, alti)
+        np.testing.assert_allclose(lonlatalt[index], valid_lonlatalt, rtol=0, atol=1e-9)
+
+
 @pytest.mark.parametrize("col,row", [(50.5, 100.5)])
 @pytest.mark.parametrize("valid_lon,valid_lat,valid_alt", [(57.21700176041541, 21.959197148974, 238.0)])
 @pytest.mark.unit_tests
@@ -486,6 +505,34 @@ def test_loc_dir_loc_inv(row, col, h):
     assert col == pytest.approx(inv_col, abs=1e-2)
 
 
+@pytest.mark.unit_tests
+def test_loc_dir_loc_inv_multi_points():
+    """
+    Test direct localization followed by inverse one on several points and altitudes at once
+    """
+    ___, gri = prepare_loc()
+    # init predictors
+    gri.estimate_inverse_loc_predictor()
+    rng = np.random.default_rng(0)
+    row = rng.uniform(gri.row0, gri.rowmax, 100)
+    col = rng.uniform(gri.col0, gri.colmax, 100)
+    alt = rng.uniform(gri.alts_down[-1], gri.alts_down[0], 100)
+    lonlatalt = np.array([gri.direct_loc_h(row[index], col[index], alt[index])[0] for index in range(100)])
+    # last point is far from the grid footprint: predictor extrapolation
+    lonlatalt[-1, 0] += 10.0
+    inv_row, inv_col, inv_alt = gri.inverse_loc(lonlatalt[:, 0], lonlatalt[:, 1], alt)
+
+    np.testing.assert_array_equal(inv_alt, alt)
+    np.testing.assert_allclose(inv_row[:-1], row[:-1], rtol=0.0, atol=1e-6)
+    np.testing.assert_allclose(inv_col[:-1], col[:-1], rtol=0.0, atol=1e-6)
+    assert np.isnan(inv_row[-1])
+    assert np.isnan(inv_col[-1])
+    for index in [0, 50]:
+        point_row, point_col, __ = gri.inverse_loc(lonlatalt[index, 0], lonlatalt[index, 1], alt[index])
+        assert point_row[0] == pytest.approx(inv_row[index], abs=1e-9)
+        assert point_col[0] == pytest.approx(inv_col[index], abs=1e-9)
+
+
 # delta vt 0.5 pixel shift between physical model and rpc OTB
 @pytest.mark.parametrize(
     "id_scene, rpc, col,row, h",
@@ -529,6 +576,21 @@ def test_coloc(l0_src, c0_src, steprow_src, stepcol_src, nbrow_src, nbcol_src, r
     assert gricol[1, row, col] == pytest.approx(col * stepcol_src + c0_src, 1e-6)
 
 
+@pytest.mark.unit_tests
+def test_coloc_chunks():
+    """
+    Test coloc function by chunks of grid nodes
+    """
+    dtmbsq, gri = prepare_loc()
+    gri.estimate_inverse_loc_predictor()
+
+    gricol = coloc(gri, gri, dtmbsq, [0.5, 1.5], [10, 100], [20, 20])
+    assert gricol.shape == (3, 20, 20)
+    for chunk_size in [1, 7, 400, 1000]:
+        gricol_chunk = coloc(gri, gri, dtmbsq, [0.5, 1.5], [10, 100], [20, 20], chunk_size=chunk_size)
+        np.testing.assert_allclose(gricol_chunk, gricol, rtol=0, atol=1e-6)
+
+
 @pytest.mark.parametrize("col,lig,h", [(1000.5, 1500.5, 10.0)])
 @pytest.mark.unit_tests
 def test_loc_dir_loc_inv_couple(lig, col, h):
@@ -23,6 +23,7 @@ Test module for rectification grid interpolation class shareloc/geofunctions/rec
 """
 
 # Standard imports
+import logging
 import math
 import os
 
@@ -30,12 +31,17 @@ import os
 import numpy as np
 import pytest
 import rasterio
+from scipy import interpolate
 
 # Shareloc imports
 from shareloc.geofunctions.dtm_intersection import DTMIntersection
+from shareloc.geofunctions.localization import coloc
 from shareloc.geofunctions.rectification import (  # write_epipolar_grid,
     compute_epipolar_angle,
+    compute_epipolar_lines_starts,
+    compute_local_epipolar_line,
     compute_stereorectification_epipolar_grids,
+    compute_stereorectification_epipolar_grids_adaptive,
     get_epipolar_extent,
     moving_along_lines,
     moving_to_next_line,
@@ -206,6 +212,246 @@ def test_compute_stereorectification_epipolar_grids_geomodel_rpc_dtm_geoid():
     assert mean_br == pytest.approx(reference_mean_br, abs=1e-5)
 
 
+@pytest.mark.parametrize("line_block_size", [1, 7, 100])
+@pytest.mark.unit_tests
+def test_compute_stereorectification_epipolar_grids_line_blocks(line_block_size):
+    """
+    Test epipolar grids generation with epipolar lines starting points computed by blocks of lines:
+    same grids as line by line computation
+
+    Input Geomodels: RPC
+    Earth elevation: SRTM DTM + Geoid egm96_15
+    """
+    geom_model_left = RPC.from_any(
+        os.path.join(data_path(), "rectification", "left_image.geom"), topleftconvention=True
+    )
+    geom_model_right = RPC.from_any(
+        os.path.join(data_path(), "rectification", "right_image.geom"), topleftconvention=True
+    )
+    left_im = Image(os.path.join(data_path(), "rectification", "left_image.tif"))
+    right_im = Image(os.path.join(data_path(), "rectification", "right_image.tif"))
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    dtm_ventoux = DTMIntersection(dtm_file, geoid_file)
+
+    epi_step = 30
+    elevation_offset = 50
+    left_grid, right_grid, img_size_row, img_size_col, mean_br = compute_stereorectification_epipolar_grids(
+        left_im, geom_model_left, right_im, geom_model_right, dtm_ventoux, epi_step, elevation_offset
+    )
+    (
+        left_grid_blocks,
+        right_grid_blocks,
+        img_size_row_blocks,
+        img_size_col_blocks,
+        mean_br_blocks,
+    ) = compute_stereorectification_epipolar_grids(
+        left_im,
+        geom_model_left,
+        right_im,
+        geom_model_right,
+        dtm_ventoux,
+        epi_step,
+        elevation_offset,
+        line_block_size=line_block_size,
+    )
+
+    np.testing.assert_allclose(left_grid_blocks.data, left_grid.data, atol=1e-6, rtol=0)
+    np.testing.assert_allclose(right_grid_blocks.data, right_grid.data, atol=1e-6, rtol=0)
+    assert (img_size_row_blocks, img_size_col_blocks) == (img_size_row, img_size_col)
+    assert mean_br_blocks == pytest.approx(mean_br, abs=1e-9)
+
+
+# pylint: disable=too-many-arguments
+# pylint: disable=too-many-locals
+@pytest.mark.parametrize(
+    "use_dtm,gt_left,gt_right,reference_mean_br,max_coloc_ratio",
+    [
+        (False, "gt_left_grid.tif", "gt_right_grid.tif", 0.704004705, 0.1),
+        (True, "gt_left_grid_dtm.tif", "gt_right_grid_dtm.tif", 0.7039416432, 0.9),
+    ],
+)
+@pytest.mark.unit_tests
+def test_compute_stereorectification_epipolar_grids_adaptive(
+    monkeypatch, use_dtm, gt_left, gt_right, reference_mean_br, max_coloc_ratio
+):
+    """
+    Test coarse to fine epipolar grids generation against OTB reference grids and regular grids generation,
+    and the number of colocalized points
+
+    Input Geomodels: RPC
+    Earth elevation: default to 0.0 or SRTM DTM + Geoid egm96_15
+    """
+    nb_coloc = [0]
+
+    def counted_coloc(geom_model_1, geom_model_2, row, col, elevation):
+        """
+        coloc counting colocalized points
+        """
+        nb_coloc[0] += np.size(row)
+        return coloc(geom_model_1, geom_model_2, row, col, elevation)
+
+    monkeypatch.setattr("shareloc.geofunctions.rectification.coloc", counted_coloc)
+
+    geom_model_left = RPC.from_any(
+        os.path.join(data_path(), "rectification", "left_image.geom"), topleftconvention=True
+    )
+    geom_model_right = RPC.from_any(
+        os.path.join(data_path(), "rectification", "right_image.geom"), topleftconvention=True
+    )
+    left_im = Image(os.path.join(data_path(), "rectification", "left_image.tif"))
+    right_im = Image(os.path.join(data_path(), "rectification", "right_image.tif"))
+    elevation = 0.0
+    if use_dtm:
+        dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+        geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+        elevation = DTMIntersection(dtm_file, geoid_file)
+
+    epi_step = 30
+    elevation_offset = 50
+    tolerance = 0.01
+    left_grid, right_grid, img_size_row, img_size_col, mean_br = compute_stereorectification_epipolar_grids_adaptive(
+        left_im,
+        geom_model_left,
+        right_im,
+        geom_model_right,
+        elevation,
+        epi_step,
+        elevation_offset,
+        nb_levels=3,
+        tolerance=tolerance,
+    )
+    nb_coloc_adaptive = nb_coloc[0]
+
+    # OTB reference, OTB convention is [col, row], shareloc convention is [row, col]
+    reference_left_grid = rasterio.open(os.path.join(data_path(), "rectification", gt_left)).read()
+    reference_right_grid = rasterio.open(os.path.join(data_path(), "rectification", gt_right)).read()
+    assert reference_left_grid[1] == pytest.approx(left_grid.data[0, :, :], abs=1e-2)
+    assert reference_left_grid[0] == pytest.approx(left_grid.data[1, :, :], abs=1e-2)
+    assert reference_right_grid[1] == pytest.approx(right_grid.data[0, :, :], abs=1e-2)
+    assert reference_right_grid[0] == pytest.approx(right_grid.data[1, :, :], abs=1e-2)
+    assert img_size_row == 612
+    assert img_size_col == 612
+    assert mean_br == pytest.approx(reference_mean_br, abs=1e-5)
+
+    # regular grids generation
+    nb_coloc[0] = 0
+    left_grid_ref, right_grid_ref, __, __, mean_br_ref = compute_stereorectification_epipolar_grids(
+        left_im, geom_model_left, right_im, geom_model_right, elevation, epi_step, elevation_offset
+    )
+    np.testing.assert_allclose(left_grid.data, left_grid_ref.data, atol=tolerance, rtol=0)
+    np.testing.assert_allclose(right_grid.data, right_grid_ref.data, atol=tolerance, rtol=0)
+    assert mean_br == pytest.approx(mean_br_ref, abs=1e-7)
+    # flat terrain cells are not refined, DTM relief requires refinement almost everywhere
+    assert nb_coloc_adaptive < max_coloc_ratio * nb_coloc[0]
+
+
+@pytest.mark.unit_tests
+def test_compute_local_epipolar_line():
+    """
+    Test local epipolar lines against colocalizations of right correspondents at lower and higher elevations
+    """
+    geom_model_left = RPC.from_any(
+        os.path.join(data_path(), "rectification", "left_image.geom"), topleftconvention=True
+    )
+    geom_model_right = RPC.from_any(
+        os.path.join(data_path(), "rectification", "right_image.geom"), topleftconvention=True
+    )
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    geoid_file = os.path.join(data_path(), "dtm", "geoid", "egm96_15.gtx")
+    dtm_ventoux = DTMIntersection(dtm_file, geoid_file)
+    elevation_offset = 50.0
+
+    left_points = np.array([[5000.5, 5000.5, 0.0], [5100.0, 5300.0, 0.0], [5500.0, 5200.5, 0.0]])
+    for elevation in [0.0, dtm_ventoux]:
+        local_epi_start, local_epi_end = compute_local_epipolar_line(
+            geom_model_left, geom_model_right, left_points, elevation, elevation_offset
+        )
+        right_row, right_col, right_alt = coloc(
+            geom_model_left, geom_model_right, left_points[:, 0], left_points[:, 1], elevation
+        )
+        for epi_line, offset in [(local_epi_start, -elevation_offset), (local_epi_end, elevation_offset)]:
+            ref = np.column_stack(coloc(geom_model_right, geom_model_left, right_row, right_col, right_alt + offset))
+            np.testing.assert_allclose(epi_line, ref, atol=1e-9, rtol=0)
+
+        # single point
+        local_epi_start, local_epi_end = compute_local_epipolar_line(
+            geom_model_left, geom_model_right, left_points[0, :], elevation, elevation_offset
+        )
+        assert local_epi_start.shape == (3,)
+        assert local_epi_end.shape == (3,)
+
+
+@pytest.mark.unit_tests
+def test_compute_epipolar_lines_starts(caplog):
+    """
+    Test epipolar lines starting points computed by blocks against line by line computation
+    """
+    geom_model_left = RPC.from_any(
+        os.path.join(data_path(), "rectification", "left_image.geom"), topleftconvention=True
+    )
+    geom_model_right = RPC.from_any(
+        os.path.join(data_path(), "rectification", "right_image.geom"), topleftconvention=True
+    )
+    start_left = np.array([5000.0, 5000.0, 0.0])
+    nb_lines = 40
+    mean_spacing = 1.0
+    epi_step = 10
+    elevation = 0.0
+    elevation_offset = 50.0
+
+    left_lines = [start_left]
+    right_lines = [
+        np.array(coloc(geom_model_left, geom_model_right, start_left[0], start_left[1], elevation)).flatten()
+    ]
+    for __ in range(nb_lines - 1):
+        local_epi_start, local_epi_end = compute_local_epipolar_line(
+            geom_model_left, geom_model_right, left_lines[-1], elevation, elevation_offset
+        )
+        alpha = compute_epipolar_angle(local_epi_end, local_epi_start)
+        next_left, next_right = moving_to_next_line(
+            geom_model_left, geom_model_right, left_lines[-1], mean_spacing, elevation, epi_step, alpha
+        )
+        left_lines.append(next_left)
+        right_lines.append(next_right)
+
+    left_starts, right_starts = compute_epipolar_lines_starts(
+        geom_model_left,
+        geom_model_right,
+        start_left,
+        nb_lines,
+        mean_spacing,
+        elevation,
+        epi_step,
+        elevation_offset,
+        block_size=16,
+        tolerance=1e-8,
+    )
+    np.testing.assert_allclose(left_starts[:, 0:2], np.array(left_lines)[:, 0:2], atol=1e-6, rtol=0)
+    np.testing.assert_allclose(right_starts, np.array(right_lines), atol=1e-6, rtol=0)
+    assert not [record for record in caplog.records if record.levelno == logging.WARNING]
+
+    # no convergence after max_iter corrections: a warning is logged for each block
+    caplog.clear()
+    with caplog.at_level(logging.WARNING):
+        compute_epipolar_lines_starts(
+            geom_model_left,
+            geom_model_right,
+            start_left,
+            nb_lines,
+            mean_spacing,
+            elevation,
+            epi_step,
+            elevation_offset,
+            block_size=16,
+            tolerance=1e-8,
+            max_iter=1,
+        )
+    warnings = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert len(warnings) == 3
+    assert "did not converge" in warnings[0].getMessage()
+
+
 @pytest.mark.unit_tests
 def test_compute_stereorectification_epipolar_grids_geomodel_rpc_dtm_geoid_roi():
     """
@@ -430,6 +676,67 @@ def test_rectification_grid_extrapolation():
     assert pytest.approx(coords[1, 1], abs=1e-10) == 4883.84894205729142413474619389
 
 
+@pytest.mark.unit_tests
+def test_rectification_grid_interpolation_methods():
+    """
+    Test compiled rectification grid interpolation against scipy, cubic interpolation and float32 outputs
+    """
+    grid_filename = os.path.join(data_path(), "rectification_grids", "left_epipolar_grid.tif")
+    rectif_grid = RectificationGrid(grid_filename)
+
+    rng = np.random.default_rng(0)
+    # positions inside and outside the grid
+    positions = rng.uniform(-100.0, 450.0, (1000, 2))
+    positions[0, :] = [np.nan, 10.0]
+    coords = rectif_grid.interpolate(positions)
+    for band, values in enumerate([rectif_grid.col_positions, rectif_grid.row_positions]):
+        ref = interpolate.interpn(
+            rectif_grid.points, values, positions[1:, :], method="linear", bounds_error=False, fill_value=None
+        )
+        np.testing.assert_allclose(coords[1:, band], ref, atol=1e-8, rtol=0)
+    assert np.all(np.isnan(coords[0, :]))
+
+    coords_float32 = rectif_grid.interpolate(positions, dtype=np.float32)
+    assert coords_float32.dtype == np.float32
+    np.testing.assert_allclose(coords_float32[1:, :], coords[1:, :], rtol=1e-6)
+
+    # cubic convolution is exact on nodes and on affine grids, also close to grid borders
+    nodes = np.column_stack([rectif_grid.grid_row.flatten(), rectif_grid.grid_col.flatten()])
+    np.testing.assert_allclose(rectif_grid.interpolate(nodes, method="cubic"), rectif_grid.interpolate(nodes))
+    rectif_grid.positions[:, :, 0] = 1.5 * rectif_grid.grid_row - 0.2 * rectif_grid.grid_col + 3.0
+    rectif_grid.positions[:, :, 1] = 0.1 * rectif_grid.grid_row + 0.9 * rectif_grid.grid_col - 7.0
+    inside = rng.uniform(15.0, 315.0, (1000, 2))
+    coords = rectif_grid.interpolate(inside, method="cubic")
+    np.testing.assert_allclose(coords[:, 0], 1.5 * inside[:, 0] - 0.2 * inside[:, 1] + 3.0, atol=1e-8, rtol=0)
+    np.testing.assert_allclose(coords[:, 1], 0.1 * inside[:, 0] + 0.9 * inside[:, 1] - 7.0, atol=1e-8, rtol=0)
+
+    with pytest.raises(ValueError):
+        rectif_grid.interpolate(positions, method="nearest")
+
+
+@pytest.mark.unit_tests
+def test_rectification_grid_roi():
+    """
+    Test rectification grid loaded on an epipolar region of interest
+    """
+    grid_filename = os.path.join(data_path(), "rectification_grids", "left_epipolar_grid.tif")
+    rectif_grid = RectificationGrid(grid_filename)
+
+    rng = np.random.default_rng(0)
+    for roi in [[100.0, 50.0, 200.0, 160.0], [-20.0, 250.0, 40.0, 400.0], [120.0, 120.0, 120.0, 120.0]]:
+        rectif_grid_roi = RectificationGrid(grid_filename, roi=roi)
+        assert rectif_grid_roi.positions.shape[0] < rectif_grid.positions.shape[0]
+        assert rectif_grid_roi.positions.shape[1] < rectif_grid.positions.shape[1]
+        positions = np.column_stack([rng.uniform(roi[1], roi[3], 100), rng.uniform(roi[0], roi[2], 100)])
+        for method in ["linear", "cubic"]:
+            np.testing.assert_allclose(
+                rectif_grid_roi.interpolate(positions, method=method),
+                rectif_grid.interpolate(positions, method=method),
+                atol=1e-8,
+                rtol=0,
+            )
+
+
 @pytest.mark.unit_tests
 def test_prepare_rectification():
     """
@@ -33,7 +33,15 @@ import pytest
 import xarray as xr
 
 # Shareloc imports
-from shareloc.geofunctions.triangulation import distance_point_los, epipolar_triangulation, sensor_triangulation
+from shareloc.geofunctions.rectification_grid import RectificationGrid, load_rectification_grid
+from shareloc.geofunctions.triangulation import (
+    distance_point_los,
+    epipolar_triangulation,
+    epipolar_triangulation_blocks,
+    los_triangulation,
+    sensor_triangulation,
+    sensor_triangulation_n_views,
+)
 from shareloc.geomodels.grid import Grid
 from shareloc.geomodels.rpc import RPC
 
@@ -76,6 +84,57 @@ def test_sensor_triangulation(row, col, h):
     assert distance == pytest.approx(0.0, abs=1e-3)
 
 
+@pytest.mark.unit_tests
+def test_sensor_triangulation_n_views():
+    """
+    Test triangulation of matches between three views, with validity masks
+    """
+    grid_left = prepare_loc("ellipsoide", "P1BP--2017092838284574CP")
+    grid_right = prepare_loc("ellipsoide", "P1BP--2017092838319324CP")
+    grid_right.estimate_inverse_loc_predictor()
+    file_geom = os.path.join(data_path(), "rpc", "PHR1B_P_201709281038045_SEN_PRG_FC_178608-001.geom")
+    rpc = RPC.from_any(file_geom, topleftconvention=True)
+
+    # matches created by colocalization
+    rows = np.array([100.5, 1500.5, 3000.5, 2000.5])
+    cols = np.array([200.5, 1000.5, 4000.5, 3000.5])
+    lonlatalt = grid_left.direct_loc_h(rows, cols, np.array([10.0, 200.0, -30.0, 50.0]))
+    right_rows, right_cols, __ = grid_right.inverse_loc(lonlatalt[:, 0], lonlatalt[:, 1], lonlatalt[:, 2])
+    rpc_rows, rpc_cols, __ = rpc.inverse_loc(lonlatalt[:, 0], lonlatalt[:, 1], lonlatalt[:, 2])
+    matches = np.column_stack([cols, rows, right_cols, right_rows, rpc_cols, rpc_rows])
+
+    point_ecef, point_wgs84, distances = sensor_triangulation_n_views(
+        matches, [grid_left, grid_right, rpc], residues=True
+    )
+    np.testing.assert_allclose(point_wgs84[:, 0:2], lonlatalt[:, 0:2], atol=5e-8, rtol=0)
+    np.testing.assert_allclose(point_wgs84[:, 2], lonlatalt[:, 2], atol=5e-2, rtol=0)
+    assert distances.shape == (4, 3)
+    np.testing.assert_allclose(distances, 0.0, atol=1e-2)
+
+    # two views: same result as sensor_triangulation
+    point_ecef_pair, __, distance_pair = sensor_triangulation(matches[:, 0:4], grid_left, grid_right, residues=True)
+    point_ecef_2_views, __, distances_2_views = sensor_triangulation_n_views(
+        matches[:, 0:4], [grid_left, grid_right], residues=True
+    )
+    np.testing.assert_allclose(point_ecef_2_views, point_ecef_pair, atol=1e-6, rtol=0)
+    np.testing.assert_allclose(distances_2_views[:, 0], distance_pair, atol=1e-6, rtol=0)
+
+    # validity masks: third view ignored for first match, single valid view for last match
+    valid = np.full((4, 3), True)
+    valid[0, 2] = False
+    valid[3, 1:] = False
+    point_ecef_masked, __, distances_masked = sensor_triangulation_n_views(
+        matches, [grid_left, grid_right, rpc], valid=valid, residues=True
+    )
+    np.testing.assert_allclose(point_ecef_masked[0, :], point_ecef_pair[0, :], atol=1e-6, rtol=0)
+    assert np.isnan(distances_masked[0, 2])
+    np.testing.assert_array_equal(point_ecef_masked[1:3, :], point_ecef[1:3, :])
+    assert np.all(np.isnan(point_ecef_masked[3, :]))
+
+    with pytest.raises(ValueError):
+        sensor_triangulation_n_views(matches[:, 0:4], [grid_left, grid_right, rpc])
+
+
 def prepare_loc(alti="geoide", id_scene="P1BP--2017030824934340CP"):
     """
     Read multiH grid
@@ -126,6 +185,55 @@ def test_triangulation_residues():
     assert distance == pytest.approx(residue, abs=1e-9)
 
 
+@pytest.mark.unit_tests
+def test_los_triangulation():
+    """
+    Test closed form LOS triangulation against normal equations solution on simulated LOS
+    """
+
+    class SimulatedLOS:
+        """line of sight class"""
+
+        def __init__(self, sis, vis):
+            self.sis = sis
+            self.vis = vis / np.linalg.norm(vis, axis=1)[:, np.newaxis]
+
+    rng = np.random.default_rng(0)
+    nb_los = 1000
+    points = rng.uniform(-6.4e6, 6.4e6, (nb_los, 3))
+    left_los = SimulatedLOS(points + rng.uniform(-1e5, 1e5, (nb_los, 3)), rng.normal(size=(nb_los, 3)))
+    right_los = SimulatedLOS(points + rng.uniform(-1e5, 1e5, (nb_los, 3)), rng.normal(size=(nb_los, 3)))
+
+    # normal equations: (sum_i I - vi vi^T) x = sum_i (I - vi vi^T) si
+    normal_mat = np.zeros((nb_los, 3, 3))
+    normal_vec = np.zeros((nb_los, 3))
+    for los in [left_los, right_los]:
+        id_vivi = np.eye(3) - los.vis[:, :, np.newaxis] * los.vis[:, np.newaxis, :]
+        normal_mat += id_vivi
+        normal_vec += np.einsum("nij,nj->ni", id_vivi, los.sis)
+    ref = np.linalg.solve(normal_mat, normal_vec[:, :, np.newaxis])[:, :, 0]
+
+    residues = np.empty(nb_los)
+    intersections = los_triangulation(left_los, right_los, residues=residues)
+    np.testing.assert_allclose(intersections, ref, atol=1e-6, rtol=0)
+    np.testing.assert_allclose(residues, distance_point_los(left_los, intersections), atol=1e-6, rtol=0)
+    np.testing.assert_allclose(residues, distance_point_los(right_los, intersections), atol=1e-6, rtol=0)
+
+    # preallocated output
+    out = np.empty((nb_los, 3))
+    assert los_triangulation(left_los, right_los, out=out) is out
+    np.testing.assert_array_equal(out, intersections)
+
+    # NaN and parallel LOS
+    left_los.sis[1, 0] = np.nan
+    right_los.vis[2, :] = np.nan
+    right_los.vis[3, :] = -left_los.vis[3, :]
+    intersections = los_triangulation(left_los, right_los, residues=residues)
+    assert np.all(np.isnan(intersections[1:4, :]))
+    assert np.all(np.isnan(residues[1:4]))
+    np.testing.assert_allclose(intersections[4:, :], ref[4:, :], atol=1e-6, rtol=0)
+
+
 @pytest.mark.unit_tests
 def test_epi_triangulation_sift():
     """
@@ -148,6 +256,14 @@ def test_epi_triangulation_sift():
     valid = [4584341.37359843123704195022583, 572313.675204274943098425865173, 4382784.51356450468301773071289]
     assert valid == pytest.approx(point_ecef[0, :], abs=0.5)
 
+    # preallocated outputs
+    out = (np.empty((matches.shape[0], 3)), np.empty((matches.shape[0], 3)), np.empty((matches.shape[0], 1)))
+    res = epipolar_triangulation(
+        matches, None, "sift", grid_left, grid_right, grid_left_filename, grid_right_filename, out=out
+    )
+    assert res[0] is out[0]
+    np.testing.assert_array_equal(out[0], point_ecef)
+
 
 @pytest.mark.unit_tests
 def test_epi_triangulation_sift_rpc():
@@ -395,3 +511,99 @@ def test_epi_triangulation_disp_grid_masked():
     # pc_dataset = create_dataset(disp, point_wgs84, point_ecef, residuals)
     # disp = xr.merge((disp, pc_dataset))
     assert np.array_equal(point_ecef[0, :], [0, 0, 0])
+
+
+@pytest.mark.unit_tests
+def test_epi_triangulation_disp_blocks():
+    """
+    Test epipolar triangulation of a disparity map by blocks of rows
+    """
+    gri_left = prepare_loc("ellipsoide", "P1BP--2017092838284574CP")
+    gri_right = prepare_loc("ellipsoide", "P1BP--2017092838319324CP")
+    grid_left_filename = os.path.join(data_path(), "rectification_grids", "left_epipolar_grid.tif")
+    grid_right_filename = os.path.join(data_path(), "rectification_grids", "right_epipolar_grid.tif")
+    disp = xr.load_dataset(os.path.join(data_path(), "triangulation", "disparity-crop.nc"))
+    mask_array = disp.msk.values
+
+    ref = epipolar_triangulation(
+        disp, mask_array, "disp", gri_left, gri_right, grid_left_filename, grid_right_filename, residues=True
+    )
+
+    # block size not dividing the number of rows
+    nb_rows = disp.disp.shape[0]
+    block_size = 7 if nb_rows % 7 else 6
+    out = tuple(np.full_like(array, -1.0) for array in ref)
+    res = epipolar_triangulation(
+        disp,
+        mask_array,
+        "disp",
+        gri_left,
+        gri_right,
+        grid_left_filename,
+        grid_right_filename,
+        residues=True,
+        block_size=block_size,
+        out=out,
+    )
+    for array, array_ref, array_out in zip(res, ref, out):
+        assert array is array_out
+        np.testing.assert_allclose(array, array_ref, atol=1e-6, rtol=0)
+
+    # out is filled on whole disparity map triangulation too
+    out = tuple(np.full_like(array, -1.0) for array in ref)
+    res = epipolar_triangulation(
+        disp, mask_array, "disp", gri_left, gri_right, grid_left_filename, grid_right_filename, residues=True, out=out
+    )
+    for array, array_ref, array_out in zip(res, ref, out):
+        assert array is array_out
+        np.testing.assert_array_equal(array, array_ref)
+
+    # generator
+    nb_blocks = 0
+    last_index = 0
+    for block, block_ecef, __, block_residues in epipolar_triangulation_blocks(
+        disp, mask_array, gri_left, gri_right, grid_left_filename, grid_right_filename, block_size, residues=True
+    ):
+        assert block.start == last_index
+        last_index = block.stop
+        np.testing.assert_allclose(block_ecef, ref[0][block, :], atol=1e-6, rtol=0)
+        np.testing.assert_allclose(block_residues, ref[2][block, :], atol=1e-6, rtol=0)
+        nb_blocks += 1
+    assert last_index == disp.disp.size
+    assert nb_blocks == -(-nb_rows // block_size)
+
+
+@pytest.mark.unit_tests
+def test_epi_triangulation_rectification_grids_cache():
+    """
+    Test epipolar triangulation with rectification grid objects and cached grids
+    """
+    gri_left = prepare_loc("ellipsoide", "P1BP--2017092838284574CP")
+    gri_right = prepare_loc("ellipsoide", "P1BP--2017092838319324CP")
+    grid_left_filename = os.path.join(data_path(), "rectification_grids", "left_epipolar_grid.tif")
+    grid_right_filename = os.path.join(data_path(), "rectification_grids", "right_epipolar_grid.tif")
+    matches = np.load(os.path.join(data_path(), "triangulation", "matches-crop.npy"))
+
+    load_rectification_grid.cache_clear()
+    point_ecef, __, __ = epipolar_triangulation(
+        matches, None, "sift", gri_left, gri_right, grid_left_filename, grid_right_filename
+    )
+    point_ecef_cached, __, __ = epipolar_triangulation(
+        matches, None, "sift", gri_left, gri_right, grid_left_filename, grid_right_filename
+    )
+    cache_info = load_rectification_grid.cache_info()
+    assert cache_info.misses == 2
+    assert cache_info.hits == 2
+    assert load_rectification_grid(grid_left_filename) is load_rectification_grid(grid_left_filename)
+    np.testing.assert_array_equal(point_ecef_cached, point_ecef)
+
+    point_ecef_objects, __, __ = epipolar_triangulation(
+        matches,
+        None,
+        "sift",
+        gri_left,
+        gri_right,
+        RectificationGrid(grid_left_filename),
+        RectificationGrid(grid_right_filename),
+    )
+    np.testing.assert_array_equal(point_ecef_objects, point_ecef)
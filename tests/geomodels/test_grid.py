@@ -28,6 +28,7 @@ import pytest
 
 # Shareloc imports
 from shareloc.geomodels.grid import Grid
+from shareloc.math_utils import interpol_bilin_vectorized
 
 # Shareloc test imports
 from ..helpers import data_path
@@ -44,3 +45,65 @@ def test_grid_geotiff():
     np.testing.assert_allclose(res_geotiff, [[2.183908972985368, 48.94317692547565, 1000.0]], rtol=0, atol=1e-9)
     res_geotiff = gri_geotiff.direct_loc_h(50, 100, 200.0)
     np.testing.assert_allclose(res_geotiff, [[2.1828713504608683, 48.942429997483146, 200.0]], rtol=0, atol=1e-9)
+
+
+@pytest.mark.unit_tests
+def test_grid_direct_loc_h_altitudes():
+    """
+    test grid direct localization with one altitude per point
+    """
+    geotiff_grid_path = data_path("ellipsoide", "loc_direct_grid_PHR_2013072139303958CP.tif")
+    gri = Grid(geotiff_grid_path)
+    alts = np.array([gri.alts_down[0] + 10.0, gri.alts_down[0], 500.0, gri.alts_down[1], 10.0, gri.alts_down[-1]])
+    (high_index, low_index) = gri.return_grid_index(alts)
+    for index, alt in enumerate(alts):
+        assert (high_index[index], low_index[index]) == gri.return_grid_index(alt)
+
+    rng = np.random.default_rng(0)
+    row = rng.uniform(gri.row0, gri.rowmax, 50)
+    col = rng.uniform(gri.col0, gri.colmax, 50)
+    alt = rng.uniform(gri.alts_down[-1], gri.alts_down[0], 50)
+    res_geotiff = gri.direct_loc_h(row, col, alt)
+    np.testing.assert_array_equal(res_geotiff[:, 2], alt)
+    for index in range(50):
+        res_point = gri.direct_loc_h(row[index], col[index], alt[index])
+        np.testing.assert_allclose(res_geotiff[index, :], res_point[0, :], rtol=0, atol=1e-12)
+
+    # only enclosing layers are interpolated: same as interpolating all layers
+    (high_index, low_index) = gri.return_grid_index(alt)
+    pos_row = (row - gri.row0) / gri.steprow
+    pos_col = (col - gri.col0) / gri.stepcol
+    # pylint: disable=unbalanced-tuple-unpacking
+    [vlon, vlat] = interpol_bilin_vectorized([gri.lon_data, gri.lat_data], gri.nbrow, gri.nbcol, pos_row, pos_col)
+    coef = (alt - gri.alts_down[low_index]) / (gri.alts_down[high_index] - gri.alts_down[low_index])
+    points = np.arange(50)
+    lon = coef * vlon[high_index, points] + (1 - coef) * vlon[low_index, points]
+    lat = coef * vlat[high_index, points] + (1 - coef) * vlat[low_index, points]
+    np.testing.assert_allclose(res_geotiff[:, 0], lon, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(res_geotiff[:, 1], lat, rtol=0, atol=1e-12)
+
+
+@pytest.mark.unit_tests
+def test_grid_interpolation_in_altitude():
+    """
+    test grid resampling in altitude and direct localization grid at constant altitude
+    """
+    geotiff_grid_path = data_path("ellipsoide", "loc_direct_grid_PHR_2013072139303958CP.tif")
+    gri = Grid(geotiff_grid_path)
+
+    # resampling on grid nodes and layers gives back grid data
+    (lon_data, lat_data) = gri.interpolate_grid_in_altitude(gri.nbrow, gri.nbcol)
+    np.testing.assert_allclose(lon_data, gri.lon_data, rtol=0, atol=1e-12)
+    np.testing.assert_allclose(lat_data, gri.lat_data, rtol=0, atol=1e-12)
+
+    (lon_data, lat_data) = gri.interpolate_grid_in_altitude(4, 6, 5)
+    alts = np.linspace(gri.alts_down[0], gri.alts_down[-1], 5)
+    gldalt = gri.direct_loc_grid_h(
+        gri.row0, gri.col0, (gri.rowmax - gri.row0) / 3, (gri.colmax - gri.col0) / 5, 4, 6, alts[2]
+    )
+    assert gldalt.shape == (3, 4, 6)
+    np.testing.assert_allclose(gldalt[0], lon_data[2], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(gldalt[1], lat_data[2], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(gldalt[2], alts[2])
+    res_geotiff = gri.direct_loc_h(gri.row0 + (gri.rowmax - gri.row0) / 3, gri.col0, alts[2])
+    np.testing.assert_allclose(gldalt[:, 1, 0], res_geotiff[0], rtol=0, atol=1e-12)
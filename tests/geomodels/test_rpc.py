@@ -34,7 +34,7 @@ import pytest
 
 # Shareloc imports
 from shareloc.geofunctions.dtm_intersection import DTMIntersection
-from shareloc.geomodels.rpc import RPC, identify_dimap, identify_ossim_kwl
+from shareloc.geomodels.rpc import RPC, direct_loc_inverse_iterative_numba, identify_dimap, identify_ossim_kwl
 
 # Shareloc test imports
 from ..helpers import data_path
@@ -209,6 +209,37 @@ def test_rpc_from_geotiff_without_rpc(prod, can_read):
         assert not can_read
 
 
+@pytest.mark.unit_tests
+def test_rpc_fit_direct_coefficients():
+    """
+    test direct coefficients fitted from geotiff inverse RPC
+    """
+    data_folder = data_path()
+    rpc_file = os.path.join(data_folder, "rpc", "PHR1B_P_201709281038393_SEN_PRG_FC_178609-001.tif")
+    fctrat_iterative = RPC.from_geotiff(rpc_file, topleftconvention=True)
+    assert not fctrat_iterative.direct_coefficient
+
+    # tolerance can not be reached: coefficients are not attached
+    residuals = fctrat_iterative.fit_direct_coefficients(tolerance=1e-9)
+    assert residuals["rms"] > 1e-9
+    assert not fctrat_iterative.direct_coefficient
+
+    fctrat = RPC.from_geotiff(rpc_file, topleftconvention=True, fit_direct_tolerance=1e-3)
+    assert fctrat.direct_coefficient
+    assert RPC.from_any(rpc_file, topleftconvention=True, fit_direct_tolerance=1e-3).direct_coefficient
+
+    rng = np.random.default_rng(0)
+    row = rng.uniform(fctrat.row0, fctrat.rowmax, 1000)
+    col = rng.uniform(fctrat.col0, fctrat.colmax, 1000)
+    alt = rng.uniform(fctrat.alt_minmax[0], fctrat.alt_minmax[1], 1000)
+    direct_loc = fctrat.direct_loc_h(row, col, alt)
+    direct_loc_iterative = fctrat_iterative.direct_loc_h(row, col, alt)
+    np.testing.assert_allclose(direct_loc, direct_loc_iterative, rtol=0.0, atol=1e-8)
+    (row_inv, col_inv, __) = fctrat.inverse_loc(direct_loc[:, 0], direct_loc[:, 1], alt)
+    np.testing.assert_allclose(row_inv, row, rtol=0.0, atol=1e-3)
+    np.testing.assert_allclose(col_inv, col, rtol=0.0, atol=1e-3)
+
+
 @pytest.mark.parametrize(
     "id_scene,lon,lat,alt, col_vt,row_vt",
     [("PHR1B_P_201709281038393_SEN_PRG_FC_178609-001", 7.048662660737769592, 43.72774839443545858, 0.0, 100.5, 200.5)],
@@ -298,6 +329,101 @@ def test_rpc_direct_inverse_iterative_vs_direct_multiple_points():
     assert p_direct[1, 1] == p_direct_iterative[1][1]
 
 
+@pytest.mark.unit_tests
+def test_rpc_direct_inverse_iterative_altitudes():
+    """
+    test iterative direct localization with one altitude per point, and iteration counts of the Newton kernel
+    """
+    data_folder = data_path()
+    id_scene = "P1BP--2018122638935449CP"
+    file_dimap = os.path.join(data_folder, f"rpc/PHRDIMAP_{id_scene}.XML")
+
+    fctrat = RPC.from_dimap_v1(file_dimap)
+
+    rng = np.random.default_rng(0)
+    row = rng.uniform(0.0, 20000.0, 1000)
+    col = rng.uniform(0.0, 40000.0, 1000)
+    alt = rng.uniform(0.0, 1000.0, 1000)
+    (lon, lat, alt_out) = fctrat.direct_loc_inverse_iterative(row, col, alt)
+    np.testing.assert_array_equal(alt_out, alt)
+    (row_inv, col_inv, __) = fctrat.inverse_loc(lon, lat, alt)
+    np.testing.assert_allclose(row_inv, row, rtol=0.0, atol=1e-6)
+    np.testing.assert_allclose(col_inv, col, rtol=0.0, atol=1e-6)
+
+    # each point converges on its own
+    (lon_iter, lat_iter, nb_iter) = direct_loc_inverse_iterative_numba(
+        row,
+        col,
+        alt,
+        fctrat.num_col,
+        fctrat.den_col,
+        fctrat.num_row,
+        fctrat.den_row,
+        fctrat.scale_col,
+        fctrat.offset_col,
+        fctrat.scale_row,
+        fctrat.offset_row,
+        fctrat.scale_x,
+        fctrat.offset_x,
+        fctrat.scale_y,
+        fctrat.offset_y,
+        fctrat.scale_alt,
+        fctrat.offset_alt,
+        10,
+        1e-6,
+    )
+    np.testing.assert_array_equal(lon_iter, lon)
+    np.testing.assert_array_equal(lat_iter, lat)
+    assert np.all(nb_iter > 0)
+    assert np.all(nb_iter < 10)
+    # the scene center is reached without iteration
+    (row_center, col_center, __) = fctrat.inverse_loc(fctrat.offset_x, fctrat.offset_y, fctrat.offset_alt)
+    (__, __, nb_iter) = direct_loc_inverse_iterative_numba(
+        row_center,
+        col_center,
+        np.array([fctrat.offset_alt]),
+        fctrat.num_col,
+        fctrat.den_col,
+        fctrat.num_row,
+        fctrat.den_row,
+        fctrat.scale_col,
+        fctrat.offset_col,
+        fctrat.scale_row,
+        fctrat.offset_row,
+        fctrat.scale_x,
+        fctrat.offset_x,
+        fctrat.scale_y,
+        fctrat.offset_y,
+        fctrat.scale_alt,
+        fctrat.offset_alt,
+        10,
+        1e-6,
+    )
+    assert nb_iter[0] == 0
+
+
+@pytest.mark.unit_tests
+def test_rpc_direct_loc_grid_h():
+    """
+    test direct localization grid at constant altitude against point localizations
+    """
+    data_folder = data_path()
+    id_scene = "P1BP--2018122638935449CP"
+    file_dimap = os.path.join(data_folder, f"rpc/PHRDIMAP_{id_scene}.XML")
+
+    fctrat = RPC.from_dimap_v1(file_dimap)
+
+    (row0, col0, steprow, stepcol, nbrow, nbcol, alt) = (100.5, 200.5, 50.0, 30.0, 12, 7, 125.0)
+    (gri_lon, gri_lat) = fctrat.direct_loc_grid_h(row0, col0, steprow, stepcol, nbrow, nbcol, alt)
+    assert gri_lon.shape == (nbrow, nbcol)
+    assert gri_lat.shape == (nbrow, nbcol)
+    for line in [0, 5, nbrow - 1]:
+        for column in [0, 3, nbcol - 1]:
+            lonlatalt = fctrat.direct_loc_h(row0 + steprow * line, col0 + stepcol * column, alt)
+            assert gri_lon[line, column] == pytest.approx(lonlatalt[0][0], abs=1e-12)
+            assert gri_lat[line, column] == pytest.approx(lonlatalt[0][1], abs=1e-12)
+
+
 def test_rpc_direct_iterative_nan():
     """
     test iterative direct localization with nan
@@ -388,6 +514,38 @@ def test_rpc_direct_dtm(id_scene, index_x, index_y):
     assert alt == pytest.approx(lonlath[0][2], abs=1e-4)
 
 
+@pytest.mark.unit_tests
+def test_rpc_direct_dtm_multi_points():
+    """
+    Test direct localization on DTMIntersection of several points at once
+    """
+    data_folder = data_path()
+    rpc_file = os.path.join(data_folder, "rpc", "RPC_PHR1B_P_201709281038393_SEN_PRG_FC_178609-001.XML")
+    fctrat = RPC.from_any(rpc_file, topleftconvention=True)
+    id_scene = "P1BP--2017092838284574CP"
+    data_folder_mnt = data_path("ellipsoide", id_scene)
+    fic = os.path.join(data_folder_mnt, f"MNT_{id_scene}.tif")
+    dtm = DTMIntersection(fic)
+
+    vect_index = np.array([[10.5, 20.5], [3.25, 12.5], [15.75, 30.25], [7.5, 5.5]])
+    lonlat = dtm.indexs_to_ters(vect_index)
+    alt = np.array([dtm.interpolate(index_x, index_y) for index_x, index_y in vect_index])
+    row, col, __ = fctrat.inverse_loc(lonlat[:, 0], lonlat[:, 1], alt)
+    # last line of sight does not intersect the DTM
+    row = np.append(row, -1.0e5)
+    col = np.append(col, 50.0)
+
+    lonlath = fctrat.direct_loc_dtm(row, col, dtm)
+    np.testing.assert_allclose(lonlath[:-1, 0], lonlat[:, 0], rtol=0.0, atol=1e-6)
+    np.testing.assert_allclose(lonlath[:-1, 1], lonlat[:, 1], rtol=0.0, atol=1e-6)
+    np.testing.assert_allclose(lonlath[:-1, 2], alt, rtol=0.0, atol=1e-2)
+    assert np.all(np.isnan(lonlath[-1, :]))
+
+    # batch localization is the same as point by point localization
+    for index in range(row.size):
+        np.testing.assert_array_equal(lonlath[index, :], fctrat.direct_loc_dtm(row[index], col[index], dtm)[0])
+
+
 @pytest.mark.parametrize(
     "id_scene, col,row",
     [("PHR1B_P_201709281038393_SEN_PRG_FC_178609-001", 100.5, 200.5)],
@@ -30,7 +30,7 @@ import numpy as np
 import pytest
 
 # Shareloc imports
-from shareloc.dtm_image import DTMImage
+from shareloc.dtm_image import DTMImage, TiledDTMImage
 
 # Shareloc test imports
 from .helpers import data_path
@@ -70,3 +70,40 @@ def test_dtm_fillnodata():
     dtm_file_srtm_hole = os.path.join(data_path(), "dtm", "srtm_ventoux", "N44E005_big_hole.tif")
     my_image_fill_hole = DTMImage(dtm_file_srtm_hole, read_data=True, fill_nodata="rio_fillnodata")
     assert my_image_fill_hole.data[403, 1119] == 32
+
+
+@pytest.mark.unit_tests
+def test_tiled_dtm_image():
+    """
+    Test tiled dtm image window reading and tiles cache
+    """
+    dtm_file = os.path.join(data_path(), "dtm", "srtm_ventoux", "srtm90_non_void_filled", "N44E005.hgt")
+    roi = [100, 200, 600, 700]
+    my_image = DTMImage(dtm_file, read_data=True, roi=roi, fill_nodata="constant", fill_value=100.0)
+    my_tiled_image = TiledDTMImage(
+        dtm_file, roi=roi, fill_nodata="constant", fill_value=100.0, tile_size=64, cache_size=4
+    )
+    assert my_tiled_image.nb_rows == my_image.nb_rows
+    assert my_tiled_image.nb_columns == my_image.nb_columns
+    assert my_tiled_image.transform == my_image.transform
+    assert len(my_tiled_image.tiles) == 0
+
+    window = my_tiled_image.read_window(60, 100, 10, 40)
+    assert window.dtype == np.float64
+    np.testing.assert_array_equal(window, my_image.data[60:70, 100:140])
+    assert list(my_tiled_image.tiles.keys()) == [(0, 1), (0, 2), (1, 1), (1, 2)]
+
+    # least recently used tile is released
+    my_tiled_image.read_tile(0, 1)
+    my_tiled_image.read_tile(7, 7)
+    assert list(my_tiled_image.tiles.keys()) == [(1, 1), (1, 2), (0, 1), (7, 7)]
+    assert my_tiled_image.tiles[(7, 7)].shape == (52, 52)
+
+    # overview is read without tiles
+    (overview, rows, cols) = my_tiled_image.read_overview(overview_size=128)
+    assert overview.shape == (125, 125)
+    # nodata nodes are nan
+    np.testing.assert_array_equal(np.nan_to_num(overview, nan=100.0), my_image.data[np.ix_(rows, cols)])
+    (overview, rows, cols) = my_tiled_image.read_overview()
+    np.testing.assert_array_equal(np.nan_to_num(overview, nan=100.0), my_image.data)
+    assert len(my_tiled_image.tiles) == 4
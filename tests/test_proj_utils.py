@@ -24,9 +24,10 @@ Test module for proj utils  function  shareloc/proj_utils.py
 # Third party imports
 import numpy as np
 import pytest
+from rasterio import crs, warp
 
 # Shareloc imports
-from shareloc.proj_utils import coordinates_conversion
+from shareloc.proj_utils import coordinates_conversion, get_crs_pair
 
 
 @pytest.mark.unit_tests
@@ -43,3 +44,74 @@ def test_coordinates_conversion():
         [[4584837.334948, 567331.361674, 4389850.562378], [4581754.08394, 567326.291517, 4385917.904472]]
     )
     np.testing.assert_allclose(point_ecef, coords_vt_ecef, atol=1e-5, rtol=0)
+
+
+@pytest.mark.unit_tests
+def test_coordinates_conversion_ecef():
+    """
+    Test analytic geodetic <-> geocentric conversions against rasterio
+    """
+    rng = np.random.default_rng(0)
+    point_wgs84 = np.column_stack(
+        [rng.uniform(-180.0, 180.0, 1000), rng.uniform(-90.0, 90.0, 1000), rng.uniform(-500.0, 9000.0, 1000)]
+    )
+    point_wgs84[0, :] = [0.0, 90.0, 100.0]
+    point_wgs84[1, :] = [10.0, -90.0, 0.0]
+    point_wgs84[2, :] = [-50.0, 0.0, -30.0]
+
+    point_ecef = coordinates_conversion(point_wgs84, 4326, 4978)
+    point_ecef_rasterio = np.array(
+        warp.transform(
+            crs.CRS.from_epsg(4326), crs.CRS.from_epsg(4978), point_wgs84[:, 0], point_wgs84[:, 1], point_wgs84[:, 2]
+        )
+    ).T
+    np.testing.assert_allclose(point_ecef, point_ecef_rasterio, atol=1e-6, rtol=0)
+
+    point_wgs84_back = coordinates_conversion(point_ecef, 4978, 4326)
+    # longitude is undefined at poles
+    np.testing.assert_allclose(point_wgs84_back[2:, 0], point_wgs84[2:, 0], atol=1e-11, rtol=0)
+    np.testing.assert_allclose(point_wgs84_back[:, 1], point_wgs84[:, 1], atol=1e-11, rtol=0)
+    np.testing.assert_allclose(point_wgs84_back[:, 2], point_wgs84[:, 2], atol=1e-6, rtol=0)
+
+    # single point
+    point_ecef = coordinates_conversion(point_wgs84[3, :], 4326, 4978)
+    assert point_ecef.shape == (1, 3)
+    np.testing.assert_allclose(point_ecef[0, :], point_ecef_rasterio[3, :], atol=1e-6, rtol=0)
+
+
+@pytest.mark.unit_tests
+def test_coordinates_conversion_buffers():
+    """
+    Test conversions in output buffer, in place, by chunks and in several threads
+    """
+    rng = np.random.default_rng(1)
+    point_wgs84 = np.column_stack(
+        [rng.uniform(1.0, 5.0, 1000), rng.uniform(40.0, 50.0, 1000), rng.uniform(-500.0, 9000.0, 1000)]
+    )
+
+    for epsg_out in [32631, 4978]:
+        ref = coordinates_conversion(point_wgs84, 4326, epsg_out)
+
+        out = np.empty_like(point_wgs84)
+        res = coordinates_conversion(point_wgs84, 4326, epsg_out, out=out)
+        assert res is out
+        np.testing.assert_array_equal(res, ref)
+
+        in_place = point_wgs84.copy()
+        coordinates_conversion(in_place, 4326, epsg_out, out=in_place)
+        np.testing.assert_array_equal(in_place, ref)
+
+        np.testing.assert_array_equal(coordinates_conversion(point_wgs84, 4326, epsg_out, chunk_size=300), ref)
+        np.testing.assert_array_equal(coordinates_conversion(point_wgs84, 4326, epsg_out, nb_workers=3), ref)
+        np.testing.assert_array_equal(
+            coordinates_conversion(point_wgs84, 4326, epsg_out, chunk_size=128, nb_workers=2), ref
+        )
+
+    # 2D coordinates, in place
+    point_utm = coordinates_conversion(point_wgs84[:, :2], 4326, 32631)
+    in_place = np.ascontiguousarray(point_wgs84[:, :2])
+    coordinates_conversion(in_place, 4326, 32631, out=in_place, chunk_size=100, nb_workers=2)
+    np.testing.assert_array_equal(in_place, point_utm)
+
+    # SRS are only built once
+    assert get_crs_pair(4326, 32631) is get_crs_pair(4326, 32631)